@@ -8,6 +8,7 @@ data/citation_db.json の検証済みURLを使い、articles/ 以下のHTMLに
 動作仕様:
   - <a>, <style>, <script> タグの内部テキストは変更しない
   - 各引用ソースは記事内で最初のマッチ1箇所のみにリンクを付与（過剰リンク防止）
+    全キーワードは1本の正規表現にまとめ、テキストノードごとに1回だけ走査する
   - すでに <a href> でラップされている箇所はスキップ
 
 使い方:
@@ -38,6 +39,7 @@ _OPEN_STYLE_RE = re.compile(r"^<style\b", re.IGNORECASE)
 _CLOSE_STYLE_RE = re.compile(r"^</style\s*>$", re.IGNORECASE)
 _OPEN_SCRIPT_RE = re.compile(r"^<script\b", re.IGNORECASE)
 _CLOSE_SCRIPT_RE = re.compile(r"^</script\s*>$", re.IGNORECASE)
+_HREF_RE = re.compile(r'href="([^"]*)"')
 
 
 def load_citation_db() -> list[dict]:
@@ -52,30 +54,101 @@ def load_citation_db() -> list[dict]:
     return entries
 
 
+class CitationMatcher:
+    """
+    citation_db の全キーワードを1本の正規表現（名前付きグループの選択）にまとめたもの。
+    テキストノードを先頭から1回走査し、まだリンクしていないエントリの最初の出現にリンクを付ける。
+    リンク済みエントリのキーワードが当たった位置では、未リンクのエントリのキーワードを
+    同じ位置で個別に試す（選択の順に最初に当たったもの。無ければ1文字進める）。
+    """
+
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        self._entry_of: dict[str, dict] = {}
+        self._ids_by_url: dict[str, list[str]] = {}
+        self._patterns: list[tuple[dict, re.Pattern]] = []   # 選択の順の (エントリ, キーワード)
+        alternatives = []
+        for i, entry in enumerate(entries):
+            self._ids_by_url.setdefault(entry["url"], []).append(entry["id"])
+            for j, kw_pattern in enumerate(entry["keywords"]):
+                try:
+                    compiled = re.compile(kw_pattern)
+                except re.error as e:
+                    print(f"  ⚠ 正規表現エラー [{entry['id']}] '{kw_pattern}': {e}", file=sys.stderr)
+                    continue
+                name = f"k{i}_{j}"
+                alternatives.append(f"(?P<{name}>{kw_pattern})")
+                self._entry_of[name] = entry
+                self._patterns.append((entry, compiled))
+        self._all_ids = {entry["id"] for entry, _ in self._patterns}
+        self._regex = re.compile("|".join(alternatives)) if alternatives else None
+
+    def linked_ids(self, html: str) -> set[str]:
+        """HTML 内で既にリンクされている URL のエントリID集合"""
+        ids: set[str] = set()
+        for url in _HREF_RE.findall(html):
+            ids.update(self._ids_by_url.get(url, ()))
+        return ids
+
+    def _unlinked_match(self, text: str, start: int, applied: set[str]) -> tuple[dict, re.Match] | None:
+        """start の位置で当たる未リンクのエントリのキーワード（選択の順で最初のもの）"""
+        for entry, pattern in self._patterns:
+            if entry["id"] not in applied:
+                m = pattern.match(text, start)
+                if m:
+                    return entry, m
+        return None
+
+    def apply(self, text: str, applied: set[str]) -> tuple[str, list[str]]:
+        """
+        テキストノードに引用リンクを付与する。
+        applied: このファイルで既にリンク付与済みのエントリID集合（更新される）
+        """
+        if self._regex is None:
+            return text, []
+        out = []
+        changes = []
+        last = pos = 0
+        while not self._all_ids <= applied:
+            m = self._regex.search(text, pos)
+            if not m:
+                break
+            entry = self._entry_of[m.lastgroup]
+            if entry["id"] in applied:
+                found = self._unlinked_match(text, m.start(), applied)
+                if found is None:
+                    pos = m.start() + 1
+                    continue
+                entry, m = found
+            matched_text = m.group(0)
+            out.append(text[last:m.start()])
+            out.append(f'<a href="{entry["url"]}" target="_blank" rel="noopener">{matched_text}</a>')
+            applied.add(entry["id"])
+            changes.append(f"  [{entry['id']}] 「{matched_text[:40]}」→ {entry['url']}")
+            last = pos = m.end()
+        if not out:
+            return text, []
+        out.append(text[last:])
+        return "".join(out), changes
+
+
+_matcher_cache: tuple[list[dict], CitationMatcher] | None = None
+
+
+def get_matcher(entries: list[dict]) -> CitationMatcher:
+    """entries から CitationMatcher を作る（同じリストなら作り直さない）"""
+    global _matcher_cache
+    if _matcher_cache is None or _matcher_cache[0] is not entries:
+        _matcher_cache = (entries, CitationMatcher(entries))
+    return _matcher_cache[1]
+
+
 def apply_citations_to_text(text: str, entries: list[dict], applied: set[str]) -> tuple[str, list[str]]:
     """
     テキストノードに引用リンクを付与する。
     applied: このファイルで既にリンク付与済みのエントリID集合（更新される）
     """
-    changes = []
-    for entry in entries:
-        if entry["id"] in applied:
-            continue  # 既にこの記事でリンク済み → スキップ
-        url = entry["url"]
-        label = entry["label"]
-        for kw_pattern in entry["keywords"]:
-            try:
-                m = re.search(kw_pattern, text)
-                if m:
-                    matched_text = m.group(0)
-                    link = f'<a href="{url}" target="_blank" rel="noopener">{matched_text}</a>'
-                    text = text[:m.start()] + link + text[m.end():]
-                    applied.add(entry["id"])
-                    changes.append(f"  [{entry['id']}] 「{matched_text[:40]}」→ {url}")
-                    break  # このエントリは1パターンマッチで終了
-            except re.error as e:
-                print(f"  ⚠ 正規表現エラー [{entry['id']}] '{kw_pattern}': {e}", file=sys.stderr)
-    return text, changes
+    return get_matcher(entries).apply(text, applied)
 
 
 def apply_citations_to_html(html: str, entries: list[dict]) -> tuple[str, list[str]]:
@@ -87,7 +160,9 @@ def apply_citations_to_html(html: str, entries: list[dict]) -> tuple[str, list[s
     depth_a = 0
     depth_style = 0
     depth_script = 0
-    applied: set[str] = set()
+    matcher = get_matcher(entries)
+    # 既に同じ URL へのリンクがある記事には付け直さない（再実行で2つ目以降の出現にリンクが増えないように）
+    applied = matcher.linked_ids(html)
     result = []
     all_changes = []
 
@@ -109,10 +184,10 @@ def apply_citations_to_html(html: str, entries: list[dict]) -> tuple[str, list[s
             result.append(part)
         else:
             # テキストノード
-            if depth_a > 0 or depth_style > 0 or depth_script > 0:
+            if depth_a > 0 or depth_style > 0 or depth_script > 0 or part.isspace():
                 result.append(part)
             else:
-                new_part, changes = apply_citations_to_text(part, entries, applied)
+                new_part, changes = matcher.apply(part, applied)
                 result.append(new_part)
                 all_changes.extend(changes)
 
@@ -17,7 +17,7 @@ import subprocess
 import sys
 from pathlib import Path
 
-from lib import GRAMMAR_VALID_FIELDS, VALID_AXES_GRAMMAR, VALID_DIFFS
+from lib import validate_grammar
 
 REPO_ROOT = Path(__file__).parent
 QUESTIONS_JS = REPO_ROOT / "grammar" / "questions.js"
@@ -49,33 +49,10 @@ def load_staging():
     errors = []
     auto_fixed = []
     for i, q in enumerate(data):
-        missing = GRAMMAR_VALID_FIELDS - set(q.keys())
-        if missing:
-            errors.append(f"  [{i}] 必須フィールドが不足: {missing}")
-        if q.get("diff") not in VALID_DIFFS:
-            errors.append(f"  [{i}] diff が不正: {q.get('diff')}")
-        if q.get("axis") not in VALID_AXES_GRAMMAR:
-            errors.append(f"  [{i}] axis が不正: {q.get('axis')}")
-        if not isinstance(q.get("choices"), list) or len(q["choices"]) != 5:
-            errors.append(f"  [{i}] choices は5要素のリストが必要")
-        if not isinstance(q.get("tags"), list):
-            errors.append(f"  [{i}] tags はリストが必要")
-        if not isinstance(q.get("kp"), list) or len(q["kp"]) == 0:
-            errors.append(f"  [{i}] kp は1要素以上のリストが必要")
-
-        # answer === choices[0]
-        choices = q.get("choices", [])
-        if isinstance(choices, list) and len(choices) > 0:
-            if q.get("answer") != choices[0]:
-                original = q.get("answer", "")
-                if original in choices:
-                    idx = choices.index(original)
-                    choices[0], choices[idx] = choices[idx], choices[0]
-                    q["choices"] = choices
-                    auto_fixed.append(f"  [{i}] choices スワップ: [0]<->[{idx}]")
-                else:
-                    q["answer"] = choices[0]
-                    auto_fixed.append(f"  [{i}] answer 自動補正: \"{original}\" -> \"{choices[0]}\"")
+        q_errors, fixed = validate_grammar(q)
+        errors.extend(f"  [{i}] {e}" for e in q_errors)
+        if fixed:
+            auto_fixed.append(f"  [{i}] {fixed}")
 
     if auto_fixed:
         print("WARNING: answer/choices 自動補正:")
@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 """
 内部リンク追加スクリプト v2
-既存の関連記事セクション（pattern1/pattern2）に内部リンクを追記する
+既存の関連記事セクション（pattern1/pattern2）に内部リンクを追記する（無い記事には新しく作る）
+
+リンク先は related_articles.links_for（ARTICLE_LINKS のピン留め + 本文の類似度で選んだ記事）。
+記事の追加・削除があれば data/related_articles.json を作り直してから全記事に適用する。
 """
 import os
 import re
 
-BASE_DIR = '/Users/yusuke/projects/claude/native-real'
+import related_articles
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ARTICLES_DIR = os.path.join(BASE_DIR, 'articles')
 
-# ---------- リンクマッピング ----------
+# ---------- リンクマッピング（ピン留め。残りは related_articles が類似度で埋める） ----------
 ARTICLE_LINKS = {
     # TOEIC クラスター
     'toeic-600-study-plan': [
@@ -504,24 +509,15 @@ ARTICLE_LINKS = {
 }
 
 
-def process_article(slug, links):
-    """1記事に内部リンクを追加する。戻り値: 追加件数"""
-    file_path = os.path.join(ARTICLES_DIR, slug, 'index.html')
-    if not os.path.exists(file_path):
-        print(f'  [SKIP] ファイルが存在しない: {slug}')
-        return 0
-
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
+def add_links(content, links):
+    """関連記事セクションに未掲載のリンクを追記する。戻り値: (新しい HTML, 追加件数)。セクションが無ければ (content, None)"""
     # パターン判定
     if 'class="related-articles"' in content:
         pattern = 1
     elif 'class="related-posts"' in content or 'related-posts__list' in content:
         pattern = 2
     else:
-        print(f'  [SKIP] 関連記事セクションが見つからない: {slug}')
-        return 0
+        return content, None
 
     added = 0
     new_content = content
@@ -559,6 +555,47 @@ def process_article(slug, links):
                 new_content = new_content.replace(section, new_section, 1)
                 added += 1
 
+    return new_content, added
+
+
+def related_section(links):
+    """pattern1 の関連記事セクション（links: [(url, タイトル)]）"""
+    items = "".join(f'\n          <li><a href="{url}">{title}</a></li>' for url, title in links)
+    return f"""
+      <div class="related-articles">
+        <h3>関連記事</h3>
+        <ul class="related-list">{items}
+        </ul>
+      </div>"""
+
+
+def insert_section(content, links):
+    """関連記事セクションの無い記事に新しく作る（disclaimer → </main> → <footer> の直前）。
+    戻り値: (新しい HTML, 追加件数)。挿入位置が無ければ (content, None)"""
+    section = related_section(links)
+    for target, indent in (('<div class="disclaimer">', '\n      '), ('</main>', '\n    '), ('<footer>', '\n')):
+        if target in content:
+            return inject_style(content.replace(target, section + indent + target, 1)), len(links)
+    return content, None
+
+
+def process_article(slug, links):
+    """1記事に内部リンクを追加する。戻り値: 追加件数"""
+    file_path = os.path.join(ARTICLES_DIR, slug, 'index.html')
+    if not os.path.exists(file_path):
+        print(f'  [SKIP] ファイルが存在しない: {slug}')
+        return 0
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    new_content, added = add_links(content, links)
+    if added is None:
+        new_content, added = insert_section(content, links)
+    if added is None:
+        print(f'  [SKIP] 関連記事セクションの挿入位置が見つからない: {slug}')
+        return 0
+
     if added > 0:
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(new_content)
@@ -569,26 +606,32 @@ def process_article(slug, links):
     return added
 
 
-def main():
+def apply_related_links():
+    """関連記事グラフを最新にしてから全記事に内部リンクを追加する。戻り値: (処理記事数, 総追加リンク数)"""
+    if related_articles.ensure_current():
+        print(f'記事の追加・削除があったため {os.path.relpath(related_articles.RELATED_JSON, BASE_DIR)} を更新しました\n')
+
     total_added = 0
     processed = 0
+    for slug, _ in related_articles.article_pages():
+        links = related_articles.links_for(slug)
+        if not links:
+            continue
+        total_added += process_article(slug, links)
+        processed += 1
+    return processed, total_added
+
 
+def main():
     print('=== 内部リンク追加処理 開始 ===\n')
 
-    for slug, links in ARTICLE_LINKS.items():
-        added = process_article(slug, links)
-        total_added += added
-        processed += 1
+    processed, total_added = apply_related_links()
 
     print(f'\n=== 処理完了 ===')
     print(f'処理記事数: {processed}')
     print(f'総追加リンク数: {total_added}')
 
 
-if __name__ == '__main__':
-    main()
-
-
 # ---------- 旧バージョン: クラスター定義（未使用・参考用） ----------
 CLUSTERS = {
     "英会話入門・はじめかた": [
@@ -721,16 +764,7 @@ def build_related_map(topics: list) -> dict:
 
 
 def make_related_html(slug: str, related_slugs: list[str], slug_to_title: dict) -> str:
-    items = ""
-    for rs in related_slugs:
-        title = slug_to_title.get(rs, rs)
-        items += f'\n          <li><a href="/articles/{rs}/">{title}</a></li>'
-    return f"""
-      <div class="related-articles">
-        <h3>関連記事</h3>
-        <ul class="related-list">{items}
-        </ul>
-      </div>"""
+    return related_section([(f"/articles/{rs}/", slug_to_title.get(rs, rs)) for rs in related_slugs])
 
 
 def insert_related(html: str, related_html: str) -> tuple[str, bool]:
@@ -751,10 +785,16 @@ def inject_style(html: str) -> str:
     """<style>タグをhead内に追加（重複チェック）"""
     if "related-articles{" in html:
         return html
-    return html.replace("</style>", RELATED_HTML_STYLE + "\n    </style>", 1)
+    # 既存の <style> の中に入れるので、RELATED_HTML_STYLE の <style> タグは外す
+    rules = [line.strip() for line in RELATED_HTML_STYLE.splitlines() if line.strip() not in ("", "<style>", "</style>")]
+    return html.replace("</style>", "\n".join(rules) + "\n</style>", 1)
 
 
-def main():
+def main_clusters():
+    """旧バージョン（CLUSTERS から関連記事セクションを作る）。未使用・参考用"""
+    import json
+    from pathlib import Path
+
     data = json.loads(Path("data/article_topics.json").read_text())
     topics = data["topics"]
     slug_to_title = {t["slug"]: t["title"] for t in topics}
@@ -788,5 +828,5 @@ def main():
     print(f"\n完了: {updated}記事に関連記事を追加 / {skipped}記事はスキップ")
 
 
-if __name__ == "__main__":
+if __name__ == '__main__':
     main()
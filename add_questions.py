@@ -6,13 +6,13 @@ add_questions.py - staging.json の問題を自動処理して本番追加
   1. listening/staging.json 読み込み・バリデーション
   2. 現在の questions.js から問題数を取得
   3. 各問題に audio フィールドを付与（q{existing+n}.mp3）
-  4. edge-tts で MP3 生成
+  4. MP3 生成ジョブを tts_queue に積み、消化する（--async-audio なら積むだけ）
   5. questions.js 末尾の ]; の前に新問題を追記
   6. git add . && git commit && git push
+     （--async-audio のときは MP3 がまだ無いので commit / push しない。tts_queue.py work の後に手で行う）
   7. staging.json をクリア（空配列）
 """
 
-import asyncio
 import json
 import re
 import subprocess
@@ -24,16 +24,9 @@ QUESTIONS_JS = REPO_ROOT / "listening" / "questions.js"
 STAGING_JSON = REPO_ROOT / "listening" / "staging.json"
 AUDIO_DIR = REPO_ROOT / "listening" / "audio"
 
-# 5種音声ローテーション（edge-tts ボイス名）
-VOICES = [
-    "en-US-AriaNeural",      # US female
-    "en-GB-SoniaNeural",     # UK female
-    "en-US-GuyNeural",       # US male
-    "en-AU-NatashaNeural",   # AU female
-    "en-GB-RyanNeural",      # UK male
-]
-
-from lib import VALID_FIELDS, VALID_DIFFS
+from lib import mock_endpoints, validate_listening
+from tts_engine import rotate_voice
+import tts_queue
 
 
 def load_staging():
@@ -63,31 +56,10 @@ def load_staging():
     errors = []
     auto_fixed = []
     for i, q in enumerate(data):
-        missing = VALID_FIELDS - set(q.keys())
-        if missing:
-            errors.append(f"  [{i}] 必須フィールドが不足: {missing}")
-        if q.get("diff") not in VALID_DIFFS:
-            errors.append(f"  [{i}] diff が不正: {q.get('diff')}")
-        if not isinstance(q.get("choices"), list) or len(q["choices"]) != 5:
-            errors.append(f"  [{i}] choices は5要素のリストが必要")
-        if not isinstance(q.get("kp"), list) or len(q["kp"]) == 0:
-            errors.append(f"  [{i}] kp は1要素以上のリストが必要")
-        # answer === choices[0] を確認（最重要）
-        # 設計: 正解は常に choices[0]。JS が表示時にシャッフルするため順番は問題なし。
-        choices = q.get("choices", [])
-        if isinstance(choices, list) and len(choices) > 0:
-            if q.get("answer") != choices[0]:
-                original = q.get("answer", "")
-                # answer が choices 内に存在するならその位置と choices[0] をスワップ
-                if original in choices:
-                    idx = choices.index(original)
-                    choices[0], choices[idx] = choices[idx], choices[0]
-                    q["choices"] = choices
-                    auto_fixed.append(f"  [{i}] choices をスワップ: choices[0]↔choices[{idx}]（answer=\"{original}\"）")
-                else:
-                    # choices に存在しない場合は choices[0] に上書き
-                    q["answer"] = choices[0]
-                    auto_fixed.append(f"  [{i}] answer を自動補正: \"{original}\" → \"{choices[0]}\"")
+        q_errors, fixed = validate_listening(q)
+        errors.extend(f"  [{i}] {e}" for e in q_errors)
+        if fixed:
+            auto_fixed.append(f"  [{i}] {fixed}")
 
     if auto_fixed:
         print("WARNING: answer/choices 不整合を自動補正しました:")
@@ -112,17 +84,20 @@ def get_existing_count(content):
     return count
 
 
-async def generate_audio_async(text, voice, output_path):
-    """edge-tts で非同期 MP3 生成"""
-    import edge_tts
-
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(str(output_path))
-
-
-def generate_audio(text, voice, output_path):
-    """edge-tts で MP3 生成（同期ラッパー）"""
-    asyncio.run(generate_audio_async(text, voice, output_path))
+def audio_jobs(questions, existing_count):
+    """audio フィールド（q{existing+n}.mp3）を付与し、tts_engine 形式のジョブを返す"""
+    jobs = []
+    for i, q in enumerate(questions):
+        q_num = existing_count + i + 1
+        # ゼロパディング: 1-9 → q1、10-99 → q10、100以上 → q100 など（拡張子なし）
+        q["audio"] = f"audio/q{q_num}.mp3"
+        jobs.append({
+            "text": q["text"],
+            "path": REPO_ROOT / "listening" / q["audio"],
+            "voice": rotate_voice(i),
+            "label": q["audio"],
+        })
+    return jobs
 
 
 def format_question_js(q):
@@ -168,7 +143,11 @@ def append_to_questions_js(content, new_questions):
 
 
 def git_commit_push(n_added, total):
-    """git add . && git commit && git push"""
+    """git add . && git commit && git push（偽サーバーに向いているときは何もしない）"""
+    mock = mock_endpoints()
+    if mock:
+        print(f"{', '.join(mock)} が偽サーバーを指しているため commit / push しません")
+        return False
     cmds = [
         ["git", "-C", str(REPO_ROOT), "add", "."],
         [
@@ -187,6 +166,7 @@ def git_commit_push(n_added, total):
             sys.exit(1)
         if result.stdout:
             print(result.stdout.rstrip())
+    return True
 
 
 def main():
@@ -210,32 +190,18 @@ def main():
     questions_js_content = QUESTIONS_JS.read_text(encoding="utf-8")
     existing_count = get_existing_count(questions_js_content)
 
-    # 3. audio フィールドを付与
-    for i, q in enumerate(staging):
-        q_num = existing_count + i + 1
-        # ゼロパディング: 1-9 → q1、10-99 → q10、100以上 → q100 など（拡張子なし）
-        q["audio"] = f"audio/q{q_num}.mp3"
-
-    # 4. MP3 生成
-    print(f"\n音声生成開始: {len(staging)} 問")
-    for i, q in enumerate(staging):
-        voice = VOICES[i % len(VOICES)]
-        q_num = existing_count + i + 1
-        audio_filename = f"q{q_num}.mp3"
-        audio_path = AUDIO_DIR / audio_filename
-
-        if audio_path.exists():
-            print(f"  [{i+1}/{len(staging)}] スキップ（既存）: {audio_filename}")
-            continue
-
-        print(f"  [{i+1}/{len(staging)}] 生成中: {audio_filename} ({voice})")
-        print(f"    \"{q['text'][:50]}{'...' if len(q['text']) > 50 else ''}\"")
-
-        try:
-            generate_audio(q["text"], voice, audio_path)
-            print(f"    ✅ 生成完了")
-        except Exception as e:
-            print(f"    ERROR: 音声生成失敗: {e}", file=sys.stderr)
+    # 3. audio フィールドを付与 / 4. MP3 生成（キューに積んで消化。失敗分はキューに残り、再実行で続きから）
+    jobs = audio_jobs(staging, existing_count)
+    job_ids = tts_queue.enqueue(jobs, "listening")
+    async_audio = "--async-audio" in sys.argv
+    if async_audio:
+        print(f"\n音声ジョブ {len(jobs)} 件をキューに追加（python3 tts_queue.py work で生成）")
+    else:
+        print(f"\n音声生成開始: {len(staging)} 問")
+        _, failed = tts_queue.work(bank="listening", ids=job_ids)
+        if failed:
+            print(f"ERROR: 音声生成失敗 {failed} 件（python3 tts_queue.py status で確認、"
+                  "retry-failed 後に再実行）", file=sys.stderr)
             sys.exit(1)
 
     # 5. questions.js に追記
@@ -244,10 +210,15 @@ def main():
     total = existing_count + len(staging)
     print(f"✅ 追記完了（{existing_count} → {total} 問）")
 
-    # 6. git commit & push
-    print("\ngit commit & push...")
-    git_commit_push(len(staging), total)
-    print("✅ push 完了")
+    # 6. git commit & push（音声をキューに積んだだけなら、MP3 の無い問題を公開しないよう commit しない）
+    if async_audio:
+        print(f"\n音声が未生成のため commit / push しません。生成後に commit してください:\n"
+              f"  python3 tts_queue.py work --bank listening\n"
+              f"  git add listening/ && git commit -m \"Add {len(staging)} questions (total: {total})\" && git push")
+    else:
+        print("\ngit commit & push...")
+        if git_commit_push(len(staging), total):
+            print("✅ push 完了")
 
     # 7. staging.json をクリア
     STAGING_JSON.write_text("[]\n", encoding="utf-8")
@@ -4,9 +4,10 @@ add_words.py - words/staging.json の問題を questions.js に追加
 
 処理フロー:
   1. words/staging.json 読み込み・バリデーション
-  2. Edge TTS で MP3 音声を生成（5ボイスローテーション）
+  2. MP3 生成ジョブを tts_queue に積み、消化する（5ボイスローテーション。--async-audio なら積むだけ）
   3. words/questions.js 末尾に新問題を追記（audioフィールド付き）
   4. git add . && git commit && git push
+     （--async-audio のときは MP3 がまだ無いので commit / push しない。tts_queue.py work の後に手で行う）
   5. staging.json をクリア
 
 前提: check_questions.py --type words で PASS 済みであること
@@ -18,21 +19,15 @@ import subprocess
 import sys
 from pathlib import Path
 
-from lib import WORDS_VALID_FIELDS, VALID_AXES_WORDS, VALID_DIFFS
+from lib import mock_endpoints, validate_words
+from tts_engine import rotate_voice
+import tts_queue
 
 REPO_ROOT = Path(__file__).parent
 QUESTIONS_JS = REPO_ROOT / "words" / "questions.js"
 STAGING_JSON = REPO_ROOT / "words" / "staging.json"
 AUDIO_DIR = REPO_ROOT / "words" / "audio"
 
-VOICES = [
-    "en-US-AriaNeural",
-    "en-GB-SoniaNeural",
-    "en-US-GuyNeural",
-    "en-AU-NatashaNeural",
-    "en-GB-RyanNeural",
-]
-
 
 def load_staging():
     if not STAGING_JSON.exists():
@@ -55,29 +50,10 @@ def load_staging():
     errors = []
     auto_fixed = []
     for i, q in enumerate(data):
-        missing = WORDS_VALID_FIELDS - set(q.keys())
-        if missing:
-            errors.append(f"  [{i}] 必須フィールドが不足: {missing}")
-        if q.get("diff") not in VALID_DIFFS:
-            errors.append(f"  [{i}] diff が不正: {q.get('diff')}")
-        if q.get("axis") not in VALID_AXES_WORDS:
-            errors.append(f"  [{i}] axis が不正: {q.get('axis')}")
-        if not isinstance(q.get("choices"), list) or len(q["choices"]) != 4:
-            errors.append(f"  [{i}] choices は4要素のリストが必要")
-
-        # answer === choices[0] の自動補正
-        choices = q.get("choices", [])
-        if isinstance(choices, list) and len(choices) > 0:
-            if q.get("answer") != choices[0]:
-                original = q.get("answer", "")
-                if original in choices:
-                    idx = choices.index(original)
-                    choices[0], choices[idx] = choices[idx], choices[0]
-                    q["choices"] = choices
-                    auto_fixed.append(f"  [{i}] choices スワップ: [0]<->[{idx}]")
-                else:
-                    q["answer"] = choices[0]
-                    auto_fixed.append(f"  [{i}] answer 自動補正: \"{original}\" -> \"{choices[0]}\"")
+        q_errors, fixed = validate_words(q)
+        errors.extend(f"  [{i}] {e}" for e in q_errors)
+        if fixed:
+            auto_fixed.append(f"  [{i}] {fixed}")
 
     if auto_fixed:
         print("WARNING: answer/choices 自動補正:")
@@ -109,41 +85,34 @@ def get_next_audio_num():
     return max(nums) + 1 if nums else 1
 
 
-def generate_audio(questions, start_num):
-    """Edge TTS で音声生成"""
-    print(f"\n音声生成開始: {len(questions)} 問 (q{start_num:02d}〜)")
-    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
-
+def audio_jobs(questions, start_num):
+    """q{番号}.mp3 を割り当て（q["audio"] を設定）、tts_engine 形式のジョブを返す"""
+    jobs = []
     for i, q in enumerate(questions):
         num = start_num + i
-        voice = VOICES[(num - 1) % len(VOICES)]
         filename = f"q{num:02d}.mp3"
-        filepath = AUDIO_DIR / filename
-
         q["audio"] = f"audio/{filename}"
+        jobs.append({
+            "text": q["text"],
+            "path": AUDIO_DIR / filename,
+            "voice": rotate_voice(num - 1),
+            "label": q["audio"],
+        })
+    return jobs
 
-        if filepath.exists():
-            print(f"  [{i+1}/{len(questions)}] SKIP {filename} (exists)")
-            continue
-
-        for attempt in range(3):
-            try:
-                result = subprocess.run(
-                    ["edge-tts", "--voice", voice, "--text", q["text"], "--write-media", str(filepath)],
-                    capture_output=True, text=True, timeout=60,
-                )
-                if result.returncode == 0:
-                    print(f"  [{i+1}/{len(questions)}] OK {filename} ({voice})")
-                    break
-                else:
-                    print(f"  [{i+1}/{len(questions)}] ERROR {filename}: {result.stderr[:100]}")
-                    break
-            except subprocess.TimeoutExpired:
-                if attempt < 2:
-                    print(f"  [{i+1}/{len(questions)}] TIMEOUT {filename}, retry {attempt+2}/3...")
-                    import time; time.sleep(2)
-                else:
-                    print(f"  [{i+1}/{len(questions)}] TIMEOUT {filename} (skipped after 3 attempts)")
+
+def generate_audio(questions, start_num):
+    """音声ジョブをキューに積んで消化（失敗分はキューに残り tts_queue.py work で再開できる）"""
+    print(f"\n音声生成開始: {len(questions)} 問 (q{start_num:02d}〜)")
+    AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+
+    jobs = audio_jobs(questions, start_num)
+    job_ids = tts_queue.enqueue(jobs, "words")
+    if "--async-audio" in sys.argv:
+        print(f"音声ジョブ {len(jobs)} 件をキューに追加（python3 tts_queue.py work で生成）")
+        return questions
+    done, failed = tts_queue.work(bank="words", ids=job_ids)
+    print(f"音声: 生成 {done} / 失敗 {failed}")
 
     return questions
 
@@ -179,8 +148,11 @@ def format_question_js(q):
     return "  { " + ", ".join(parts) + " }"
 
 
-def append_to_questions_js(questions):
-    """questions.jsに問題を追記"""
+def append_to_questions_js(questions, old_count=None):
+    """questions.jsに問題を追記し、追記後の問題数を返す
+
+    old_count: 追記前の問題数が分かっていれば渡す（questions.js の再走査を省く）
+    """
     content = QUESTIONS_JS.read_text(encoding="utf-8")
 
     new_lines = ",\n".join(format_question_js(q) for q in questions)
@@ -189,7 +161,8 @@ def append_to_questions_js(questions):
     content = content.replace("\n];", f",\n{new_lines}\n];")
 
     # コメントの問題数を更新
-    old_count = get_existing_count()
+    if old_count is None:
+        old_count = get_existing_count()
     new_count = old_count + len(questions)
     content = re.sub(
         r'// questions\.js — \d+ questions',
@@ -199,10 +172,15 @@ def append_to_questions_js(questions):
 
     QUESTIONS_JS.write_text(content, encoding="utf-8")
     print(f"\nquestions.js に {len(questions)} 問を追加（合計 {new_count} 問）")
+    return new_count
 
 
 def git_push(count):
-    """git add, commit, push"""
+    """git add, commit, push（偽サーバーに向いているときは何もしない）"""
+    mock = mock_endpoints()
+    if mock:
+        print(f"\n{', '.join(mock)} が偽サーバーを指しているため commit / push しません")
+        return
     print("\ngit push...")
     subprocess.run(["git", "add", "-A"], cwd=REPO_ROOT, check=True)
     msg = f"WordsUp: {count}問追加（品質チェック済み）"
@@ -224,8 +202,13 @@ def main():
     # staging.json をクリア
     STAGING_JSON.write_text("[]", encoding="utf-8")
 
-    # git push
-    git_push(len(questions))
+    # git push（音声をキューに積んだだけなら、MP3 の無い問題を公開しないよう commit しない）
+    if "--async-audio" in sys.argv:
+        print(f"\n音声が未生成のため commit / push しません。生成後に commit してください:\n"
+              f"  python3 tts_queue.py work --bank words\n"
+              f"  git add words/ && git commit -m \"WordsUp: {len(questions)}問追加（品質チェック済み）\" && git push")
+    else:
+        git_push(len(questions))
 
 
 if __name__ == "__main__":
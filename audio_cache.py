@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""audio_cache.py - (テキスト, ボイス, 話速) をキーにした音声 blob ストア
+
+同じ文字列・同じボイスの音声は一度だけ合成し、各バンクの音声パスは
+ストア内の blob へのハードリンクにする（別ファイルシステムならコピー）。
+
+  .tts_cache/blobs/ab/abcdef....mp3            音声本体
+  .tts_cache/blobs/ab/abcdef....<Boundary>.json 境界イベント（取得した場合のみ）
+
+Usage:
+  python3 audio_cache.py stats                       # ストアの件数・容量
+  python3 audio_cache.py dedup words listening ...   # 同一内容の音声をハードリンクで共有
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import unicodedata
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent
+CACHE_DIR = Path(os.environ.get("TTS_CACHE_DIR", REPO_ROOT / ".tts_cache"))
+BLOB_DIR = CACHE_DIR / "blobs"
+
+# dedup の対象ディレクトリ（既定）
+AUDIO_ROOTS = ["words", "listening", "sync", "kioku-shinai", "phonics"]
+
+
+def normalize_text(text):
+    """キャッシュキー用の正規化（NFC・前後空白除去・連続空白の畳み込み）"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(text, voice, rate="", extra=""):
+    """正規化テキスト・ボイス・話速（+バックエンド固有の区別）から sha256 キーを作る"""
+    raw = "\x1f".join([normalize_text(text), voice or "", rate or "", extra or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def blob_path(key, suffix=".mp3"):
+    return BLOB_DIR / key[:2] / f"{key}{suffix}"
+
+
+def _boundary_path(key, boundary):
+    return blob_path(key, f".{boundary}.json")
+
+
+def lookup(key, boundary=None):
+    """キャッシュヒットなら (blob パス, 境界イベント or None)、なければ None
+
+    boundary を指定した場合は境界イベントも揃っているときだけヒット扱い。
+    """
+    blob = blob_path(key)
+    if not blob.exists() or blob.stat().st_size == 0:
+        return None
+    if not boundary:
+        return blob, None
+    bpath = _boundary_path(key, boundary)
+    if not bpath.exists():
+        return None
+    return blob, json.loads(bpath.read_text(encoding="utf-8"))
+
+
+def atomic_write_bytes(path, data):
+    """一時ファイルに書いてから置き換える（途中で落ちても壊れたファイルを残さない）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def store(key, audio, boundary=None, boundaries=None, overwrite=False):
+    """音声（と境界イベント）をストアに保存して blob パスを返す"""
+    blob = blob_path(key)
+    if overwrite or not blob.exists():
+        atomic_write_bytes(blob, audio)
+    if boundary and boundaries is not None:
+        data = json.dumps(boundaries, ensure_ascii=False, separators=(",", ":"))
+        atomic_write_bytes(_boundary_path(key, boundary), data.encode("utf-8"))
+    return blob
+
+
+def link_into(blob, dest):
+    """blob を dest にハードリンクで配置（既存ファイルは置き換え）
+
+    リンクできない環境（別デバイス等）ではコピーにフォールバックする。
+    dest は常に一時ファイル経由で置き換えるので、blob 側が上書きされることはない。
+    """
+    blob, dest = Path(blob), Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() and os.path.samefile(blob, dest):
+        return
+    tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+    try:
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def dedup(roots):
+    """roots 配下の同一内容 MP3 をハードリンクで1実体にまとめる。(まとめた数, 削減バイト) を返す"""
+    by_size = {}
+    for root in roots:
+        for path in Path(root).rglob("*.mp3"):
+            if path.is_file():
+                by_size.setdefault(path.stat().st_size, []).append(path)
+
+    merged = saved = 0
+    for size, paths in by_size.items():
+        if size == 0 or len(paths) < 2:
+            continue
+        first_by_digest = {}
+        for path in paths:
+            digest = _file_digest(path)
+            first = first_by_digest.setdefault(digest, path)
+            if first is path or os.path.samefile(first, path):
+                continue
+            link_into(first, path)
+            merged += 1
+            saved += size
+    return merged, saved
+
+
+def stats():
+    count = size = 0
+    if BLOB_DIR.exists():
+        for path in BLOB_DIR.rglob("*.mp3"):
+            count += 1
+            size += path.stat().st_size
+    return count, size
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "stats":
+        count, size = stats()
+        print(f"{BLOB_DIR}: {count} blobs / {size / 1e6:.1f} MB")
+    elif cmd == "dedup":
+        roots = [REPO_ROOT / r for r in (sys.argv[2:] or AUDIO_ROOTS)]
+        merged, saved = dedup([r for r in roots if r.exists()])
+        print(f"dedup: {merged} ファイルをハードリンク化 / {saved / 1e6:.1f} MB 削減")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
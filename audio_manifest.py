@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+audio_manifest.py - 音声ファイルのマニフェスト生成・整合性チェック
+
+全バンクの音声ファイルについて バイト数・再生時間・sha256・参照元の問題ID を記録し、
+次の不整合を報告する:
+  - orphan : どの問題からも参照されていないファイル
+  - missing: 問題が参照しているのに存在しないファイル
+  - broken : 0バイト / MP3 として解釈できない / 末尾フレームが欠けている（タイムアウト等）
+
+前回のマニフェストと mtime・サイズが同じファイルは再ハッシュしない。
+変更ファイルの解析はプロセスプールで並列に行う。
+
+Usage:
+  python3 audio_manifest.py                   # マニフェスト更新 + レポート
+  python3 audio_manifest.py --bank words      # 特定バンクのみ
+  python3 audio_manifest.py --queue-repairs   # missing/broken の再生成ジョブを repair_queue.json に書き出す
+  python3 audio_manifest.py --repair          # 書き出したうえで tts_engine で即再生成
+  python3 audio_manifest.py --strict          # 不整合があれば exit 1（デプロイ前チェック用）
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from audio_cache import CACHE_DIR, atomic_write_bytes
+
+REPO_ROOT = Path(__file__).parent
+MANIFEST_PATH = CACHE_DIR / "audio_manifest.json"
+REPAIR_QUEUE_PATH = CACHE_DIR / "repair_queue.json"
+
+# transcode_audio.py / pack_audio.py が書く派生ファイル（マニフェストの対象外）
+DERIVED_SUFFIXES = (".lo.mp3",)
+DERIVED_DIRS = ("packs",)
+
+# ─────────────────────────────────────────
+# MP3 フレーム解析（ffprobe 不要の最小実装。Layer III のみ）
+# ─────────────────────────────────────────
+_BITRATES_V1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _frame_info(data, pos):
+    """pos が有効な Layer III フレームヘッダなら (フレーム長, サンプル数, サンプルレート)"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2 = data[pos + 1], data[pos + 2]
+    version = (b1 >> 3) & 3
+    layer = (b1 >> 1) & 3
+    br_idx = b2 >> 4
+    sr_idx = (b2 >> 2) & 3
+    if version == 1 or layer != 1 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    sample_rate = _SAMPLE_RATES[version][sr_idx]
+    padding = (b2 >> 1) & 1
+    if version == 3:
+        bitrate = _BITRATES_V1[br_idx] * 1000
+        return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+    bitrate = _BITRATES_V2[br_idx] * 1000
+    return 72 * bitrate // sample_rate + padding, 576, sample_rate
+
+
+def mp3_frames(data):
+    """MP3 のフレーム列を走査し (status, [(位置, 長さ, サンプル数, サンプルレート), ...]) を返す
+
+    status は ok / empty / undecodable / truncated。ID3v2 / ID3v1 タグは読み飛ばす。
+    """
+    if not data:
+        return "empty", []
+    pos = 0
+    end = len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        pos = 10 + size + (10 if data[5] & 0x10 else 0)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+
+    frames = []
+    while pos < end:
+        info = _frame_info(data, pos)
+        if info is None:
+            if frames:
+                # フレーム列の途中で壊れている（末尾の数バイトのゴミは許容）
+                return ("truncated" if end - pos > 4 else "ok"), frames
+            nxt = data.find(b"\xff", pos + 1, end)
+            if nxt < 0:
+                break
+            pos = nxt
+            continue
+        length, samples, sample_rate = info
+        if pos + length > end:
+            return "truncated", frames
+        frames.append((pos, length, samples, sample_rate))
+        pos += length
+    if not frames:
+        return "undecodable", []
+    return "ok", frames
+
+
+def probe_mp3(data):
+    """(status, 再生秒数) を返す"""
+    status, frames = mp3_frames(data)
+    return status, round(sum(samples / rate for _, _, samples, rate in frames), 3)
+
+
+def analyze_file(path):
+    """1ファイルを読み、(sha256, status, 秒数) を返す（プロセスプールから呼ばれる）"""
+    data = Path(path).read_bytes()
+    status, duration = probe_mp3(data)
+    return hashlib.sha256(data).hexdigest(), status, duration
+
+
+# ─────────────────────────────────────────
+# バンク別の参照（問題ID → 音声パス）
+# ─────────────────────────────────────────
+_JS_STR = r'"((?:[^"\\]|\\.)*)"'
+
+
+def _unescape(s):
+    return json.loads(f'"{s}"')
+
+
+def _rel(path):
+    return Path(path).relative_to(REPO_ROOT).as_posix()
+
+
+def refs_from_questions_js(bank):
+    """listening / words: questions.js の1行1問から audio と text を取り出す（ID は bank#通し番号）"""
+    js = REPO_ROOT / bank / "questions.js"
+    refs = {}
+    if not js.exists():
+        return refs
+    n = 0
+    for line in js.read_text(encoding="utf-8").split("\n"):
+        audio_m = re.search(r'\baudio:\s*' + _JS_STR, line)
+        if not audio_m:
+            continue
+        n += 1
+        text_m = re.search(r'\btext:\s*' + _JS_STR, line)
+        path = _rel(REPO_ROOT / bank / _unescape(audio_m.group(1)))
+        refs.setdefault(path, []).append({
+            "id": f"{bank}#{n}",
+            "text": _unescape(text_m.group(1)) if text_m else None,
+        })
+    return refs
+
+
+def refs_sync():
+    """sync: passages.json（lv{n}_{i}）と passages_readup.json（pid）"""
+    refs = {}
+    audio_dir = REPO_ROOT / "sync" / "audio"
+    passages = REPO_ROOT / "sync" / "passages.json"
+    if passages.exists():
+        for level, items in json.loads(passages.read_text(encoding="utf-8")).items():
+            for i in range(len(items)):
+                key = f"lv{level}_{i}"
+                refs.setdefault(_rel(audio_dir / f"{key}.mp3"), []).append({"id": f"sync#{key}", "text": None})
+    readup = REPO_ROOT / "sync" / "passages_readup.json"
+    if readup.exists():
+        for items in json.loads(readup.read_text(encoding="utf-8")).values():
+            for item in items:
+                pid = item["pid"]
+                refs.setdefault(_rel(audio_dir / f"{pid}.mp3"), []).append({"id": f"sync#{pid}", "text": None})
+    return refs
+
+
+def refs_kioku_shinai():
+    """kioku-shinai: 語根グループ JSON の各単語 → audio/{word}/word.mp3"""
+    refs = {}
+    root = REPO_ROOT / "kioku-shinai"
+    for jf in sorted((root / "data" / "words").glob("*.json")):
+        data = json.loads(jf.read_text(encoding="utf-8"))
+        for w in data["words"]:
+            path = _rel(root / "audio" / w["word"] / "word.mp3")
+            refs.setdefault(path, []).append({"id": f"kioku-shinai#{data['root']}/{w['word']}", "text": w["word"]})
+    return refs
+
+
+def _literal_assign(source, name):
+    """スクリプトを import せずにトップレベル代入のリテラル部分だけを取り出す"""
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == name for t in node.targets):
+            for sub in ast.walk(node.value):
+                if isinstance(sub, (ast.List, ast.Dict)):
+                    return ast.literal_eval(sub)
+    return None
+
+
+def refs_phonics():
+    """phonics: 生成スクリプトの WORDS と PHONEME_MAP（index.html はそこから組み立てたファイル名で再生する）"""
+    refs = {}
+    audio_dir = REPO_ROOT / "phonics" / "audio"
+    scripts = REPO_ROOT / "scripts"
+    words = _literal_assign((scripts / "generate_phonics_audio.py").read_text(encoding="utf-8"), "WORDS") or []
+    for w in sorted(set(words)):
+        filename = w.lower().replace(" ", "_") + ".mp3"
+        refs.setdefault(_rel(audio_dir / filename), []).append({"id": f"phonics#{w}", "text": w})
+    phonemes = _literal_assign((scripts / "generate_phonics_phonemes.py").read_text(encoding="utf-8"), "PHONEME_MAP") or {}
+    for letter in phonemes:
+        # phoneme は Google TTS 製なので自動修復の対象外（text=None）
+        refs.setdefault(_rel(audio_dir / f"phoneme_{letter}.mp3"), []).append({"id": f"phonics#phoneme_{letter}", "text": None})
+    return refs
+
+
+BANKS = {
+    "listening": {"audio_dir": "listening/audio", "refs": lambda: refs_from_questions_js("listening")},
+    "words": {"audio_dir": "words/audio", "refs": lambda: refs_from_questions_js("words")},
+    "sync": {"audio_dir": "sync/audio", "refs": refs_sync},
+    "kioku-shinai": {"audio_dir": "kioku-shinai/audio", "refs": refs_kioku_shinai},
+    "phonics": {"audio_dir": "phonics/audio", "refs": refs_phonics},
+}
+
+
+# ─────────────────────────────────────────
+# マニフェスト
+# ─────────────────────────────────────────
+def load_manifest():
+    if MANIFEST_PATH.exists():
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    return {"files": {}}
+
+
+def save_manifest(manifest):
+    data = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    atomic_write_bytes(MANIFEST_PATH, data.encode("utf-8"))
+
+
+def build_manifest(banks, workers=None):
+    """マニフェストを更新し、(manifest, refs, 再解析したファイル数) を返す"""
+    previous = load_manifest()["files"]
+    files = {}
+    refs = {}
+    to_analyze = []
+
+    for bank in banks:
+        cfg = BANKS[bank]
+        bank_refs = cfg["refs"]()
+        refs.update(bank_refs)
+        audio_dir = REPO_ROOT / cfg["audio_dir"]
+        if not audio_dir.exists():
+            continue
+        for path in audio_dir.rglob("*.mp3"):
+            if path.name.endswith(DERIVED_SUFFIXES):
+                continue
+            if any(part in DERIVED_DIRS for part in path.relative_to(audio_dir).parts[:-1]):
+                continue
+            st = path.stat()
+            rel = _rel(path)
+            entry = {
+                "bank": bank,
+                "bytes": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "refs": [r["id"] for r in bank_refs.get(rel, [])],
+            }
+            old = previous.get(rel)
+            if old and old["bytes"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                entry.update(sha256=old["sha256"], status=old["status"], duration=old["duration"])
+            else:
+                to_analyze.append(rel)
+            files[rel] = entry
+
+    if to_analyze:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = [str(REPO_ROOT / rel) for rel in to_analyze]
+            chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 8))
+            for rel, (digest, status, duration) in zip(to_analyze, pool.map(analyze_file, paths, chunksize=chunksize)):
+                files[rel].update(sha256=digest, status=status, duration=duration)
+
+    # 今回スキャンしなかったバンクの既存エントリは残す
+    for rel, entry in previous.items():
+        if entry.get("bank") not in banks:
+            files.setdefault(rel, entry)
+
+    return {"files": files}, refs, len(to_analyze)
+
+
+def find_problems(manifest, refs, banks):
+    """(orphans, missing, broken) のパスリストを返す"""
+    files = {rel: e for rel, e in manifest["files"].items() if e["bank"] in banks}
+    orphans = sorted(rel for rel, e in files.items() if not e["refs"])
+    missing = sorted(rel for rel in refs if rel not in files)
+    broken = sorted(rel for rel, e in files.items() if e["status"] != "ok")
+    return orphans, missing, broken
+
+
+def repair_jobs(paths, refs):
+    """missing/broken の再生成ジョブ（tts_engine 形式。パスは repo 相対）"""
+    from tts_engine import VOICES, rotate_voice
+
+    kioku_script = REPO_ROOT / "kioku-shinai" / "generate_audio.py"
+    kioku_voices = _literal_assign(kioku_script.read_text(encoding="utf-8"), "VOICES")
+    kioku_order = {rel: i for i, rel in enumerate(r for r in refs if r.startswith("kioku-shinai/"))}
+
+    jobs = []
+    skipped = []
+    for rel in paths:
+        ref = next((r for r in refs.get(rel, []) if r["text"]), None)
+        if ref is None:
+            skipped.append(rel)
+            continue
+        if rel.startswith("kioku-shinai/"):
+            voice = rotate_voice(kioku_order[rel], kioku_voices)
+        elif rel.startswith("phonics/"):
+            voice = "en-US-AriaNeural"
+        else:
+            m = re.search(r'q(\d+)\.mp3$', rel)
+            voice = rotate_voice(int(m.group(1)) - 1) if m else VOICES[0]
+        jobs.append({"text": ref["text"], "path": rel, "voice": voice, "label": ref["id"]})
+    return jobs, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音声マニフェスト生成・整合性チェック")
+    parser.add_argument("--bank", choices=list(BANKS), action="append", help="対象バンク（複数指定可。省略時は全バンク）")
+    parser.add_argument("--workers", type=int, default=None, help="解析プロセス数（デフォルト: CPU数）")
+    parser.add_argument("--queue-repairs", action="store_true",
+                        help="missing/broken の再生成ジョブを書き出す（tts_queue.py enqueue-repairs で積める）")
+    parser.add_argument("--repair", action="store_true", help="再生成ジョブを書き出して即実行する")
+    parser.add_argument("--strict", action="store_true", help="不整合があれば exit 1")
+    parser.add_argument("--verbose", action="store_true", help="該当ファイルをすべて表示")
+    args = parser.parse_args()
+
+    banks = args.bank or list(BANKS)
+    manifest, refs, analyzed = build_manifest(banks, args.workers)
+    save_manifest(manifest)
+
+    files = [e for e in manifest["files"].values() if e["bank"] in banks]
+    total_bytes = sum(e["bytes"] for e in files)
+    total_sec = sum(e["duration"] for e in files)
+    print(f"マニフェスト: {len(files)} ファイル / {total_bytes / 1e6:.1f} MB / {total_sec / 3600:.1f} 時間"
+          f"（再解析 {analyzed} 件）→ {MANIFEST_PATH}")
+
+    orphans, missing, broken = find_problems(manifest, refs, banks)
+    for label, paths in (("orphan", orphans), ("missing", missing), ("broken", broken)):
+        print(f"  {label:8s}: {len(paths)}")
+        for rel in paths if args.verbose else paths[:10]:
+            status = manifest["files"][rel]["status"] if rel in manifest["files"] else ""
+            print(f"    {rel} {status}")
+        if not args.verbose and len(paths) > 10:
+            print(f"    ...他 {len(paths) - 10} 件（--verbose で全件表示）")
+
+    if args.queue_repairs or args.repair:
+        jobs, skipped = repair_jobs(missing + broken, refs)
+        atomic_write_bytes(REPAIR_QUEUE_PATH, json.dumps(jobs, ensure_ascii=False, indent=2).encode("utf-8"))
+        print(f"\n再生成ジョブ {len(jobs)} 件 → {REPAIR_QUEUE_PATH}")
+        if skipped:
+            print(f"  自動修復できないファイル {len(skipped)} 件（sync は generate_audio_readup.py、phoneme は generate_phonics_phonemes.py で再生成）")
+        if args.repair and jobs:
+            from tts_engine import summarize, synthesize
+
+            for job in jobs:
+                job["path"] = REPO_ROOT / job["path"]
+            # 壊れたファイルは blob 自体が壊れている可能性があるのでキャッシュも作り直す
+            generated, _, failed = summarize(synthesize(jobs, skip_existing=False, refresh_cache=True))
+            print(f"再生成: {generated} 件 / 失敗 {len(failed)} 件")
+
+    if args.strict and (missing or broken):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
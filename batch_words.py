@@ -6,36 +6,49 @@ batch_words.py - WordsUp 問題を目標数まで自動バッチ生成・チェ
   python3 batch_words.py --target 5000
   python3 batch_words.py --target 5000 --batch-size 200
   python3 batch_words.py --target 5000 --skip-check  # チェックスキップ（非推奨）
-
-処理フロー（1バッチごと）:
-  1. generate_words.py で問題生成 → staging.json
-  2. check_questions.py で品質チェック
-  3. FAILした問題を除外
-  4. add_words.py で MP3生成 → questions.js追記 → git push
-  5. 目標数に到達するまで繰り返し
+  python3 batch_words.py --target 5000 --gen-workers 3 --check-workers 3 --tts-workers 2
+  python3 batch_words.py --target 5000 --no-push     # questions.js 更新まで（commit / push しない）
+
+処理フロー（1プロセス内のパイプライン。各ステージは容量制限付きキューでつながり並行に動く）:
+  1. generate  : Claude API で問題生成（generate_words.generate_batch、1回 BATCH_SIZE 問）
+  2. prefilter : ローカル検査（必須フィールド・answer 補正・重複・word が text に含まれるか）
+  3. check     : check_questions.run_check で品質チェック、severity=FAIL の問題を除外
+  4. tts       : q番号を割り当てて tts_queue に積み、消化する。MP3 を作れなかった問題は除外する
+  5. append    : questions.js に追記。--batch-size 問ごとに commit + push（チェックポイント）
+                 --no-push のとき、または偽サーバー（bench/mock_servers.py）に向いているときは
+                 commit / push しない
+
+下流が詰まると上流はキュー待ちで止まるので、全体の所要時間はおおよそ最も遅いステージで決まる。
+生成済み + パイプライン内の問題数が目標に達したら生成を止め、除外で不足したら再開する。
+各ステージ・API 呼び出し・音声・git の span は pipeline_trace の trace に記録される
+（集計: python3 pipeline_trace.py report --script batch_words）。
 """
 
 import argparse
-import json
+import asyncio
+import os
 import re
 import subprocess
-import sys
 import time
+from contextlib import contextmanager
 from pathlib import Path
 
+import anthropic
+
+from add_words import (AUDIO_DIR, QUESTIONS_JS, append_to_questions_js, audio_jobs,
+                       get_existing_count, get_next_audio_num)
+from lib import mock_endpoints, validate_words
+from generate_words import DEFAULT_MODEL, EXCLUDE_LIMIT, BATCH_SIZE, generate_batch, load_existing_words
+import pipeline_trace as trace
+import tts_queue
+
 REPO_ROOT = Path(__file__).parent
-QUESTIONS_JS = REPO_ROOT / "words" / "questions.js"
-STAGING_JSON = REPO_ROOT / "words" / "staging.json"
-CHECK_RESULT = REPO_ROOT / "check_result_words.json"
 LOG_FILE = REPO_ROOT / "batch_words.log"
 
-
-def get_current_count():
-    """questions.js の現在の問題数を取得"""
-    if not QUESTIONS_JS.exists():
-        return 0
-    content = QUESTIONS_JS.read_text(encoding="utf-8")
-    return len(re.findall(r'\bword:', content))
+LV_RATIOS = [0.25, 0.30, 0.25, 0.15, 0.05]
+QUEUE_SIZE = 4          # ステージ間キューの容量（チャンク数）
+GENERATE_RETRY_SEC = 10
+DONE = None             # キュー終端の目印
 
 
 def log(msg):
@@ -47,144 +60,277 @@ def log(msg):
         f.write(line + "\n")
 
 
-def run_generate(count, model="claude-sonnet-4-6"):
-    """問題生成"""
-    log(f"生成開始: {count}問")
-    result = subprocess.run(
-        ["python3", "generate_words.py", "--count", str(count), "--model", model],
-        cwd=REPO_ROOT,
-        capture_output=True, text=True, timeout=3600,
-    )
-    if result.returncode != 0:
-        log(f"生成エラー: {result.stderr[:500]}")
-        return False
-    log(f"生成完了")
-    print(result.stdout[-500:] if len(result.stdout) > 500 else result.stdout)
-    return True
-
-
-def run_check():
-    """品質チェック"""
-    log("品質チェック開始...")
-    result = subprocess.run(
-        ["python3", "check_questions.py", "--type", "words"],
-        cwd=REPO_ROOT,
-        capture_output=True, text=True, timeout=3600,
-    )
-    print(result.stdout[-1000:] if len(result.stdout) > 1000 else result.stdout)
-
-    if result.returncode == 0:
-        log("全問 PASS")
-        return True
-
-    # FAILした問題を除外
-    log("FAILした問題を除外中...")
-    if not CHECK_RESULT.exists():
-        log("WARNING: check_result_words.json が見つかりません。全問維持します。")
-        return True
-
-    check_results = json.loads(CHECK_RESULT.read_text(encoding="utf-8"))
-    # severity=FAIL の issue がある問題のみ除外（WARNのみは保持）
-    fail_indices = set()
-    for r in check_results:
-        has_critical = any(
-            issue.get("severity") == "FAIL"
-            for issue in r.get("issues", [])
-        )
-        if has_critical:
-            fail_indices.add(r["index"])
-
-    if not fail_indices:
-        return True
-
-    staging = json.loads(STAGING_JSON.read_text(encoding="utf-8"))
-    original_count = len(staging)
-    staging = [q for i, q in enumerate(staging) if i not in fail_indices]
-    removed = original_count - len(staging)
-    log(f"  {removed}問を除外（{len(staging)}問残り）")
-
-    STAGING_JSON.write_text(json.dumps(staging, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    if not staging:
-        log("WARNING: 全問FAILのため、このバッチはスキップ")
-        return False
-
-    return True
-
-
-def run_add():
-    """MP3生成 + questions.js追記 + git push"""
-    log("add_words.py 実行中...")
-    result = subprocess.run(
-        ["python3", "add_words.py"],
-        cwd=REPO_ROOT,
-        capture_output=True, text=True, timeout=7200,  # 音声生成に時間がかかる
-    )
-    if result.returncode != 0:
-        log(f"add_words.py エラー: {result.stderr[:500]}")
-        print(result.stdout[-500:] if len(result.stdout) > 500 else result.stdout)
-        return False
-    print(result.stdout[-500:] if len(result.stdout) > 500 else result.stdout)
-    log("add_words.py 完了")
-    return True
+def lv_counts(count):
+    """難易度配分: 25% / 30% / 25% / 15% / 5%（端数は lv3 に）"""
+    lv = [round(count * r) for r in LV_RATIOS]
+    lv[2] = max(0, lv[2] + count - sum(lv))
+    return lv
+
+
+def _norm_word(word):
+    return re.sub(r"\s+", " ", word.strip().lower())
+
+
+def prefilter_reason(q, seen_words):
+    """API を使わないチェック。除外理由（問題なければ None）を返す。q の answer はその場で補正する"""
+    errors, _ = validate_words(q)
+    if errors:
+        return errors[0]
+    word = _norm_word(q["word"])
+    if word in seen_words:
+        return "重複"
+    if word not in q["text"].lower():
+        return "word が text に含まれない"
+    if len(set(q["choices"])) != len(q["choices"]):
+        return "choices に重複"
+    return None
+
+
+class Pipeline:
+    def __init__(self, args):
+        self.args = args
+        self.count = get_existing_count()            # questions.js の走査は起動時の1回だけ
+        self.start_count = self.count
+        self.next_audio = get_next_audio_num()
+        self.existing_words = load_existing_words()
+        self.seen = {_norm_word(w) for w in self.existing_words}
+        self.new_words = []
+        self.in_flight = 0                           # 生成済みで追記前の問題数
+        self.since_commit = []                       # 前回チェックポイント以降に追記した問題
+        self.room = asyncio.Condition()
+        self.finished = asyncio.Event()
+        self.stats = {}
+
+    # ── 共通 ─────────────────────────────────
+    @contextmanager
+    def _stage(self, stage, n):
+        """チャンク1つ分の処理を計測する（report 用の集計と trace の span）。通過件数は sp.set(out=k)"""
+        with trace.span(stage, items=n) as sp:
+            yield sp
+        s = self.stats.setdefault(stage, {"chunks": 0, "items": 0, "busy": 0.0})
+        s["chunks"] += 1
+        s["items"] += sp.fields["items"]
+        s["busy"] += sp.wall
+
+    async def _drop(self, n):
+        """除外した問題の分だけ生成枠を空ける"""
+        if not n:
+            return
+        async with self.room:
+            self.in_flight -= n
+            self.room.notify_all()
+
+    def _remaining(self):
+        return self.args.target - self.count - self.in_flight
+
+    # ── ステージ ──────────────────────────────
+    async def generate(self, out_q):
+        client = trace.instrument(anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY")))
+        while not self.finished.is_set():
+            async with self.room:
+                await self.room.wait_for(lambda: self._remaining() > 0 or self.finished.is_set())
+                if self.finished.is_set():
+                    return
+                n = min(BATCH_SIZE, self._remaining())
+                self.in_flight += n
+            exclude = (self.existing_words + self.new_words)[-EXCLUDE_LIMIT:]
+            with self._stage("generate", n) as sp:
+                try:
+                    questions = await asyncio.to_thread(
+                        generate_batch, client, n, lv_counts(n), exclude, self.args.model)
+                except Exception as e:
+                    questions = []
+                    sp.set(ok=False, error=str(e)[:200])
+                    log(f"生成エラー: {str(e)[:300]}")
+                questions = questions[:n]
+                sp.set(items=len(questions), requested=n)
+            await self._drop(n - len(questions))
+            if not questions:
+                log(f"生成に失敗。{GENERATE_RETRY_SEC}秒待って再試行...")
+                await asyncio.sleep(GENERATE_RETRY_SEC)
+                continue
+            self.new_words.extend(q.get("word", "") for q in questions)
+            await out_q.put(questions)
+
+    async def prefilter(self, in_q, out_q):
+        while (chunk := await in_q.get()) is not DONE:
+            with self._stage("prefilter", len(chunk)) as sp:
+                kept = []
+                for q in chunk:
+                    reason = prefilter_reason(q, self.seen)
+                    if reason:
+                        log(f"  prefilter 除外: {q.get('word', '?')}（{reason}）")
+                        continue
+                    self.seen.add(_norm_word(q["word"]))
+                    kept.append(q)
+                sp.set(out=len(kept))
+            await self._drop(len(chunk) - len(kept))
+            if kept:
+                await out_q.put(kept)
+
+    async def check(self, in_q, out_q):
+        from check_questions import run_check
+
+        while (chunk := await in_q.get()) is not DONE:
+            with self._stage("check", len(chunk)) as sp:
+                try:
+                    results = await asyncio.to_thread(run_check, chunk, "words")
+                except Exception as e:
+                    sp.set(ok=False, error=str(e)[:200])
+                    log(f"品質チェックエラー（{len(chunk)}問を破棄）: {str(e)[:300]}")
+                    results = [{"index": i, "issues": [{"severity": "FAIL"}]} for i in range(len(chunk))]
+                # severity=FAIL の issue がある問題のみ除外（WARNのみは保持）
+                fail = {r.get("index") for r in results
+                        if any(issue.get("severity") == "FAIL" for issue in r.get("issues", []))}
+                kept = [q for i, q in enumerate(chunk) if i not in fail]
+                sp.set(out=len(kept))
+            if fail:
+                log(f"  check: {len(chunk) - len(kept)}問を除外（{len(kept)}問残り）")
+            await self._drop(len(chunk) - len(kept))
+            if kept:
+                await out_q.put(kept)
+
+    async def tts(self, in_q, out_q):
+        while (chunk := await in_q.get()) is not DONE:
+            with self._stage("tts_chunk", len(chunk)) as sp:
+                start_num, self.next_audio = self.next_audio, self.next_audio + len(chunk)
+                jobs = audio_jobs(chunk, start_num)
+                ids = await asyncio.to_thread(tts_queue.enqueue, jobs, "words")
+                done, failed = await tts_queue.work_async(bank="words", ids=ids)
+                # MP3 ができなかった問題は questions.js に入れない（音声の無い問題をコミットしない）
+                kept = [q for q, job in zip(chunk, jobs) if job["path"].exists()]
+                sp.set(out=len(kept), failed=failed)
+            if len(kept) < len(chunk):
+                log(f"  tts: {len(chunk) - len(kept)}問は音声を生成できなかったため除外")
+            await self._drop(len(chunk) - len(kept))
+            if kept:
+                await out_q.put(kept)
+
+    async def append(self, in_q):
+        while (chunk := await in_q.get()) is not DONE:
+            with self._stage("append", len(chunk)) as sp:
+                async with self.room:
+                    self.count = await asyncio.to_thread(append_to_questions_js, chunk, self.count)
+                    self.in_flight -= len(chunk)
+                    self.room.notify_all()
+                sp.set(out=len(chunk), bytes=QUESTIONS_JS.stat().st_size)
+            self.since_commit.extend(chunk)
+            if len(self.since_commit) >= self.args.batch_size:
+                await asyncio.to_thread(self.checkpoint)
+            if self.count >= self.args.target:
+                self.finished.set()
+                async with self.room:
+                    self.room.notify_all()
+                return
+
+    def checkpoint(self):
+        """前回以降に追記した問題を1コミットにまとめて push"""
+        if not self.since_commit:
+            return
+        n = len(self.since_commit)
+        paths = [str(QUESTIONS_JS.relative_to(REPO_ROOT))]
+        paths += [str((AUDIO_DIR / Path(q["audio"]).name).relative_to(REPO_ROOT))
+                  for q in self.since_commit if (AUDIO_DIR / Path(q["audio"]).name).exists()]
+        self.since_commit = []
+        if self.args.no_push:
+            log(f"チェックポイント: {n}問（--no-push のため commit しない。合計 {self.count}問）")
+            return
+        mock = mock_endpoints()
+        if mock:
+            log(f"チェックポイント: {n}問（{', '.join(mock)} が偽サーバーを指しているため commit しない）")
+            return
+        log(f"チェックポイント: {n}問を commit + push（合計 {self.count}問）")
+        with self._stage("git", n):
+            subprocess.run(["git", "add", "--", *paths], cwd=REPO_ROOT, check=True)
+            msg = f"WordsUp: {n}問追加（品質チェック済み）"
+            subprocess.run(["git", "commit", "-m", msg], cwd=REPO_ROOT, check=True)
+            subprocess.run(["git", "push", "origin", "main"], cwd=REPO_ROOT, check=True)
+
+    # ── 組み立て ──────────────────────────────
+    async def run(self):
+        a = self.args
+        queues = [asyncio.Queue(maxsize=QUEUE_SIZE) for _ in range(4)]
+        gen_q, pre_q, check_q, tts_q = queues
+        stages = [
+            ("generate", [self.generate(gen_q) for _ in range(a.gen_workers)], gen_q),
+            ("prefilter", [self.prefilter(gen_q, pre_q)], pre_q),
+        ]
+        if a.skip_check:
+            stages.append(("check", [_relay(pre_q, check_q)], check_q))
+        else:
+            stages.append(("check", [self.check(pre_q, check_q) for _ in range(a.check_workers)], check_q))
+        stages.append(("tts", [self.tts(check_q, tts_q) for _ in range(a.tts_workers)], tts_q))
+
+        appender = asyncio.create_task(self.append(tts_q))
+        groups = []
+        for _, coros, _ in stages:
+            groups.append([asyncio.create_task(c) for c in coros])
+        # 上流から順に終了を伝播（生成が止まったら各ステージのワーカー数だけ DONE を流す）
+        watchers = []
+        for i, (_, _, out_q) in enumerate(stages):
+            consumers = len(stages[i + 1][1]) if i + 1 < len(stages) else 1
+            watchers.append(asyncio.create_task(_close_after(groups[i], out_q, consumers)))
+        try:
+            await appender
+        finally:
+            self.finished.set()
+            async with self.room:
+                self.room.notify_all()
+            for task in [t for g in groups for t in g] + watchers:
+                task.cancel()
+            await asyncio.gather(*[t for g in groups for t in g], *watchers, return_exceptions=True)
+            self.checkpoint()
+
+    def report(self, wall):
+        log(f"ステージ別の処理時間（実時間 {wall:.0f}s）:")
+        for stage in ("generate", "prefilter", "check", "tts_chunk", "append", "git"):
+            s = self.stats.get(stage)
+            if s:
+                log(f"  {stage:9s} {s['items']:5d}問 / {s['chunks']:4d}チャンク / 処理 {s['busy']:7.0f}s")
+
+
+async def _relay(in_q, out_q):
+    """--skip-check 用: そのまま次のステージへ"""
+    while (chunk := await in_q.get()) is not DONE:
+        await out_q.put(chunk)
+
+
+async def _close_after(tasks, out_q, consumers):
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, Exception):
+            log(f"ステージ異常終了: {type(result).__name__}: {str(result)[:300]}")
+    for _ in range(consumers):
+        await out_q.put(DONE)
 
 
 def main():
     parser = argparse.ArgumentParser(description="WordsUp バッチ生成パイプライン")
     parser.add_argument("--target", type=int, default=5000, help="目標問題数（デフォルト: 5000）")
-    parser.add_argument("--batch-size", type=int, default=200, help="1バッチの生成数（デフォルト: 200）")
-    parser.add_argument("--model", default="claude-sonnet-4-6", help="生成モデル")
+    parser.add_argument("--batch-size", type=int, default=200, help="commit + push する問題数の単位（デフォルト: 200）")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="生成モデル")
     parser.add_argument("--skip-check", action="store_true", help="品質チェックをスキップ（非推奨）")
+    parser.add_argument("--gen-workers", type=int, default=2, help="生成の並列数（デフォルト: 2）")
+    parser.add_argument("--check-workers", type=int, default=2, help="品質チェックの並列数（デフォルト: 2）")
+    parser.add_argument("--tts-workers", type=int, default=2, help="音声生成の並列チャンク数（デフォルト: 2）")
+    parser.add_argument("--no-push", action="store_true", help="questions.js 更新まで（commit / push しない）")
     args = parser.parse_args()
 
-    current = get_current_count()
-    remaining = args.target - current
-    log(f"現在: {current}問 → 目標: {args.target}問 → 残り: {remaining}問")
-
+    pipeline = Pipeline(args)
+    remaining = args.target - pipeline.count
+    log(f"現在: {pipeline.count}問 → 目標: {args.target}問 → 残り: {remaining}問")
     if remaining <= 0:
         log("既に目標数に達しています。")
         return
 
-    batch_num = 0
-    while True:
-        current = get_current_count()
-        remaining = args.target - current
-        if remaining <= 0:
-            log(f"目標達成! 現在 {current} 問")
-            break
-
-        batch_num += 1
-        batch_count = min(args.batch_size, remaining)
-        log(f"\n{'='*60}")
-        log(f"バッチ {batch_num}: {batch_count}問生成 (現在{current}問 / 目標{args.target}問)")
-        log(f"{'='*60}")
-
-        # 1. 生成
-        if not run_generate(batch_count, args.model):
-            log("生成に失敗。10秒待って再試行...")
-            time.sleep(10)
-            continue
-
-        # 2. チェック
-        if not args.skip_check:
-            check_ok = run_check()
-            if not check_ok:
-                log("全問FAIL。次のバッチへ...")
-                continue
-
-        # 3. 追加（MP3 + questions.js + git push）
-        if not run_add():
-            log("追加に失敗。中断します。")
-            break
-
-        current_after = get_current_count()
-        log(f"バッチ {batch_num} 完了: {current} → {current_after} 問")
-
-        # API レートリミット対策
-        time.sleep(5)
-
-    final = get_current_count()
-    log(f"\n完了! 最終問題数: {final}")
+    trace.start_run(target=args.target, start_count=pipeline.count, model=args.model)
+    started = time.monotonic()
+    try:
+        asyncio.run(pipeline.run())
+    except KeyboardInterrupt:
+        log("中断しました（追記済みの問題はコミット済み）")
+    pipeline.report(time.monotonic() - started)
+    trace.end_run(pipeline.count - pipeline.start_count, time.monotonic() - started)
+    log(f"\n完了! 最終問題数: {pipeline.count}")
 
 
 if __name__ == "__main__":
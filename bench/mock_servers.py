@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+bench/mock_servers.py - オフライン計測用の偽 Anthropic API サーバーと偽 TTS サーバー
+
+実 API・edge-tts を呼ばずにパイプライン全体（並列度・キャッシュ・ストリーミング・Batches）を
+手元で再現性のある条件で負荷試験するためのもの。外部パッケージ不要（標準ライブラリのみ）。
+
+  LLM: POST /v1/messages（stream=true なら SSE）
+       POST /v1/messages/batches, GET /v1/messages/batches/{id}, GET .../{id}/results
+       → anthropic SDK は環境変数 ANTHROPIC_BASE_URL でここに向く（クライアント側の変更不要）
+  TTS: POST /v1/tts {"text", "voice", "rate", "boundary"} → {"audio": base64(MP3), "boundaries": [...]}
+       → tts_engine は環境変数 TTS_MOCK_URL が設定されていればここで合成する
+
+応答はプロンプトの種類を見分けて組み立てる（--fixtures の静的応答が優先）:
+  生成（words / listening / grammar / reading） : 実バンクの問題を抜き出し、重複判定に
+                                                   かからないよう識別子に通し番号を付けたもの
+  品質チェック（check_questions / 文法検証 / ReadUp ファクトチェック） : 全件 PASS
+                                                   （--reject-rate の割合で FAIL）
+同じリクエスト本文には同じ応答を返す（--seed で固定）。再試行のたびに変わるのはエラー・打ち切りの抽選だけ。
+
+レイテンシは「--latency 秒 + 出力トークン / --tps」（±--jitter）。max_tokens を超える応答や
+--truncate-rate に当たった応答は途中で切って stop_reason=max_tokens を返す。
+
+TTS は無音の MP3（MPEG-2 Layer III 24kHz 48kbps mono。edge-tts と同じ形式）と、
+単語ごとの WordBoundary / 文ごとの SentenceBoundary（100ns 単位）を返す。
+
+-- の後にコマンドを書くと、HEAD を一時ディレクトリに git worktree で展開し、そこをカレントに
+して実行する（終わったら消す。--keep-scratch で残す）。偽の音声・問題が実ツリーに書かれることはない。
+各スクリプトも ANTHROPIC_BASE_URL / TTS_MOCK_URL が偽サーバーを指している間は commit / push しない
+（lib.mock_endpoints）。
+
+Usage:
+  python3 bench/mock_servers.py                                  # 起動して待つ（環境変数を表示）
+  python3 bench/mock_servers.py --latency 2 --tps 60 --truncate-rate 0.05
+  python3 bench/mock_servers.py -- python3 batch_words.py --target 5300 --no-push   # 一時コピーで実行
+  python3 bench/mock_servers.py --fixtures bench/fixtures --keep-scratch -- python3 quiz_pipeline.py words --count 60 --no-push
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+CHARS_PER_TOKEN = 3          # トークン数の概算（英日混在の平均）
+STREAM_CHUNK_CHARS = 24      # SSE の content_block_delta 1回分
+TICKS_PER_SEC = 10_000_000   # edge-tts の offset/duration 単位（100ns）
+SEC_PER_WORD = 0.32          # 無音音声の長さ（話速 +0%）
+MP3_FRAME = b"\xff\xf3\x64\xc0" + bytes(140)   # MPEG-2 L3 24kHz 48kbps mono、無音1フレーム
+MP3_FRAME_SEC = 576 / 24000
+
+_ITEM_RE = re.compile(r"^  \{ .* \},?$")
+
+
+def tokens(text):
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+# ─────────────────────────────────────────
+# 応答の組み立て
+# ─────────────────────────────────────────
+def _js_items(path):
+    """questions.js の1行1問を dict にする（読めない行は捨てる）"""
+    items = []
+    if not path.exists():
+        return items
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if not _ITEM_RE.match(line):
+            continue
+        js = re.sub(r'(?<=[{,]\s)(\w+):\s', r'"\1": ', line.strip().rstrip(","))
+        try:
+            items.append(json.loads(js))
+        except ValueError:
+            continue
+    return items
+
+
+class Responder:
+    """プロンプトから応答テキストを作る"""
+
+    def __init__(self, seed, reject_rate, fixtures_dir=None):
+        self.seed = seed
+        self.reject_rate = reject_rate
+        self.fixtures = []
+        if fixtures_dir:
+            for path in sorted(Path(fixtures_dir).glob("*.json")):
+                fx = json.loads(path.read_text(encoding="utf-8"))
+                self.fixtures.append((re.compile(fx["match"], re.DOTALL), fx["text"]))
+        self._banks = {}
+        self._lock = threading.Lock()
+
+    def bank(self, name):
+        with self._lock:
+            if name not in self._banks:
+                if name == "reading":
+                    path = REPO_ROOT / "reading" / "staging.json"
+                    self._banks[name] = json.loads(path.read_text(encoding="utf-8")) if path.exists() else []
+                else:
+                    self._banks[name] = _js_items(REPO_ROOT / name / "questions.js")
+            return self._banks[name]
+
+    def respond(self, prompt, rng):
+        for pattern, text in self.fixtures:
+            if pattern.search(prompt):
+                return text
+        if "品質検査官です。以下の" in prompt and "## チェック対象の問題" in prompt:
+            return self._check(prompt, rng)
+        if "英文法問題の品質検査官" in prompt:
+            return self._verify_grammar(prompt, rng)
+        if "ファクトチェック" in prompt and "対象データ:" in prompt:
+            return self._factcheck(prompt, rng)
+        if "ReadUp英語読解" in prompt:
+            m = re.search(r"合計: (\d+)パッセージ", prompt)
+            return self._passages(int(m.group(1)) if m else 5, rng)
+        m = re.search(r"(\d+)問", prompt)
+        count = int(m.group(1)) if m else 10
+        if '"word":' in prompt:
+            return self._generate("words", count, rng)
+        if '"stem":' in prompt:
+            return self._generate("grammar", count, rng)
+        if '"kp":' in prompt and '"text":' in prompt:
+            return self._generate("listening", count, rng)
+        return "[]"
+
+    def _generate(self, bank, count, rng):
+        pool = self.bank(bank)
+        out = []
+        for _ in range(count if pool else 0):
+            q = json.loads(json.dumps(rng.choice(pool)))
+            tag = f"{rng.getrandbits(32):08x}"
+            q.pop("audio", None)
+            q.pop("id", None)
+            if bank == "words":
+                new_word = f"{q['word']}-{tag}"
+                text, n = re.subn(re.escape(q["word"]), new_word, q["text"], count=1, flags=re.IGNORECASE)
+                q["word"], q["text"] = new_word, text if n else f"{q['text']} ({new_word})"
+            elif bank == "grammar":
+                q["stem"] = f"{q['stem']} ({tag})"
+            else:
+                q["text"] = f"{q['text']} ({tag})"
+            out.append(q)
+        return json.dumps(out, ensure_ascii=False, indent=2)
+
+    def _passages(self, count, rng):
+        pool = self.bank("reading")
+        out = []
+        for _ in range(count if pool else 0):
+            p = json.loads(json.dumps(rng.choice(pool)))
+            p["pid"] = f"mock_{rng.getrandbits(32):08x}"
+            p["passage"] = f"{p['passage']} ({p['pid']})"
+            out.append(p)
+        return json.dumps(out, ensure_ascii=False, indent=2)
+
+    def _check(self, prompt, rng):
+        data = prompt.split("## チェック対象の問題", 1)[1]
+        try:
+            questions = json.loads(data[data.index("["):data.rindex("]") + 1])
+        except ValueError:
+            questions = []
+        results = []
+        for i, q in enumerate(questions):
+            failed = rng.random() < self.reject_rate
+            results.append({
+                "index": i,
+                "word": q.get("word") or q.get("text", "")[:30],
+                "status": "FAIL" if failed else "PASS",
+                "issues": [{"check": "multi_answer", "severity": "FAIL",
+                            "detail": "（mock）正解が複数ある", "fix": ""}] if failed else [],
+            })
+        return json.dumps(results, ensure_ascii=False, indent=2)
+
+    def _verify_grammar(self, prompt, rng):
+        data = prompt.split("問題リスト:", 1)[-1]
+        try:
+            n = len(json.loads(data[data.index("["):data.rindex("]") + 1]))
+        except ValueError:
+            n = 0
+        fails = [i for i in range(n) if rng.random() < self.reject_rate]
+        if not fails:
+            return "ALL_OK"
+        return "\n".join(f"FAIL: [{i}] （mock）別の選択肢も正解になりうる" for i in fails)
+
+    def _factcheck(self, prompt, rng):
+        data = prompt.split("対象データ:", 1)[1]
+        try:
+            passages = json.loads(data[data.index("["):data.rindex("]") + 1])
+        except ValueError:
+            passages = []
+        return json.dumps([{"pid": p.get("pid"), "ok": True} for p in passages], ensure_ascii=False)
+
+
+# ─────────────────────────────────────────
+# LLM サーバー
+# ─────────────────────────────────────────
+def _prompt_text(params):
+    parts = []
+    system = params.get("system")
+    if isinstance(system, str):
+        parts.append(system)
+    elif isinstance(system, list):
+        parts.extend(b.get("text", "") for b in system if isinstance(b, dict))
+    for msg in params.get("messages", []):
+        content = msg.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(b.get("text", "") for b in content if isinstance(b, dict))
+    return "\n".join(parts)
+
+
+def _cache_prefix(params):
+    """最後の cache_control ブロックまでのプロンプト（無ければ None）"""
+    blocks = []
+    system = params.get("system")
+    if isinstance(system, list):
+        blocks.extend(system)
+    for msg in params.get("messages", []):
+        if isinstance(msg.get("content"), list):
+            blocks.extend(msg["content"])
+    prefix, found = [], None
+    for b in blocks:
+        if not isinstance(b, dict):
+            continue
+        prefix.append(b.get("text", ""))
+        if b.get("cache_control"):
+            found = "\n".join(prefix)
+    return found
+
+
+class LLMState:
+    def __init__(self, args):
+        self.args = args
+        self.responder = Responder(args.seed, args.reject_rate, args.fixtures)
+        self.attempts = {}
+        self.cached_prefixes = set()
+        self.batches = {}
+        self.lock = threading.Lock()
+        self.stats = {"messages": 0, "stream": 0, "errors": 0, "truncated": 0, "batches": 0}
+
+    def _attempt(self, digest):
+        with self.lock:
+            n = self.attempts.get(digest, 0)
+            self.attempts[digest] = n + 1
+            return n
+
+    def message(self, params, *, roll=True):
+        """(Message dict, 応答までの秒数, 529 を返すか) を返す。roll=False ならエラー・打ち切りの抽選をしない"""
+        a = self.args
+        body = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        rng = random.Random(f"{a.seed}:{digest}")
+        prompt = _prompt_text(params)
+        text = self.responder.respond(prompt, rng)
+
+        luck = random.Random(f"{a.seed}:{digest}:{self._attempt(digest)}")
+        stop_reason = "end_turn"
+        limit = params.get("max_tokens", 4096) * CHARS_PER_TOKEN
+        if roll and luck.random() < a.truncate_rate:
+            limit = min(limit, int(len(text) * luck.uniform(0.5, 0.9)))
+        if len(text) > limit:
+            text = text[:limit]
+            stop_reason = "max_tokens"
+            with self.lock:
+                self.stats["truncated"] += 1
+
+        cache_read = cache_write = 0
+        prefix = _cache_prefix(params)
+        if prefix:
+            key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+            with self.lock:
+                hit = key in self.cached_prefixes
+                self.cached_prefixes.add(key)
+            if hit:
+                cache_read = tokens(prefix)
+            else:
+                cache_write = tokens(prefix)
+        out_tokens = tokens(text)
+        msg = {
+            "id": f"msg_mock_{digest[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": params.get("model", "mock"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": max(1, tokens(prompt) - cache_read - cache_write),
+                "output_tokens": out_tokens,
+                "cache_creation_input_tokens": cache_write,
+                "cache_read_input_tokens": cache_read,
+            },
+        }
+        delay = a.latency + out_tokens / a.tps
+        delay *= 1 + luck.uniform(-a.jitter, a.jitter)
+        return msg, max(0.0, delay), roll and luck.random() < a.error_rate
+
+    def create_batch(self, requests):
+        now = time.time()
+        batch_id = f"msgbatch_mock_{uuid.uuid4().hex[:20]}"
+        with self.lock:
+            self.batches[batch_id] = {"created": now, "requests": requests, "results": None}
+            self.stats["batches"] += 1
+        return batch_id
+
+    def batch_object(self, batch_id, base_url):
+        b = self.batches[batch_id]
+        n = len(b["requests"])
+        ended = time.time() - b["created"] >= self.args.batch_delay
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else n, "succeeded": n if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": _iso(b["created"]),
+            "expires_at": _iso(b["created"] + 86400),
+            "ended_at": _iso(b["created"] + self.args.batch_delay) if ended else None,
+            "cancel_initiated_at": None,
+            "archived_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch_id):
+        b = self.batches[batch_id]
+        if b["results"] is None:
+            lines = []
+            for req in b["requests"]:
+                msg, _, _ = self.message(req["params"], roll=False)
+                lines.append(json.dumps({"custom_id": req["custom_id"],
+                                         "result": {"type": "succeeded", "message": msg}}, ensure_ascii=False))
+            b["results"] = "\n".join(lines) + "\n"
+        return b["results"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _json(self, status, obj):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _not_found(self):
+        self._json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+
+class LLMHandler(_Handler):
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        if path == "/v1/messages":
+            return self._messages(self._read_json())
+        if path == "/v1/messages/batches":
+            params = self._read_json()
+            batch_id = self.state.create_batch(params.get("requests", []))
+            return self._json(200, self.state.batch_object(batch_id, self.server.base_url))
+        self._not_found()
+
+    def do_GET(self):
+        m = re.fullmatch(r"/v1/messages/batches/([\w-]+)(/results)?", self.path.split("?")[0])
+        if not m or m.group(1) not in self.state.batches:
+            return self._not_found()
+        if not m.group(2):
+            return self._json(200, self.state.batch_object(m.group(1), self.server.base_url))
+        body = self.state.batch_results(m.group(1)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/binary")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _messages(self, params):
+        msg, delay, fail = self.state.message(params)
+        with self.state.lock:
+            self.state.stats["messages"] += 1
+            self.state.stats["stream"] += bool(params.get("stream"))
+            self.state.stats["errors"] += fail
+        if fail:
+            time.sleep(self.state.args.latency)
+            return self._json(529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded (mock)"}})
+        if not params.get("stream"):
+            time.sleep(delay)
+            return self._json(200, msg)
+        self._stream(msg, delay)
+
+    def _stream(self, msg, delay):
+        """SSE で返す。最初のイベントまで --latency、以降は本文を --tps のペースで流す"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(name, data):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        text = msg["content"][0]["text"]
+        chunks = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+        first = min(delay, self.state.args.latency)
+        per_chunk = (delay - first) / len(chunks)
+        time.sleep(first)
+        start = dict(msg, content=[], stop_reason=None, usage=dict(msg["usage"], output_tokens=1))
+        event("message_start", {"type": "message_start", "message": start})
+        event("content_block_start", {"type": "content_block_start", "index": 0,
+                                      "content_block": {"type": "text", "text": ""}})
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                          "delta": {"type": "text_delta", "text": chunk}})
+        event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        event("message_delta", {"type": "message_delta",
+                                "delta": {"stop_reason": msg["stop_reason"], "stop_sequence": None},
+                                "usage": {"output_tokens": msg["usage"]["output_tokens"]}})
+        event("message_stop", {"type": "message_stop"})
+
+
+# ─────────────────────────────────────────
+# TTS サーバー
+# ─────────────────────────────────────────
+def _rate_factor(rate):
+    m = re.fullmatch(r"([+-]\d+)%", rate or "")
+    return 1 + int(m.group(1)) / 100 if m else 1.0
+
+
+def silent_speech(text, rate="", boundary=None):
+    """無音 MP3 と境界イベントを作る（単語ごとに SEC_PER_WORD 秒、前後に余白）"""
+    sec_per_word = SEC_PER_WORD / _rate_factor(rate)
+    events = []
+    t = 0.1
+    sentence_start, sentence_words = t, []
+    words = text.split()
+    for i, word in enumerate(words):
+        spoken = word.strip(".,!?;:\"'()[]")
+        if spoken and boundary == "WordBoundary":
+            events.append({"type": "WordBoundary", "text": spoken,
+                           "offset": round(t * TICKS_PER_SEC), "duration": round(sec_per_word * 0.8 * TICKS_PER_SEC)})
+        sentence_words.append(word)
+        t += sec_per_word
+        if boundary == "SentenceBoundary" and (word[-1:] in ".!?" or i == len(words) - 1):
+            events.append({"type": "SentenceBoundary", "text": " ".join(sentence_words),
+                           "offset": round(sentence_start * TICKS_PER_SEC),
+                           "duration": round((t - sentence_start) * TICKS_PER_SEC)})
+            sentence_start, sentence_words = t, []
+    frames = max(1, math.ceil((t + 0.1) / MP3_FRAME_SEC))
+    return MP3_FRAME * frames, events, t + 0.1
+
+
+class TTSHandler(_Handler):
+    def do_POST(self):
+        if self.path.split("?")[0] != "/v1/tts":
+            return self._not_found()
+        job = self._read_json()
+        a = self.server.args
+        audio, events, duration = silent_speech(job.get("text", ""), job.get("rate"), job.get("boundary"))
+        luck = random.Random()
+        with self.server.lock:
+            self.server.stats["jobs"] += 1
+        time.sleep(max(0.0, (a.tts_latency + duration * a.tts_rtf) * (1 + luck.uniform(-a.jitter, a.jitter))))
+        if luck.random() < a.tts_error_rate:
+            with self.server.lock:
+                self.server.stats["errors"] += 1
+            return self._json(503, {"error": "mock TTS failure"})
+        self._json(200, {"audio": base64.b64encode(audio).decode("ascii"), "boundaries": events})
+
+
+# ─────────────────────────────────────────
+# 起動
+# ─────────────────────────────────────────
+def start(handler, host, port, verbose, **attrs):
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    server.lock = threading.Lock()
+    for k, v in attrs.items():
+        setattr(server, k, v)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def scratch_tree(keep=False):
+    """HEAD を一時ディレクトリに worktree として展開する（実ツリーには書き込ませない）"""
+    parent = Path(tempfile.mkdtemp(prefix="mock-run-"))
+    path = parent / REPO_ROOT.name
+    subprocess.run(["git", "-C", str(REPO_ROOT), "worktree", "add", "--detach", "--quiet", str(path), "HEAD"],
+                   check=True)
+    try:
+        yield path
+    finally:
+        if keep:
+            print(f"一時コピーを残しました: {path}（不要になったら git worktree remove --force {path}）",
+                  file=sys.stderr)
+        else:
+            subprocess.run(["git", "-C", str(REPO_ROOT), "worktree", "remove", "--force", str(path)], check=False)
+            shutil.rmtree(parent, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="オフライン計測用の偽 Anthropic API / TTS サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--llm-port", type=int, default=8765, help="LLM のポート（0 で空きポート）")
+    parser.add_argument("--tts-port", type=int, default=8766, help="TTS のポート（0 で空きポート）")
+    parser.add_argument("--latency", type=float, default=0.8, help="LLM 応答の固定遅延（秒。デフォルト: 0.8）")
+    parser.add_argument("--tps", type=float, default=80.0, help="LLM の出力速度（トークン/秒。デフォルト: 80）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="遅延のばらつき（±割合。デフォルト: 0.2）")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="応答を途中で打ち切る割合")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="529 overloaded を返す割合")
+    parser.add_argument("--reject-rate", type=float, default=0.05, help="品質チェックで FAIL にする割合（デフォルト: 0.05）")
+    parser.add_argument("--batch-delay", type=float, default=5.0, help="Batches が ended になるまでの秒数")
+    parser.add_argument("--fixtures", default=None, help='静的応答のディレクトリ（*.json: {"match": 正規表現, "text": 応答}）')
+    parser.add_argument("--seed", default="0", help="応答の乱択シード")
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="TTS の固定遅延（秒。デフォルト: 0.3）")
+    parser.add_argument("--tts-rtf", type=float, default=0.1, help="TTS の実時間係数（音声1秒あたりの合成秒数）")
+    parser.add_argument("--tts-error-rate", type=float, default=0.0, help="TTS が失敗する割合")
+    parser.add_argument("--verbose", action="store_true", help="アクセスログを表示")
+    parser.add_argument("--keep-scratch", action="store_true", help="コマンドを実行した一時コピーを消さずに残す")
+    parser.add_argument("command", nargs=argparse.REMAINDER,
+                        help="-- の後に書いたコマンドを一時コピー上で環境変数つきで実行し、終わったら停止する")
+    args = parser.parse_args()
+
+    LLMHandler.state = LLMState(args)
+    llm = start(LLMHandler, args.host, args.llm_port, args.verbose)
+    tts = start(TTSHandler, args.host, args.tts_port, args.verbose, args=args, stats={"jobs": 0, "errors": 0})
+    env = {
+        "ANTHROPIC_BASE_URL": llm.base_url,
+        "ANTHROPIC_API_KEY": "mock-key",
+        "TTS_MOCK_URL": tts.base_url,
+    }
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    started = time.monotonic()
+    code = 0
+    if command:
+        with scratch_tree(args.keep_scratch) as cwd:
+            print(f"一時コピーで実行: {cwd}", file=sys.stderr)
+            code = subprocess.run(command, cwd=cwd, env={**os.environ, **env}).returncode
+    else:
+        print("起動しました。別のシェルで以下を設定してから各スクリプトを実行してください（Ctrl-C で停止）:")
+        for k, v in env.items():
+            print(f"  export {k}={v}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    llm.shutdown()
+    tts.shutdown()
+    stats = LLMHandler.state.stats
+    print(f"\nmock: {time.monotonic() - started:.1f}s / LLM {stats['messages']}回"
+          f"（stream {stats['stream']} / 529 {stats['errors']} / 打ち切り {stats['truncated']}）"
+          f" / Batches {stats['batches']}件 / TTS {tts.stats['jobs']}件（失敗 {tts.stats['errors']}）",
+          file=sys.stderr)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
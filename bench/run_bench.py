@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+bench/run_bench.py - 全件走査する処理のベンチマーク（実行時間・ピークメモリ・baseline 比較）
+
+対象（いずれも本番と同じ関数を、合成データ .bench_data/{scale}/ に向けて呼ぶ）:
+  listening_count      add_questions.get_existing_count（questions.js 全体の正規表現カウント）
+  words_count          add_words.get_existing_count（ファイル読み込み込み）
+  load_existing_texts  generate_questions.load_existing_texts（無ければ get_prompt 版）
+  load_questions       check_questions.load_questions（questions.js → JSON 変換）
+  append_words         add_words.append_to_questions_js（1バッチ 200 問の追記）
+  citations            add_citations.process_file --dry-run 相当（全記事に apply_citations_to_text）
+  unify_headers        unify_headers.main（全 index.html のヘッダー置換）
+  sitemap              build_sitemap.build（全記事を読んで sitemap.xml + 分割サイトマップを書く初回ビルド）
+
+時間は --repeat 回の最小値、メモリは tracemalloc のピーク（Python ヒープ。計測は別の1回）。
+依存パッケージが無く import できない対象は SKIP と表示し、計測漏れとして終了コード 1 を返す
+（--allow-skip で許す。API は一切呼ばない）。実行中に例外や sys.exit で止まった対象は FAIL として
+常に終了コード 1。SKIP・FAIL があるときは --save-baseline しない。
+
+baseline.json と比べて、時間かメモリが --threshold（既定 25%）を超えて悪化したら REGRESSION
+として終了コード 1 を返す。時間は MIN_DELTA_SEC 未満の差を無視する（計測ノイズ対策）。
+baseline はマシン依存なので、計測環境を変えたら --save-baseline で取り直すこと。
+
+Usage:
+  python3 bench/run_bench.py                       # 50k で計測して baseline と比較
+  python3 bench/run_bench.py --scale 500k
+  python3 bench/run_bench.py --only citations,unify_headers --repeat 5
+  python3 bench/run_bench.py --save-baseline       # 今回の結果を baseline.json に保存（50k / 500k それぞれで）
+  python3 bench/run_bench.py --allow-skip          # 依存パッケージの無い環境で、入る対象だけ計測する
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import shutil
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+import synth  # noqa: E402
+
+BASELINE_JSON = BENCH_DIR / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+MIN_DELTA_SEC = 0.05
+APPEND_BATCH = 200
+
+CASES = {}
+
+
+def case(name):
+    """setup(data_dir) -> (run, reset) を登録する。reset は各計測の前に呼ばれる（計測外）"""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _restore(pristine, work):
+    """計測で書き換わるファイルを毎回元に戻す"""
+    def reset():
+        shutil.copyfile(pristine, work)
+    return reset
+
+
+def _noop():
+    pass
+
+
+# ── 問題バンク ─────────────────────────────
+@case("listening_count")
+def _listening_count(data):
+    import add_questions
+
+    content = (data / "listening" / "questions.js").read_text(encoding="utf-8")
+    return lambda: add_questions.get_existing_count(content), _noop
+
+
+@case("words_count")
+def _words_count(data):
+    import add_words
+
+    add_words.QUESTIONS_JS = data / "words" / "questions.js"
+    return add_words.get_existing_count, _noop
+
+
+@case("load_existing_texts")
+def _load_existing_texts(data):
+    try:
+        import generate_questions as mod
+    except (ImportError, SystemExit):
+        import get_prompt as mod
+    mod.QUESTIONS_JS = data / "listening" / "questions.js"
+    return mod.load_existing_texts, _noop
+
+
+@case("load_questions")
+def _load_questions(data):
+    import check_questions
+
+    path = str(data / "listening" / "questions.js")
+    return lambda: check_questions.load_questions(path, "listen"), _noop
+
+
+@case("append_words")
+def _append_words(data):
+    import add_words
+
+    pristine = data / "words" / "questions.js"
+    work = data / "work" / "words_questions.js"
+    work.parent.mkdir(exist_ok=True)
+    add_words.QUESTIONS_JS = work
+    batch = [{
+        "diff": "lv3", "axis": "meaning", "word": f"benchword{i}", "text": f"This is benchword{i} in use.",
+        "ja": "ベンチマーク用", "answer": "正解", "choices": ["正解", "誤答1", "誤答2", "誤答3"],
+        "audio": f"audio/q{900000 + i}.mp3", "expl": "ベンチマーク用の問題。",
+    } for i in range(APPEND_BATCH)]
+    return lambda: add_words.append_to_questions_js(batch), _restore(pristine, work)
+
+
+# ── 記事 ───────────────────────────────────
+@case("citations")
+def _citations(data):
+    import add_citations
+
+    add_citations.CITATION_DB_PATH = data / "data" / "citation_db.json"
+    entries = add_citations.load_citation_db()
+    files = sorted((data / "articles").glob("*/index.html"))
+
+    def run():
+        for html in files:
+            add_citations.process_file(html, entries, dry_run=True)
+    return run, _noop
+
+
+@case("unify_headers")
+def _unify_headers(data):
+    import unify_headers
+
+    pristine = data / "articles"
+    work = data / "work" / "site"
+    unify_headers.ROOT = work
+
+    def reset():
+        if work.exists():
+            shutil.rmtree(work)
+        shutil.copytree(pristine, work / "articles")
+    return unify_headers.main, reset
+
+
+@case("sitemap")
+def _sitemap(data):
+    import build_sitemap
+
+    work = data / "work" / "sitemap"
+    if work.exists():
+        shutil.rmtree(work)
+    shutil.copytree(data / "articles", work / "articles")
+    (work / "data").mkdir()
+
+    def reset():
+        # 状態ファイルなし（= 全ページを読む初回ビルド）から計測する
+        for path in [*work.glob("sitemap*.xml"), work / "data" / "sitemap_state.json",
+                     work / ".pipeline_cache" / "sitemap_stat.json"]:
+            path.unlink(missing_ok=True)
+        shutil.copyfile(data / "sitemap.xml", work / "sitemap.xml")
+    return lambda: build_sitemap.build(work), reset
+
+
+# ── 計測 ───────────────────────────────────
+def measure(run, reset, repeat):
+    """(最小秒, 中央値秒, ピーク MB) を返す。関数の標準出力は捨てる
+
+    対象が sys.exit したら捨てた出力の先頭行を付けて RuntimeError にする（黙ってベンチごと終わらせない）。
+    """
+    sink = io.StringIO()
+    try:
+        return _measure(run, reset, repeat, sink)
+    except SystemExit as e:
+        reason = sink.getvalue().strip().splitlines()[:1] or [f"SystemExit: {e}"]
+        raise RuntimeError(reason[0]) from None
+
+
+def _measure(run, reset, repeat, sink):
+    times = []
+    for _ in range(repeat):
+        reset()
+        gc.collect()
+        with contextlib.redirect_stdout(sink):
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+        sink.seek(0)
+        sink.truncate()
+    reset()
+    gc.collect()
+    tracemalloc.start()
+    with contextlib.redirect_stdout(sink):
+        run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), statistics.median(times), peak / 1_000_000
+
+
+def compare(result, base, threshold):
+    """baseline との比較結果の文字列と、悪化していれば True を返す"""
+    if not base:
+        return "（baseline なし）", False
+    notes = []
+    regressed = False
+    ratio = result["sec"] / base["sec"] if base["sec"] else 1.0
+    if ratio > 1 + threshold and result["sec"] - base["sec"] >= MIN_DELTA_SEC:
+        regressed = True
+        notes.append(f"時間 x{ratio:.2f}")
+    mem_ratio = result["peak_mb"] / base["peak_mb"] if base["peak_mb"] else 1.0
+    if mem_ratio > 1 + threshold:
+        regressed = True
+        notes.append(f"メモリ x{mem_ratio:.2f}")
+    if regressed:
+        return "REGRESSION " + " / ".join(notes), True
+    return f"ok（時間 x{ratio:.2f} / メモリ x{mem_ratio:.2f}）", False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全件走査する処理のベンチマーク")
+    parser.add_argument("--scale", choices=list(synth.SCALES), default="50k", help="問題バンクの件数（デフォルト: 50k）")
+    parser.add_argument("--only", default=None, help=f"対象を絞る（カンマ区切り: {','.join(CASES)}）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最小値を採用。デフォルト: 3）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"REGRESSION とみなす悪化率（デフォルト: {DEFAULT_THRESHOLD}）")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果を baseline.json に保存")
+    parser.add_argument("--regen", action="store_true", help="合成データを作り直す")
+    parser.add_argument("--allow-skip", action="store_true", help="import できない対象を SKIP して成功扱いにする")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"不明な対象: {', '.join(unknown)}")
+
+    data = synth.ensure_dataset(args.scale, force=args.regen)
+    baseline = json.loads(BASELINE_JSON.read_text(encoding="utf-8")) if BASELINE_JSON.exists() else {}
+    base_scale = baseline.get(args.scale, {})
+
+    print(f"scale {args.scale}（{synth.SCALES[args.scale]:,}問 / 記事 {synth.ARTICLES:,}本） repeat {args.repeat}")
+    print(f"  {'対象':20s} {'最小':>9s} {'中央値':>9s} {'ピーク':>10s}  baseline 比")
+    results = {}
+    regressions = []
+    skipped = []
+    failed = []
+    for name in names:
+        setup_out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(setup_out):
+                run, reset = CASES[name](data)
+        except (ImportError, SyntaxError, SystemExit) as e:
+            reason = setup_out.getvalue().strip().splitlines()[:1] or [f"{type(e).__name__}: {e}"]
+            print(f"  {name:20s} SKIP（import できません: {reason[0]}）")
+            skipped.append(name)
+            continue
+        try:
+            best, median, peak = measure(run, reset, args.repeat)
+        except Exception as e:
+            print(f"  {name:20s} FAIL（{type(e).__name__}: {e}）")
+            failed.append(name)
+            continue
+        results[name] = {"sec": round(best, 4), "peak_mb": round(peak, 2)}
+        note, regressed = compare(results[name], base_scale.get(name), args.threshold)
+        if regressed:
+            regressions.append(name)
+        print(f"  {name:20s} {best:8.3f}s {median:8.3f}s {peak:8.1f}MB  {note}")
+    shutil.rmtree(data / "work", ignore_errors=True)
+
+    if failed:
+        print(f"\nFAIL: {', '.join(failed)}（計測できませんでした。baseline は保存しません）")
+        sys.exit(1)
+    if skipped and not args.allow_skip:
+        print(f"\nSKIP: {', '.join(skipped)}（依存パッケージを入れて計測してください。pip install -r requirements.txt）")
+        sys.exit(1)
+    if args.save_baseline:
+        if skipped:
+            print(f"\nSKIP があるため baseline は保存しません: {', '.join(skipped)}")
+            sys.exit(1)
+        baseline.setdefault(args.scale, {}).update(results)
+        BASELINE_JSON.write_text(json.dumps(baseline, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"\nbaseline を保存: {BASELINE_JSON.relative_to(BENCH_DIR.parent)}")
+    elif regressions:
+        print(f"\nREGRESSION: {', '.join(regressions)}（閾値 +{args.threshold:.0%}）")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+bench/synth.py - ベンチマーク用の合成データ生成
+
+実データ（listening / words の questions.js、articles/*/index.html）を種にして、
+同じ書式のまま件数だけ増やしたサイトツリーを .bench_data/{scale}/ に作る。
+
+  listening/questions.js : 実問題の行を使い回し、text 先頭に通し番号を付けて重複させない
+  words/questions.js     : 同上（word にも通し番号）
+  articles/{slug}-{n}/index.html : 実記事を巡回コピー（ARTICLES 件）
+  sitemap.xml            : 合成記事の <url> を並べた旧形式の sitemap（build_sitemap の初回の引き継ぎ元）
+  data/citation_db.json  : 実物のコピー
+
+生成済みで設定（SYNTH_VERSION・件数）が同じなら作り直さない。
+
+Usage:
+  python3 bench/synth.py --scale 50k
+  python3 bench/synth.py --scale 500k --force
+"""
+
+import argparse
+import json
+import random
+import re
+import shutil
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DATA_ROOT = REPO_ROOT / ".bench_data"
+
+SYNTH_VERSION = 2
+SEED = 20260301
+SCALES = {"50k": 50_000, "500k": 500_000}   # 現在の約 10 倍 / 100 倍
+ARTICLES = 3000
+BASE_URL = "https://native-real.com"
+
+_ITEM_RE = re.compile(r"^  \{ .* \},?$")
+
+
+def _item_lines(path):
+    """questions.js から1行1問の行を取り出す（末尾のカンマは外す）"""
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return [line.rstrip(",") for line in lines if _ITEM_RE.match(line)]
+
+
+def write_bank(src, dst, count, rng, unique_fields):
+    """src の問題行を巡回して count 問の questions.js を dst に書く"""
+    seeds = _item_lines(src)
+    if not seeds:
+        raise RuntimeError(f"{src} から問題行を取り出せません")
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    with open(dst, "w", encoding="utf-8") as f:
+        f.write(f"// questions.js — {count} questions\nconst DATA = [\n")
+        for n in range(1, count + 1):
+            line = rng.choice(seeds)
+            for field in unique_fields:
+                line = re.sub(rf'\b{field}: "', f'{field}: "[{n}] ', line, count=1)
+            line = re.sub(r'audio: "audio/q\d+\.mp3"', f'audio: "audio/q{n:02d}.mp3"', line)
+            f.write(line + (",\n" if n < count else "\n"))
+        f.write("];\n")
+
+
+def write_articles(dst_root, count):
+    """実記事を巡回コピーして count 本の記事ディレクトリを作り、slug のリストを返す"""
+    seeds = sorted(p.parent for p in (REPO_ROOT / "articles").glob("*/index.html"))
+    slugs = []
+    for n in range(count):
+        src = seeds[n % len(seeds)]
+        slug = f"{src.name}-{n:04d}"
+        out = dst_root / "articles" / slug / "index.html"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        html = (src / "index.html").read_text(encoding="utf-8")
+        out.write_text(html.replace(f"/articles/{src.name}/", f"/articles/{slug}/"), encoding="utf-8")
+        slugs.append(slug)
+    return slugs
+
+
+def write_sitemap(dst, slugs):
+    """合成記事の旧形式 sitemap.xml（<urlset>。build_sitemap が初回に lastmod / priority を引き継ぐ元）"""
+    entries = "".join(
+        f"  <url>\n    <loc>{BASE_URL}/articles/{slug}/</loc>\n"
+        f"    <lastmod>2026-03-01</lastmod>\n    <priority>0.7</priority>\n  </url>\n"
+        for slug in slugs
+    )
+    dst.write_text("<?xml version='1.0' encoding='UTF-8'?>\n"
+                   '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+                   f"{entries}</urlset>\n", encoding="utf-8")
+
+
+def ensure_dataset(scale, force=False):
+    """.bench_data/{scale}/ を用意してそのパスを返す"""
+    count = SCALES[scale]
+    root = DATA_ROOT / scale
+    marker = root / "synth.json"
+    meta = {"version": SYNTH_VERSION, "seed": SEED, "items": count, "articles": ARTICLES}
+    if not force and marker.exists() and json.loads(marker.read_text(encoding="utf-8")) == meta:
+        return root
+
+    if root.exists():
+        shutil.rmtree(root)
+    rng = random.Random(SEED)
+    print(f"合成データ生成: {scale}（{count:,}問 × 2バンク / 記事 {ARTICLES:,}本）→ {root}", file=sys.stderr)
+    write_bank(REPO_ROOT / "listening" / "questions.js", root / "listening" / "questions.js", count, rng, ["text"])
+    write_bank(REPO_ROOT / "words" / "questions.js", root / "words" / "questions.js", count, rng, ["word", "text"])
+    slugs = write_articles(root, ARTICLES)
+    write_sitemap(root / "sitemap.xml", slugs)
+    (root / "data").mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(REPO_ROOT / "data" / "citation_db.json", root / "data" / "citation_db.json")
+    marker.write_text(json.dumps(meta), encoding="utf-8")
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成データ生成")
+    parser.add_argument("--scale", choices=list(SCALES), default="50k", help="問題バンクの件数（デフォルト: 50k）")
+    parser.add_argument("--force", action="store_true", help="生成済みでも作り直す")
+    args = parser.parse_args()
+    print(ensure_dataset(args.scale, force=args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,542 @@
+#!/usr/bin/env python3
+"""
+build_search_index.py - サイト内検索（/search/）用の静的な転置インデックスを作る
+
+対象は記事（articles/*/）・AIプロンプト（prompts/*/）・フレーズ集（real-phrases/*/）と、
+4つの問題バンク（grammar / listening / reading / words の questions.js）の全問題。
+
+  語       日本語はひらがな・カタカナ・漢字の連続部分の文字 2-gram（1文字だけの部分はその文字）、
+           英語は単語を小文字化して語尾規則だけの簡易レンマ化（affects / affected → affect）。
+           ストップワードは落とす。タイトル（問題文・単語）に出た語には印を付けて順位を上げる
+  ポスティング 語ごとの文書 ID 列を差分にして、(差分 << 1 | タイトル印) を varint で並べる
+  シャード 語を辞書順に並べて連続した範囲ごとに1ファイル（search/t.<hash>.bin）。search/index.json に
+           各シャードの先頭の語を並べるので、クライアントは二分探索でクエリの語（と前方一致の範囲）を
+           含むシャードだけを取りに行く
+  文書     ID を DOC_CHUNK 件ごとに search/d.<hash>.json（[種別, URL, タイトル, 抜粋]）。結果の表示に
+           必要なチャンクだけ読む
+
+  差分     前回の併合より後に追加した文書（ID が manifest の base 以上）のポスティングは、範囲の
+           シャードではなく1つの差分セグメント（manifest の delta）にまとめる。記事1本の語は
+           ほぼ全部の範囲にまたがるので、範囲のシャードに入れると毎回ほとんどのシャードが変わる。
+           差分が DELTA_MAX を超えたとき（と --merge / --full）に本体のシャードへ併合する
+
+ファイル名は内容のハッシュなので、変わらなかったシャード・チャンクは書き直さない（ブラウザの
+キャッシュもそのまま効く）。文書 ID の割り当ては data/search_ids.json に記録する（リポジトリに
+含めるので、新しいチェックアウトの CI でも ID が振り直されない）。シャードの境界も前回の先頭語を
+引き継ぐので、記事・問題の追加で書き直すのは差分セグメントと末尾のチャンクと index.json だけ
+（既存の文書の本文が変わったときはその語を含むシャードも）。
+入力ファイルごとの抽出結果は .pipeline_cache/search_index.json に保存し、mtime・サイズが同じ
+ファイルは読み直さない。
+
+クライアント（search/search.js）の語の切り出しはここの tokens() と同じ規則で書いてある。
+片方を変えたらもう片方も合わせ、INDEX_VERSION を上げること。
+
+Usage:
+  python3 build_search_index.py             # 変わった入力だけ読み直して search/ を更新
+  python3 build_search_index.py --full      # キャッシュを使わずに作り直す（文書 ID も振り直す）
+  python3 build_search_index.py --merge     # 差分セグメントを本体のシャードに併合する
+  python3 build_search_index.py --query "affect effect"   # 作ったインデックスで検索してみる
+"""
+
+import argparse
+import bisect
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+import build_sitemap
+import related_articles
+
+ROOT = Path(__file__).parent
+OUT_DIR = ROOT / "search"
+MANIFEST_NAME = "index.json"
+CACHE_PATH = ROOT / ".pipeline_cache" / "search_index.json"
+IDS_PATH = ROOT / "data" / "search_ids.json"
+INDEX_VERSION = 1
+
+SHARD_TARGET = 24 * 1024      # 分割するときの1シャードの目安
+SHARD_MAX = 64 * 1024         # これを超えたシャードは分割する
+SHARD_MIN = 4 * 1024          # これより小さいシャードは隣と併合する
+DELTA_MAX = 128 * 1024        # 差分セグメントがこれを超えたら本体のシャードに併合する（記事 10 本程度）
+DOC_CHUNK = 256
+SNIPPET_CHARS = 120
+MAX_HOLES = 0.25              # 削除で空いた ID がこの割合を超えたら ID を振り直す
+
+PAGE_SECTIONS = {             # ディレクトリ → 種別（各ディレクトリの一覧ページ自体は含めない）
+    "articles": "article",
+    "prompts": "prompt",
+    "real-phrases": "phrase",
+}
+BANKS = {                     # 種別: (URL, タイトルのフィールド, 抜粋のフィールド, 本文のフィールド)
+    "grammar": ("/grammar/", ("stem",), ("answer", "expl"), ("ja", "answer", "choices", "expl", "rule", "kp")),
+    "listening": ("/listening/", ("text",), ("ja", "answer"), ("ja", "answer", "expl")),
+    "reading": ("/reading/", ("question",), ("answer", "expl"), ("passage", "answer", "expl", "kp")),
+    "words": ("/words/", ("word",), ("answer", "text", "ja"), ("text", "ja", "answer", "expl")),
+}
+KIND_LABELS = {
+    "article": "学習コラム", "prompt": "AIプロンプト", "phrase": "フレーズ集",
+    "grammar": "文法クイズ", "listening": "ListenUp", "reading": "ReadUp", "words": "WordsUp",
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "he", "her", "his",
+    "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "our", "she", "so", "that", "the", "their",
+    "them", "they", "this", "to", "was", "we", "were", "with", "you", "your",
+}
+
+_JA_RUN_RE = re.compile(r"[぀-ヿ㐀-鿿豈-﫿]+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CHROME_RE = re.compile(r'<(header|footer|nav)\b.*?</\1>|<div class="site-mobile-nav".*?\n</div>', re.DOTALL)
+_DOUBLE_RE = re.compile(r"([b-df-hj-kmnp-rtv-z])\1$")   # stopp → stop（l / s は残す: call, pass）
+
+# questions.js の走査用: 文字列・コメント・波括弧
+_JS_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\'|//[^\n]*|/\*.*?\*/|[{}]', re.DOTALL)
+_JS_FIELD_RE = re.compile(r'(\w+)\s*:\s*("(?:[^"\\]|\\.)*"|\[(?:\s*"(?:[^"\\]|\\.)*"\s*,?)*\s*\])')
+
+
+# ── 語の切り出し（search.js と同じ規則） ─────────
+def lemma(word):
+    """語尾規則だけの簡易レンマ化（辞書は使わない。クエリ側も同じ変換をするので一致すればよい）"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, repl in (("ies", "y"), ("sses", "ss"), ("ches", "ch"), ("shes", "sh"), ("xes", "x")):
+        if word.endswith(suffix) and len(word) > len(suffix) + 2:
+            return word[:-len(suffix)] + repl
+    if word.endswith("ing") and len(word) > 5:
+        word = _DOUBLE_RE.sub(r"\1", word[:-3])
+    elif word.endswith("ed") and len(word) > 4:
+        word = _DOUBLE_RE.sub(r"\1", word[:-2])
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+
+def tokens(text):
+    """テキスト → 語の集合"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    terms = {lemma(w) for w in _WORD_RE.findall(text) if w not in STOPWORDS}
+    for run in _JA_RUN_RE.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        else:
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def snippet(text):
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS - 1] + "…"
+
+
+# ── 入力 → 文書 ─────────────────────────────
+def _doc(key, kind, url, title, snip, body):
+    title_terms = tokens(title)
+    return {
+        "key": key, "kind": kind, "url": url, "title": title, "snippet": snippet(snip),
+        "title_terms": " ".join(sorted(title_terms)),
+        "terms": " ".join(sorted(tokens(body) - title_terms)),
+    }
+
+
+def page_docs(rel, data):
+    kind = PAGE_SECTIONS[rel.parts[0]]
+    text = data.decode("utf-8")
+    title, body = related_articles.extract(_CHROME_RE.sub(" ", text))
+    m = re.search(r'<meta name="description" content="([^"]*)"', text)
+    description = html.unescape(m.group(1)) if m else body
+    url = f"/{rel.parent.as_posix()}/"
+    return [_doc(url, kind, url, title, description, f"{description} {body}")]
+
+
+def js_objects(source):
+    """questions.js の DATA 配列の要素（{...}）ごとに、文字列と文字列配列のフィールドを dict で返す"""
+    depth = 0
+    start = None
+    for m in _JS_TOKEN_RE.finditer(source):
+        tok = m.group()
+        if tok == "{":
+            if depth == 0:
+                start = m.start()
+            depth += 1
+        elif tok == "}":
+            depth -= 1
+            if depth == 0 and start is not None:
+                fields = {}
+                for name, value in _JS_FIELD_RE.findall(source[start:m.end()]):
+                    try:
+                        fields[name] = json.loads(value)
+                    except ValueError:
+                        pass
+                yield fields
+
+
+def _join(q, names):
+    parts = []
+    for name in names:
+        value = q.get(name)
+        if isinstance(value, list):
+            parts.extend(str(v) for v in value)
+        elif value:
+            parts.append(str(value))
+    return " / ".join(parts)
+
+
+def bank_docs(bank, data):
+    url, title_fields, snippet_fields, body_fields = BANKS[bank]
+    docs = []
+    seen = defaultdict(int)
+    for q in js_objects(data.decode("utf-8")):
+        title = _join(q, title_fields)
+        if not title:
+            continue
+        # listening / words には id が無いので、問題文 + 正解で識別する（同じ組は出現順で区別）
+        base = q.get("id") or hashlib.sha1(f"{title}\0{q.get('answer', '')}".encode("utf-8")).hexdigest()[:12]
+        seen[base] += 1
+        key = f"{bank}:{base}" + (f"#{seen[base]}" if seen[base] > 1 else "")
+        docs.append(_doc(key, bank, url, title, _join(q, snippet_fields), _join(q, body_fields)))
+    return docs
+
+
+def sources(root=ROOT):
+    """[(相対パス, 抽出関数)]。robots.txt で Disallow のページは含めない"""
+    disallow = build_sitemap.disallowed_prefixes(root)
+    found = []
+    for section in PAGE_SECTIONS:
+        for path in sorted((root / section).glob("*/index.html")):
+            rel = path.relative_to(root)
+            if not any(f"/{rel.parent.as_posix()}/".startswith(p) for p in disallow):
+                found.append((rel, page_docs))
+    for bank in BANKS:
+        path = root / bank / "questions.js"
+        if path.exists():
+            found.append((path.relative_to(root), lambda rel, data, bank=bank: bank_docs(bank, data)))
+    return found
+
+
+# ── varint / シャード ───────────────────────
+def varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def encode_term(term, postings):
+    """1語ぶんのバイト列: varint(語のバイト数) 語 varint(文書数) varint(ポスティングのバイト数) ポスティング"""
+    body = bytearray()
+    prev = 0
+    for doc_id, flag in postings:
+        varint(((doc_id - prev) << 1) | flag, body)
+        prev = doc_id
+    out = bytearray()
+    raw = term.encode("utf-8")
+    varint(len(raw), out)
+    out += raw
+    varint(len(postings), out)
+    varint(len(body), out)
+    out += body
+    return bytes(out)
+
+
+def plan_shards(encoded, previous_firsts):
+    """encoded: [(語, バイト列)]（語順）→ [(先頭の語, [バイト列])]。前回の境界をできるだけ保つ"""
+    bounds = sorted(set(previous_firsts) | {""})
+    groups = [[] for _ in bounds]
+    for term, blob in encoded:
+        groups[bisect.bisect_right(bounds, term) - 1].append((term, blob))
+
+    shards = []
+    for first, group in zip(bounds, groups):
+        size = sum(len(b) for _, b in group)
+        if size > SHARD_MAX:
+            piece, piece_size, piece_first = [], 0, first
+            for term, blob in group:
+                if piece and piece_size + len(blob) > SHARD_TARGET:
+                    shards.append([piece_first, piece, piece_size])
+                    piece, piece_size, piece_first = [], 0, term
+                piece.append((term, blob))
+                piece_size += len(blob)
+            shards.append([piece_first, piece, piece_size])
+        elif group or first == "":
+            shards.append([first, group, size])
+
+    merged = []
+    for shard in shards:
+        if merged and (shard[2] < SHARD_MIN or merged[-1][2] < SHARD_MIN) and merged[-1][2] + shard[2] <= SHARD_MAX:
+            merged[-1][1].extend(shard[1])
+            merged[-1][2] += shard[2]
+        else:
+            merged.append(shard)
+    return [(first, [blob for _, blob in group]) for first, group, _ in merged]
+
+
+def _hashed_name(prefix, data, suffix):
+    return f"{prefix}.{hashlib.sha256(data).hexdigest()[:12]}{suffix}"
+
+
+# ── ビルド ─────────────────────────────────
+def load_cache(full=False):
+    try:
+        cache = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        if not full and cache.get("version") == INDEX_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": INDEX_VERSION, "sources": {}}
+
+
+def save_cache(cache):
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, CACHE_PATH)
+
+
+def load_ids(cache, full=False):
+    """前回の ({文書キー: ID}, 次の ID)。data/search_ids.json が無ければ旧形式のキャッシュから引き継ぐ"""
+    if full:
+        return {}, 0
+    try:
+        state = json.loads(IDS_PATH.read_text(encoding="utf-8"))
+        if state.get("version") == INDEX_VERSION:
+            return {k: i for i, k in enumerate(state["keys"]) if k is not None}, len(state["keys"])
+    except (OSError, ValueError):
+        pass
+    return cache.get("ids", {}), cache.get("next", 0)
+
+
+def save_ids(ids, nxt):
+    """ID 順のキーの配列（削除で空いた ID は null）。1行1件なので追加は末尾の行だけの差分になる"""
+    keys = [None] * nxt
+    for key, i in ids.items():
+        keys[i] = key
+    text = (f'{{"version": {INDEX_VERSION}, "keys": [\n'
+            + ",\n".join(json.dumps(k, ensure_ascii=False) for k in keys) + "\n]}\n")
+    IDS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    build_sitemap.write_if_changed(IDS_PATH, text, dry_run=False)
+
+
+def assign_ids(ids, nxt, docs):
+    """前回の ID を引き継ぎ、新しい文書には末尾から振る。空きが多ければ全部振り直す。
+    ({文書キー: ID}, 次の ID, 振り直したか) を返す"""
+    keys = [d["key"] for d in docs]
+    live = set(keys)
+    ids = {k: i for k, i in ids.items() if k in live}
+    renumbered = bool(nxt) and (nxt - len(ids)) / nxt > MAX_HOLES
+    if renumbered:
+        ids, nxt = {}, 0
+    for key in keys:
+        if key not in ids:
+            ids[key] = nxt
+            nxt += 1
+    return ids, nxt, renumbered
+
+
+def encode_postings(postings):
+    """{語: [(文書 ID, 印)]} → [(語, バイト列)]（語順）"""
+    return [(term, encode_term(term, sorted(postings[term]))) for term in sorted(postings)]
+
+
+def write_hashed(name, data, written):
+    path = OUT_DIR / name
+    if not path.exists():
+        path.write_bytes(data)
+        written.append(name)
+
+
+def build(full=False, merge=False):
+    """search/ を更新する。結果の dict（docs / terms / shards / delta / read / written / removed / bytes）を返す。
+    入力がどれも変わっていなければ何も書かない（terms / bytes は None）"""
+    cache = load_cache(full)
+    read = []
+    new_sources = {}
+    for rel, extract in sources():
+        path = ROOT / rel
+        st = path.stat()
+        key = rel.as_posix()
+        old = cache["sources"].get(key)
+        if old and (old["bytes"], old["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            new_sources[key] = old
+            continue
+        new_sources[key] = {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns, "docs": extract(rel, path.read_bytes())}
+        read.append(key)
+    manifest_path = OUT_DIR / MANIFEST_NAME
+    if (not read and not merge and new_sources.keys() == cache["sources"].keys()
+            and manifest_path.exists() and IDS_PATH.exists()):
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        return {"docs": manifest["docs"], "terms": None, "shards": len(manifest["shards"]),
+                "delta": manifest.get("delta"), "read": [], "written": [], "removed": [], "bytes": None}
+    cache["sources"] = new_sources
+    cache.pop("ids", None)    # 旧形式（ID をキャッシュに持っていた）の名残
+    cache.pop("next", None)
+
+    docs = [d for src in new_sources.values() for d in src["docs"]]
+    previous_ids, previous_next = load_ids(cache, full)
+    ids, nxt, renumbered = assign_ids(previous_ids, previous_next, docs)
+
+    try:
+        previous = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if previous.get("version") != INDEX_VERSION:
+            previous = {}
+    except (OSError, ValueError):
+        previous = {}
+    previous_firsts = [] if full else [f for f, _ in previous.get("shards", [])]
+    # base 未満の ID は本体のシャード、base 以上は差分セグメント
+    base = nxt if full or merge or renumbered else min(previous.get("base", previous_next), nxt)
+
+    postings = defaultdict(list)
+    delta_postings = defaultdict(list)
+    for d in docs:
+        doc_id = ids[d["key"]]
+        target = postings if doc_id < base else delta_postings
+        for term in d["title_terms"].split():
+            target[term].append((doc_id, 1))
+        for term in d["terms"].split():
+            target[term].append((doc_id, 0))
+    delta = encode_postings(delta_postings)
+    if sum(len(blob) for _, blob in delta) > DELTA_MAX:
+        for term, plist in delta_postings.items():
+            postings[term].extend(plist)
+        delta, base = [], nxt
+    n_terms = len(postings.keys() | {term for term, _ in delta})
+    encoded = encode_postings(postings)
+
+    OUT_DIR.mkdir(exist_ok=True)
+    written = []
+    shard_entries = []
+    for first, blobs in plan_shards(encoded, previous_firsts):
+        data = b"".join(blobs)
+        name = _hashed_name("t", data, ".bin")
+        write_hashed(name, data, written)
+        shard_entries.append([first, name])
+
+    delta_name = None
+    if delta:
+        data = b"".join(blob for _, blob in delta)
+        delta_name = _hashed_name("t", data, ".bin")
+        write_hashed(delta_name, data, written)
+
+    by_id = {ids[d["key"]]: d for d in docs}
+    chunk_files = []
+    for start in range(0, nxt, DOC_CHUNK):
+        rows = []
+        for doc_id in range(start, min(start + DOC_CHUNK, nxt)):
+            d = by_id.get(doc_id)
+            rows.append([d["kind"], d["url"], d["title"], d["snippet"]] if d else None)
+        data = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        name = _hashed_name("d", data, ".json")
+        write_hashed(name, data, written)
+        chunk_files.append(name)
+
+    manifest = {
+        "version": INDEX_VERSION, "docs": len(docs), "chunk": DOC_CHUNK, "kinds": KIND_LABELS,
+        "chunks": chunk_files, "shards": shard_entries, "base": base, "delta": delta_name,
+    }
+    text = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")) + "\n"
+    if build_sitemap.write_if_changed(manifest_path, text, dry_run=False):
+        written.append(MANIFEST_NAME)
+
+    keep = {name for _, name in shard_entries} | set(chunk_files) | ({delta_name} if delta_name else set())
+    removed = []
+    for path in [*OUT_DIR.glob("t.*.bin"), *OUT_DIR.glob("d.*.json")]:
+        if path.name not in keep:
+            path.unlink()
+            removed.append(path.name)
+    save_ids(ids, nxt)
+    save_cache(cache)
+    total = sum((OUT_DIR / name).stat().st_size for name in keep)
+    return {"docs": len(docs), "terms": n_terms, "shards": len(shard_entries), "delta": delta_name,
+            "read": read, "written": written, "removed": removed, "bytes": total}
+
+
+# ── 確認用の検索（search.js と同じ順位付け） ───────
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _shard_terms(data):
+    pos = 0
+    while pos < len(data):
+        n, pos = _read_varint(data, pos)
+        term = data[pos:pos + n].decode("utf-8")
+        pos += n
+        df, pos = _read_varint(data, pos)
+        size, pos = _read_varint(data, pos)
+        yield term, df, data[pos:pos + size]
+        pos += size
+
+
+def query(text, limit=10):
+    manifest = json.loads((OUT_DIR / MANIFEST_NAME).read_text(encoding="utf-8"))
+    firsts = [f for f, _ in manifest["shards"]]
+    terms = sorted(tokens(text))
+    scores = defaultdict(float)
+    hits = defaultdict(int)
+    for term in terms:
+        _, name = manifest["shards"][bisect.bisect_right(firsts, term) - 1]
+        # 本体のシャードと差分セグメントの両方を見る（df は合計、ID は重ならない）
+        found = [(df, body) for n in (name, manifest.get("delta")) if n
+                 for t, df, body in _shard_terms((OUT_DIR / n).read_bytes()) if t == term]
+        if not found:
+            continue
+        idf = math.log(1 + manifest["docs"] / sum(df for df, _ in found))
+        for _, body in found:
+            pos = doc_id = 0
+            while pos < len(body):
+                v, pos = _read_varint(body, pos)
+                doc_id += v >> 1
+                scores[doc_id] += idf * (3 if v & 1 else 1)
+                hits[doc_id] += 1
+    need = len(terms) if len(terms) <= 2 else math.ceil(len(terms) * 2 / 3)
+    ranked = sorted((d for d in scores if hits[d] >= need), key=lambda d: (-hits[d], -scores[d]))[:limit]
+    results = []
+    for doc_id in ranked:
+        chunk = json.loads((OUT_DIR / manifest["chunks"][doc_id // manifest["chunk"]]).read_text(encoding="utf-8"))
+        results.append((scores[doc_id], chunk[doc_id % manifest["chunk"]]))
+    return terms, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="サイト内検索用の静的インデックスを作る")
+    parser.add_argument("--full", action="store_true", help="キャッシュを使わずに作り直す")
+    parser.add_argument("--merge", action="store_true", help="差分セグメントを本体のシャードに併合する")
+    parser.add_argument("--query", help="作ったインデックスで検索してみる")
+    args = parser.parse_args()
+
+    if args.query:
+        terms, results = query(args.query)
+        print(f"語: {' '.join(terms)}")
+        for score, (kind, url, title, snip) in results:
+            print(f"  {score:6.2f}  [{KIND_LABELS[kind]}] {title[:50]}  {url}\n          {snip[:80]}")
+        return
+
+    started = time.monotonic()
+    result = build(full=args.full, merge=args.merge)
+    wall = time.monotonic() - started
+    if result["terms"] is None:
+        print(f"入力に変更なし（{result['docs']:,} 文書 / シャード {result['shards']} 個）（{wall:.1f}s）")
+        return
+    print(f"{result['docs']:,} 文書 / {result['terms']:,} 語 / シャード {result['shards']} 個"
+          f"{' + 差分' if result['delta'] else ''}（合計 {result['bytes'] / 1024:.0f}KB）")
+    print(f"読み直し {len(result['read'])} ファイル / 書き込み {len(result['written'])} / 削除 {len(result['removed'])}"
+          f"（{wall:.1f}s）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+build_sitemap.py - サイト全体を1回走査して sitemap.xml（サイトマップインデックス）と分割サイトマップを書く
+
+generate_articles.update_sitemap は記事を1本作るたびに sitemap.xml 全体を ElementTree で
+読み直して書き直し、<lastmod> も「追加した日」のままだった。ここでは:
+
+  対象     サイト内の index.html すべて（記事・フレーズ集・プロンプト・クイズ・サービス紹介など）。
+           noindex のページ・meta refresh のリダイレクト・robots.txt の Disallow 配下は除く
+  lastmod  ページ本文のハッシュ（<script>/<style>/<link> を除いた HTML）が前回と変わった日。
+           ハッシュと lastmod・priority は data/sitemap_state.json に記録する（リポジトリに含めるので
+           別の環境で実行しても lastmod はリセットされない）。mtime・サイズはチェックアウトごとに
+           変わるので .pipeline_cache/sitemap_stat.json に分けて持ち、前回と同じページは読まない
+  分割     URL の先頭ディレクトリ（articles / real-phrases / prompts / それ以外）ごとに
+           sitemap-<グループ>.xml を書き、MAX_URLS を超えたら sitemap-<グループ>-2.xml … に分ける。
+           sitemap.xml はそれらを並べたサイトマップインデックス（robots.txt の参照先はそのまま）
+  書き込み 内容が変わったファイルだけ書く
+
+サイトマップは置いたディレクトリ以下の URL しか載せられないので、分割ファイルもサイト直下に置く。
+初回（状態ファイルが無いとき）は既存の sitemap.xml の lastmod / priority を引き継ぐ。
+
+Usage:
+  python3 build_sitemap.py                 # 変わったページの lastmod を更新して書き出す
+  python3 build_sitemap.py --dry-run       # 書き込まずに変更点だけ表示
+  python3 build_sitemap.py --list          # 載せる URL と除外した URL の一覧
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+ROOT = Path(__file__).parent
+BASE_URL = "https://native-real.com"
+INDEX_NAME = "sitemap.xml"
+STATE_PATH = ROOT / "data" / "sitemap_state.json"
+STATE_VERSION = 2
+STAT_CACHE_PATH = ROOT / ".pipeline_cache" / "sitemap_stat.json"   # {URL: [サイズ, mtime_ns, sha256]}
+
+MAX_URLS = 50_000                 # サイトマップ1ファイルあたりの上限（sitemaps.org）
+MAX_BYTES = 50 * 1024 * 1024
+GROUPS = ("articles", "real-phrases", "prompts")   # 独立したファイルにするディレクトリ（残りは pages）
+SKIP_DIRS = {"node_modules"}
+
+NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+_NOINDEX_RE = re.compile(r'<meta[^>]+name="robots"[^>]+content="[^"]*noindex', re.IGNORECASE)
+_REFRESH_RE = re.compile(r'<meta[^>]+http-equiv="refresh"', re.IGNORECASE)
+# 共通 CSS の <link ... data-shared-css> は shared_css が <style> の前に改行付きで足すので、後ろの空白ごと除く
+_VOLATILE_RE = re.compile(rb"<(script|style)\b.*?</\1>|<link\b[^>]*\bdata-shared-css>\s*|<link\b[^>]*>",
+                          re.DOTALL | re.IGNORECASE)
+_OLD_URL_RE = re.compile(
+    r"<url>\s*<loc>([^<]+)</loc>\s*(?:<lastmod>([^<]+)</lastmod>)?\s*(?:<priority>([^<]+)</priority>)?",
+)
+
+
+def today():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+# ── ページの列挙 ───────────────────────────
+def disallowed_prefixes(root):
+    robots = root / "robots.txt"
+    if not robots.exists():
+        return []
+    return [line.split(":", 1)[1].strip() for line in robots.read_text(encoding="utf-8").splitlines()
+            if line.lower().startswith("disallow:") and line.split(":", 1)[1].strip()]
+
+
+def page_url(root, path):
+    """index.html のパス → サイト内 URL（/articles/xxx/）"""
+    parent = path.parent.relative_to(root).as_posix()
+    return "/" if parent == "." else f"/{parent}/"
+
+
+def discover(root):
+    """サイトマップの候補 [(URL, パス)]。隠しディレクトリ・_site などの出力先は見ない"""
+    pages = []
+    for path in sorted(root.rglob("index.html")):
+        dirs = path.relative_to(root).parts[:-1]
+        if any(d.startswith((".", "_")) or d in SKIP_DIRS for d in dirs):
+            continue
+        pages.append((page_url(root, path), path))
+    return pages
+
+
+def exclusion(url, data, disallow):
+    """サイトマップに載せない理由（載せるなら None）"""
+    if any(url.startswith(prefix) for prefix in disallow):
+        return "robots.txt"
+    head = data[:8192].decode("utf-8", errors="replace")
+    if _NOINDEX_RE.search(head):
+        return "noindex"
+    if _REFRESH_RE.search(head):
+        return "リダイレクト"
+    return None
+
+
+def content_hash(data):
+    """本文のハッシュ。スクリプト・スタイル・<link> だけの変更（共通 CSS の切り出しなど）では変わらない"""
+    return hashlib.sha256(_VOLATILE_RE.sub(b"", data)).hexdigest()
+
+
+def default_priority(url):
+    if url == "/":
+        return "1.0"
+    depth = url.strip("/").count("/")
+    if depth == 0:
+        return "0.9"
+    return "0.8" if url.startswith("/prompts/") else "0.7"
+
+
+def group_of(url):
+    top = url.strip("/").split("/")[0]
+    return top if top in GROUPS else "pages"
+
+
+# ── 状態 ───────────────────────────────────
+def load_stat_cache(root):
+    """ページごとの [サイズ, mtime_ns, sha256]（ローカルのキャッシュ。無ければ全ページを読む）"""
+    try:
+        return json.loads((root / STAT_CACHE_PATH.relative_to(ROOT)).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def load_state(root):
+    """前回の状態。無ければ既存の sitemap.xml（<urlset> 形式）から lastmod / priority を引き継ぐ"""
+    path = root / STATE_PATH.relative_to(ROOT)
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+        if state.get("version") == 1:
+            # 旧形式はサイズ・mtime も持っていた。ハッシュ・lastmod・priority はそのまま引き継ぐ
+            for record in state["pages"].values():
+                record.pop("bytes", None)
+                record.pop("mtime_ns", None)
+            state["version"] = STATE_VERSION
+        if state.get("version") == STATE_VERSION:
+            state["stat"] = load_stat_cache(root)
+            return state
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+    state = {"version": STATE_VERSION, "pages": {}, "seed": {}, "stat": {}}
+    old = root / INDEX_NAME
+    if old.exists():
+        text = old.read_text(encoding="utf-8")
+        if "<urlset" in text:
+            for loc, lastmod, priority in _OLD_URL_RE.findall(text):
+                state["seed"][loc.replace(BASE_URL, "", 1)] = {"lastmod": lastmod or None, "priority": priority or None}
+    return state
+
+
+def save_state(root, state):
+    """ハッシュ・lastmod・priority は data/ に、サイズ・mtime は .pipeline_cache/ に書く"""
+    for path, data in ((root / STATE_PATH.relative_to(ROOT),
+                        json.dumps({k: v for k, v in state.items() if k not in ("seed", "stat")},
+                                   ensure_ascii=False, indent=1, sort_keys=True) + "\n"),
+                       (root / STAT_CACHE_PATH.relative_to(ROOT),
+                        json.dumps(state["stat"], separators=(",", ":")))):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def scan(root, state):
+    """全ページを見て state["pages"] を更新する。(載せる URL の {URL: 記録}, 除外 [(URL, 理由)], 変化 {URL: 種別})"""
+    previous = state["pages"]
+    seed = state.get("seed", {})
+    stat_cache = state.get("stat", {})
+    stats = {}
+    disallow = disallowed_prefixes(root)
+    pages = {}
+    excluded = []
+    changes = {}
+    date = today()
+    for url, path in discover(root):
+        st = path.stat()
+        old = previous.get(url)
+        if old and stat_cache.get(url) == [st.st_size, st.st_mtime_ns, old["sha256"]]:
+            if old.get("excluded"):
+                excluded.append((url, old["excluded"]))
+            pages[url] = old
+            stats[url] = stat_cache[url]
+            continue
+        data = path.read_bytes()
+        record = {"sha256": content_hash(data)}
+        stats[url] = [st.st_size, st.st_mtime_ns, record["sha256"]]
+        reason = exclusion(url, data, disallow)
+        if reason:
+            record["excluded"] = reason
+            excluded.append((url, reason))
+        if old and old["sha256"] == record["sha256"]:
+            record.update(lastmod=old["lastmod"], priority=old["priority"])
+        elif old:
+            record.update(lastmod=date, priority=old["priority"])
+            if not reason:
+                changes[url] = "更新"
+        else:
+            known = seed.get(url, {})
+            record.update(lastmod=known.get("lastmod") or date, priority=known.get("priority") or default_priority(url))
+            if not reason and url not in seed:
+                changes[url] = "追加"
+        pages[url] = record
+    changes.update({url: "削除" for url, r in previous.items() if url not in pages and not r.get("excluded")})
+    changes.update({url: "削除" for url in seed if url not in pages})
+    state["pages"] = pages
+    state["stat"] = stats
+    return {u: r for u, r in pages.items() if not r.get("excluded")}, excluded, changes
+
+
+# ── 書き出し ───────────────────────────────
+def render_urlset(entries):
+    lines = ["<?xml version='1.0' encoding='UTF-8'?>", f'<urlset xmlns="{NS}">']
+    for url, record in entries:
+        lines.append(f"  <url>\n    <loc>{escape(BASE_URL + url)}</loc>\n    <lastmod>{record['lastmod']}</lastmod>\n"
+                     f"    <priority>{record['priority']}</priority>\n  </url>")
+    lines.append("</urlset>\n")
+    return "\n".join(lines)
+
+
+def render_index(shards):
+    lines = ["<?xml version='1.0' encoding='UTF-8'?>", f'<sitemapindex xmlns="{NS}">']
+    for name, lastmod in shards:
+        lines.append(f"  <sitemap>\n    <loc>{BASE_URL}/{name}</loc>\n    <lastmod>{lastmod}</lastmod>\n  </sitemap>")
+    lines.append("</sitemapindex>\n")
+    return "\n".join(lines)
+
+
+def shard(pages):
+    """{ファイル名: [(URL, 記録)]}。グループごとに MAX_URLS 件・MAX_BYTES で区切る"""
+    groups = defaultdict(list)
+    for url in sorted(pages, key=lambda u: (u.count("/"), u)):
+        groups[group_of(url)].append((url, pages[url]))
+    files = {}
+    for group in ("pages", *GROUPS):
+        entries = groups.get(group)
+        if not entries:
+            continue
+        chunks = [[]]
+        size = 0
+        for entry in entries:
+            entry_size = len(entry[0]) + len(BASE_URL) + 120
+            if len(chunks[-1]) >= MAX_URLS or size + entry_size > MAX_BYTES - 1024:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(entry)
+            size += entry_size
+        for i, chunk in enumerate(chunks, 1):
+            files[f"sitemap-{group}.xml" if i == 1 else f"sitemap-{group}-{i}.xml"] = chunk
+    return files
+
+
+def write_if_changed(path, text, dry_run):
+    data = text.encode("utf-8")
+    if path.exists() and path.read_bytes() == data:
+        return False
+    if not dry_run:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return True
+
+
+def build(root=ROOT, dry_run=False):
+    """サイトマップを更新する。返り値は結果の dict（pages / excluded / changes / written / removed）"""
+    state = load_state(root)
+    pages, excluded, changes = scan(root, state)
+    files = shard(pages)
+    written = [name for name, entries in files.items()
+               if write_if_changed(root / name, render_urlset(entries), dry_run)]
+    index = [(name, max(r["lastmod"] for _, r in entries)) for name, entries in files.items()]
+    if write_if_changed(root / INDEX_NAME, render_index(index), dry_run):
+        written.append(INDEX_NAME)
+    removed = [p.name for p in root.glob("sitemap-*.xml") if p.name not in files]
+    if not dry_run:
+        for name in removed:
+            (root / name).unlink()
+        save_state(root, state)
+    return {"pages": pages, "excluded": excluded, "changes": changes, "written": written, "removed": removed,
+            "files": {name: len(entries) for name, entries in files.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="sitemap.xml（インデックス）と分割サイトマップを更新する")
+    parser.add_argument("--dry-run", action="store_true", help="書き込まずに変更点だけ表示")
+    parser.add_argument("--list", action="store_true", help="載せる URL と除外した URL を表示")
+    args = parser.parse_args()
+
+    result = build(dry_run=args.dry_run)
+    if args.list:
+        for url, record in sorted(result["pages"].items()):
+            print(f"  {record['lastmod']}  {record['priority']}  {url}")
+        for url, reason in sorted(result["excluded"]):
+            print(f"  （除外: {reason}）  {url}")
+    for url, kind in sorted(result["changes"].items()):
+        print(f"  {kind}  {url}")
+    files = ", ".join(f"{name} {n}件" for name, n in result["files"].items())
+    prefix = "[ドライラン] " if args.dry_run else ""
+    print(f"{prefix}{len(result['pages'])} URL（除外 {len(result['excluded'])}）→ {files}")
+    if result["written"] or result["removed"]:
+        print(f"{prefix}書き込み: {', '.join(result['written']) or 'なし'}"
+              + (f" / 削除: {', '.join(result['removed'])}" if result["removed"] else ""))
+    else:
+        print("変更なし")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+check_links.py - サイト内リンク・アセット参照のオフライン検査（デプロイ前チェック用）
+
+ネットワークには出ず、リポジトリのファイルだけで「参照先が存在するか」を調べる。
+
+  パス集合  サイト配下の全ファイル（隠しディレクトリ・_site などの出力先・node_modules は除く）を
+            1回だけ列挙して集合にする
+  参照      *.html / *.js の href="…" / src="…"、questions.js の audio: "…"、
+            fetch(`data/words/${r.file}`) のようなテンプレート（同じファイル内の file:'…' の値で展開）。
+            Python 側のリンク定義（ARTICLE_LINKS・ヘッダーのナビ・NAV_ITEMS など、LINK_SOURCES）は
+            ('/…', ラベル) のタプルとテンプレート内の href="/…" を参照として扱う
+  解決      /foo/ → foo/index.html、/foo → foo・foo/index.html・foo.html（GitHub Pages と同じ）。
+            相対パスはそのファイルのディレクトリ基準（questions.js は読み込むページと同じディレクトリにある）。
+            外部 URL・mailto: など・#だけのリンク・式を含む動的な参照は見ない
+  並列      ファイルの読み込みと参照の抽出はプロセスプールで行う。抽出結果は内容の sha256 ごとに
+            .pipeline_cache/check_links.json に保存し、mtime・サイズが同じファイルは読まない。
+            パス集合との照合は毎回やり直す（ファイルが消えた・増えただけでも結果に反映される）
+
+Usage:
+  python3 check_links.py                 # 全ファイルを検査して切れた参照を表示
+  python3 check_links.py --strict        # 切れた参照があれば exit 1（デプロイ前チェック用）
+  python3 check_links.py --verbose       # 参照元をすべて表示
+  python3 check_links.py --full          # キャッシュを使わずに読み直す
+"""
+
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import unquote
+
+ROOT = Path(__file__).parent
+CACHE_PATH = ROOT / ".pipeline_cache" / "check_links.json"
+CACHE_VERSION = 1
+
+SCAN_SUFFIXES = (".html", ".js")
+SKIP_DIRS = {"node_modules"}
+# サイトには出ないが、ページに埋め込むリンクを定義している Python ファイル
+LINK_SOURCES = ("add_internal_links.py", "unify_headers.py", "convert_real_phrases.py", "generate_articles.py")
+
+_ATTR_RE = re.compile(r"""\b(href|src|poster)\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_AUDIO_RE = re.compile(r"""\baudio\s*:\s*(?:"([^"]*)"|'([^']*)')""")
+_FETCH_RE = re.compile(r"""\bfetch\(\s*(?:"([^"]*)"|'([^']*)'|`([^`]*)`)""")
+_TEMPLATE_RE = re.compile(r"\$\{\s*[\w.]*?(\w+)\s*\}")
+# Python 側は (URL, ラベル) のタプルの先頭と、テンプレート内の href="/…" だけを見る（ファイルパスの文字列は拾わない）
+_PY_LINK_RE = re.compile(r"""\(\s*(["'])(/(?:[A-Za-z0-9][\w\-./]*)?)\1\s*,|href=(["'])(/(?:[A-Za-z0-9][\w\-./]*)?)\3""")
+_EXTERNAL_RE = re.compile(r"^(?:[a-z][a-z0-9+.\-]*:|//)", re.IGNORECASE)
+_DYNAMIC_RE = re.compile(r"\$\{|\{\{|[{}<>+\s\\]|'|\"")
+
+
+# ── ファイルの列挙 ─────────────────────────
+def walk(root):
+    """サイト配下の全ファイルの相対パス（posix）"""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith((".", "_")) and d not in SKIP_DIRS]
+        base = Path(dirpath).relative_to(root).as_posix()
+        prefix = "" if base == "." else base + "/"
+        paths.extend(prefix + name for name in filenames)
+    return paths
+
+
+# ── 参照の抽出（プロセスプールから呼ばれる） ──
+def _is_checkable(ref):
+    return bool(ref) and not ref.startswith("#") and not _EXTERNAL_RE.match(ref)
+
+
+def normalize(ref, base_dir):
+    """参照 → サイト内の相対パス（末尾 / はディレクトリ）。サイトの外に出るなら None"""
+    path = unquote(ref.split("#", 1)[0].split("?", 1)[0])
+    if not path:
+        return None
+    trailing = path.endswith("/")
+    joined = path if path.startswith("/") else posixpath.join("/", base_dir, path)
+    norm = posixpath.normpath(joined)
+    if norm.startswith("//") or ".." in norm.split("/"):
+        return None
+    rel = norm.lstrip("/")
+    if trailing and rel:
+        rel += "/"
+    return rel
+
+
+def _expand_template(template, text):
+    """`data/words/${r.file}` → 同じファイル内の file:'…' の値で展開したパスのリスト（展開できなければ []）"""
+    names = _TEMPLATE_RE.findall(template)
+    if len(names) != 1:
+        return []
+    values = re.findall(r"""\b%s\s*:\s*(?:"([^"]+)"|'([^']+)')""" % re.escape(names[0]), text)
+    return [_TEMPLATE_RE.sub(lambda _: a or b, template) for a, b in values]
+
+
+def extract_refs(rel, text):
+    """[(行番号, 種別, 参照)]。動的で検査できない参照の数も返す"""
+    refs = []
+    dynamic = 0
+    if rel.endswith(".py"):
+        patterns = [("href", m.start(), m.group(2) if m.group(2) is not None else m.group(4))
+                    for m in _PY_LINK_RE.finditer(text)]
+    else:
+        patterns = [(m.group(1).lower(), m.start(), m.group(2) if m.group(2) is not None else m.group(3))
+                    for m in _ATTR_RE.finditer(text)]
+        if rel.endswith(".js") or "<script" in text:
+            patterns += [("audio", m.start(), m.group(1) if m.group(1) is not None else m.group(2))
+                         for m in _AUDIO_RE.finditer(text)]
+            for m in _FETCH_RE.finditer(text):
+                ref = next(g for g in m.groups() if g is not None)
+                if m.group(3) is not None and "${" in ref:
+                    expanded = _expand_template(ref, text)
+                    if not expanded:
+                        dynamic += 1
+                    patterns += [("fetch", m.start(), e) for e in expanded]
+                else:
+                    patterns.append(("fetch", m.start(), ref))
+    line_starts = [m.start() for m in re.finditer("\n", text)] if patterns else []
+    for kind, pos, ref in patterns:
+        ref = ref.strip()
+        if not _is_checkable(ref):
+            continue
+        if _DYNAMIC_RE.search(ref):
+            dynamic += 1
+            continue
+        refs.append((_line_of(line_starts, pos), kind, ref))
+    return refs, dynamic
+
+
+def _line_of(line_starts, pos):
+    return bisect.bisect_left(line_starts, pos) + 1
+
+
+def scan_file(rel):
+    """1ファイルを読み、(sha256, {参照先: [行番号, 種別, 元の参照]}, 動的な参照の数) を返す"""
+    data = (ROOT / rel).read_bytes()
+    text = data.decode("utf-8", errors="replace")
+    base_dir = posixpath.dirname(rel)
+    targets = {}
+    refs, dynamic = extract_refs(rel, text)
+    for line, kind, ref in refs:
+        target = normalize(ref, "" if rel.endswith(".py") else base_dir)
+        key = target if target is not None else "../" + ref
+        targets.setdefault(key, [line, kind, ref])
+    return hashlib.sha256(data).hexdigest(), targets, dynamic
+
+
+# ── 照合 ───────────────────────────────────
+def exists(target, paths):
+    if target.startswith("../"):
+        return False
+    if target == "" or target.endswith("/"):
+        return target + "index.html" in paths
+    return target in paths or target + "/index.html" in paths or target + ".html" in paths
+
+
+def load_cache():
+    try:
+        cache = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        if cache.get("version") == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "files": {}}
+
+
+def save_cache(cache):
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, CACHE_PATH)
+
+
+def check(full=False, workers=None):
+    """全ファイルを検査する。結果の dict（files / scanned / refs / dynamic / broken）を返す。
+    broken は {参照先: [(参照元, 行番号, 種別, 元の参照)]}"""
+    all_paths = walk(ROOT)
+    paths = set(all_paths)
+    sources = [p for p in all_paths if p.endswith(SCAN_SUFFIXES)]
+    sources += [p for p in LINK_SOURCES if p in paths]
+
+    cache = {"version": CACHE_VERSION, "files": {}} if full else load_cache()
+    previous = cache["files"]
+    files = {}
+    to_scan = []
+    for rel in sources:
+        st = (ROOT / rel).stat()
+        old = previous.get(rel)
+        if old and (old["bytes"], old["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+            files[rel] = old
+        else:
+            files[rel] = {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns}
+            to_scan.append(rel)
+
+    if to_scan:
+        # mtime だけ変わった（チェックアウトし直した・内容が同じに戻った）ファイルは前回の抽出結果を使う
+        by_hash = {e["sha256"]: e for e in previous.values()}
+        parse = []
+        for rel in to_scan:
+            old = by_hash.get(hashlib.sha256((ROOT / rel).read_bytes()).hexdigest())
+            if old and not rel.endswith(".py") and posixpath.dirname(rel) == old["dir"]:
+                files[rel].update(sha256=old["sha256"], dir=old["dir"], targets=old["targets"], dynamic=old["dynamic"])
+            else:
+                parse.append(rel)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(parse) // ((workers or os.cpu_count() or 1) * 8))
+            for rel, (digest, targets, dynamic) in zip(parse, pool.map(scan_file, parse, chunksize=chunksize)):
+                files[rel].update(sha256=digest, dir=posixpath.dirname(rel), targets=targets, dynamic=dynamic)
+        to_scan = parse
+    cache["files"] = files
+    save_cache(cache)
+
+    broken = defaultdict(list)
+    for rel, entry in files.items():
+        for target, (line, kind, ref) in entry["targets"].items():
+            if not exists(target, paths):
+                broken[target].append((rel, line, kind, ref))
+    return {
+        "files": len(files),
+        "scanned": len(to_scan),
+        "refs": sum(len(e["targets"]) for e in files.values()),
+        "dynamic": sum(e["dynamic"] for e in files.values()),
+        "broken": dict(broken),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="サイト内リンク・アセット参照をオフラインで検査する")
+    parser.add_argument("--strict", action="store_true", help="切れた参照があれば exit 1（デプロイ前チェック用）")
+    parser.add_argument("--verbose", action="store_true", help="参照元をすべて表示")
+    parser.add_argument("--full", action="store_true", help="キャッシュを使わずに全ファイルを読み直す")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数（デフォルト: CPU数）")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    result = check(full=args.full, workers=args.workers)
+    wall = time.monotonic() - started
+    broken = result["broken"]
+    print(f"{result['files']} ファイル / 参照先 {result['refs']:,} 件を検査"
+          f"（読み直し {result['scanned']} / 動的で未検査 {result['dynamic']}）（{wall:.1f}s）")
+    for target in sorted(broken):
+        refs = sorted(broken[target])
+        print(f"  ❌ {target.removeprefix('../') if target.startswith('../') else '/' + target}"
+              f"（{len(refs)} ファイルから参照）")
+        for rel, line, kind, ref in refs if args.verbose else refs[:3]:
+            print(f"      {rel}:{line} {kind}=\"{ref}\"")
+        if not args.verbose and len(refs) > 3:
+            print(f"      ...他 {len(refs) - 3} ファイル（--verbose で全件表示）")
+    if broken:
+        print(f"切れた参照: {len(broken)} 件")
+    else:
+        print("切れた参照はありません")
+
+    if args.strict and broken:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
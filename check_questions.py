@@ -32,10 +32,12 @@ except ImportError:
 
 from dotenv import load_dotenv
 
+import pipeline_trace as trace
+
 load_dotenv()
 
 REPO_ROOT = Path(__file__).parent
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+client = trace.instrument(Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY")))
 
 
 # ─────────────────────────────────────────
@@ -66,26 +68,45 @@ QUIZ_TYPES = {
 }
 
 
+_JS_TOKEN_RE = re.compile(r'"(?:[^"\\\n]|\\.)*"|(?:(?<=[{,\s])|^)(\w+)\s*:|,(\s*[\]}])')
+
+
+def _js_to_json(m):
+    if m.group(1):
+        return f'"{m.group(1)}":'
+    if m.group(2):
+        return m.group(2)
+    return m.group(0)
+
+
 def load_questions(filepath, quiz_type):
     """JSONまたはquestions.jsから問題を読み込む"""
     content = Path(filepath).read_text(encoding="utf-8").strip()
 
     if filepath.endswith(".js"):
         # questions.js 形式: const DATA = [...];
-        # コメント行を除去
-        lines = [line for line in content.split('\n') if not line.strip().startswith('//')]
-        content_no_comments = '\n'.join(lines)
-        match = re.search(r'\[.*\]', content_no_comments, re.DOTALL)
-        if not match:
+        # 1行ずつ、コメント行を除き、JS object key: value -> "key": value (キーにクォートがない場合)、
+        # trailing commas を消す。文字列リテラルはそのまま読み飛ばす（"Attention passengers: ..." の
+        # ような本文中の「語:」をキーと取り違えない）。元の文字列は行のリストに置き換えて持たない
+        lines = content.split('\n')
+        del content
+        prev = None   # 直前の空でない行（行末の trailing comma を次の行の ] / } を見て消す）
+        for i, line in enumerate(lines):
+            line = '' if line.lstrip().startswith('//') else _JS_TOKEN_RE.sub(_js_to_json, line)
+            if prev is not None and line.lstrip().startswith((']', '}')) and lines[prev].rstrip().endswith(','):
+                lines[prev] = lines[prev].rstrip()[:-1]
+            lines[i] = line
+            if line.strip():
+                prev = i
+        js_data = '\n'.join(lines)
+        del lines
+        start = js_data.find('[')
+        if start < 0 or js_data.rfind(']') < start:
             print(f"ERROR: {filepath} からデータを抽出できません")
             sys.exit(1)
-        js_data = match.group(0)
-        # JS object key: value -> "key": value (キーにクォートがない場合)
-        js_data = re.sub(r'(?<=[{,\s])(\w+)\s*:', r'"\1":', js_data)
-        # trailing commas
-        js_data = re.sub(r',\s*([\]}])', r'\1', js_data)
         try:
-            questions = json.loads(js_data)
+            # 最初の [ から配列1つ分だけ読む（切り出したコピーを作らない）
+            questions = json.JSONDecoder().raw_decode(js_data, start)[0]
         except json.JSONDecodeError as e:
             # デバッグ: エラー位置の前後を表示
             pos = e.pos if hasattr(e, 'pos') else 0
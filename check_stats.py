@@ -56,8 +56,12 @@ def is_allowlisted(line: str) -> bool:
 
 def check_file(html_path: Path) -> list[tuple[int, str, str]]:
     """1ファイルを検査して (行番号, マッチ理由, 行テキスト) のリストを返す"""
+    return check_text(html_path.read_text(encoding="utf-8"))
+
+
+def check_text(text: str) -> list[tuple[int, str, str]]:
+    """HTML 文字列を検査して (行番号, マッチ理由, 行テキスト) のリストを返す"""
     hits = []
-    text = html_path.read_text(encoding="utf-8")
     for lineno, line in enumerate(text.splitlines(), 1):
         if is_allowlisted(line):
             continue
@@ -93,7 +97,13 @@ def check_citation_links(
     ・<script>/<style> ブロック内のマッチはスキップ
     ・いずれか1件でもリンク済みなら「付与済み」と判断（過剰警告防止）
     """
-    text = html_path.read_text(encoding="utf-8")
+    return check_citation_text(html_path.read_text(encoding="utf-8"), citation_entries)
+
+
+def check_citation_text(
+    text: str, citation_entries: list[tuple[str, str, str]]
+) -> list[tuple[str, str]]:
+    """check_citation_links の HTML 文字列版"""
     flagged: set[str] = set()
     hits = []
     for entry_id, label, kw_pattern in citation_entries:
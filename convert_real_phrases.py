@@ -8,6 +8,9 @@ import re
 import html as htmllib
 from pathlib import Path
 
+import site_templates
+import unify_headers
+
 SOURCE_DIR = Path("/tmp/native-real/content/real-phrases")
 OUTPUT_DIR = Path("/Users/yusuke/projects/claude/eikaiwa-hikaku/real-phrases")
 SITE_NAME = "英語学習サービス比較ナビ"
@@ -16,73 +19,32 @@ GTM_ID = "GTM-PS9R9844"
 
 # ─────────────────── 共通パーツ ───────────────────
 
-NAV_ITEMS = [
-    ('/', 'ランキング'),
-    ('/articles/', '学習コラム'),
-    ('/real-phrases/', 'フレーズ集'),
-    ('/listening/', 'リスニングクイズ'),
-]
-
-def build_header(active_path='/real-phrases/'):
-    nav_links = ''.join(
-        f'<a href="{url}"{" class=\"active\"" if url == active_path else ""}>{label}</a>'
-        for url, label in NAV_ITEMS
-    )
-    mobile_links = ''.join(f'<a href="{url}">{label}</a>' for url, label in NAV_ITEMS)
-    hamburger = 'document.querySelector(\'.hamburger\').classList.toggle(\'active\');document.querySelector(\'.mobile-nav-overlay\').classList.toggle(\'active\');document.body.style.overflow=document.querySelector(\'.mobile-nav-overlay\').classList.contains(\'active\')?\'hidden\':\'\';'
-    mobile_close = 'if(event.target===this||event.target.tagName===\'A\'){this.classList.remove(\'active\');document.querySelector(\'.hamburger\').classList.remove(\'active\');document.body.style.overflow=\'\'}'
-    return f'''<header class="site-header">
-  <div class="container">
-    <a href="/" class="logo">{SITE_NAME}</a>
-    <nav>{nav_links}</nav>
-    <button class="hamburger" aria-label="メニューを開く" onclick="{hamburger}">
-      <span></span><span></span><span></span>
-    </button>
-  </div>
-</header>
-<div class="mobile-nav-overlay" onclick="{mobile_close}">
-  {mobile_links}
-</div>'''
-
-FOOTER_HTML = '''<footer class="site-footer">
-  <div class="container">
-    <div class="footer-grid">
-      <div>
-        <h4>英語学習サービス比較ナビ</h4>
-        <p>プロが選ぶオンライン英会話・英語アプリ徹底比較</p>
-        <p style="margin-top:12px;">※当サイトはアフィリエイトリンクを含みます。</p>
-        <div class="footer-owner">
-          <span class="footer-owner-label">運営者</span>
-          <a href="https://x.com/ichi_eigo" target="_blank" rel="noopener"><svg viewBox="0 0 24 24" xmlns="http://www.w3.org/2000/svg"><path d="M18.244 2.25h3.308l-7.227 8.26 8.502 11.24H16.17l-5.214-6.817L4.99 21.75H1.68l7.73-8.835L1.254 2.25H8.08l4.713 6.231zm-1.161 17.52h1.833L7.084 4.126H5.117z"/></svg>@ichi_eigo</a>
-        </div>
-      </div>
-      <div>
-        <h4>サービス一覧</h4>
-        <ul>
-          <li><a href="/services/dmm-eikaiwa/">DMM英会話</a></li>
-          <li><a href="/services/rarejob/">レアジョブ英会話</a></li>
-          <li><a href="/services/nativecamp/">ネイティブキャンプ</a></li>
-          <li><a href="/services/cambly/">Cambly</a></li>
-          <li><a href="/services/bizmates/">Bizmates</a></li>
-          <li><a href="/services/progrit/">プログリット</a></li>
-          <li><a href="/services/italki/">italki</a></li>
-        </ul>
-      </div>
-      <div>
-        <h4>コンテンツ</h4>
-        <ul>
-          <li><a href="/articles/">学習コラム一覧</a></li>
-          <li><a href="/real-phrases/">フレーズ集</a></li>
-          <li><a href="/listening/">リスニングクイズ</a></li>
-          <li><a href="/">ランキングTOP</a></li>
-        </ul>
-      </div>
-    </div>
-    <div class="footer-bottom">
-      <p>© 2026 英語学習サービス比較ナビ. All rights reserved.</p>
-    </div>
-  </div>
-</footer>'''
+# ヘッダー（CSS・JS 込み）は unify_headers と同じ _templates/partials/site_header を使う
+PHRASES_HREF = '/real-phrases/'
+HEADER_HTML = unify_headers.build_header(PHRASES_HREF)
+HEADER_CSS = unify_headers.HEADER_CSS
+HEADER_JS = unify_headers.HEADER_JS
+
+FOOTER_HTML = site_templates.render('partials/site_footer', {
+    'site_name': SITE_NAME,
+    'year': 2026,
+    'owner': True,
+    'services': [
+        {'href': '/services/dmm-eikaiwa/', 'label': 'DMM英会話'},
+        {'href': '/services/rarejob/', 'label': 'レアジョブ英会話'},
+        {'href': '/services/nativecamp/', 'label': 'ネイティブキャンプ'},
+        {'href': '/services/cambly/', 'label': 'Cambly'},
+        {'href': '/services/bizmates/', 'label': 'Bizmates'},
+        {'href': '/services/progrit/', 'label': 'プログリット'},
+        {'href': '/services/italki/', 'label': 'italki'},
+    ],
+    'contents': [
+        {'href': '/articles/', 'label': '学習コラム一覧'},
+        {'href': PHRASES_HREF, 'label': 'フレーズ集'},
+        {'href': '/listening/', 'label': 'リスニングクイズ'},
+        {'href': '/', 'label': 'ランキングTOP'},
+    ],
+})
 
 BASE_CSS = ''':root{--primary:#2563eb;--primary-light:#3b82f6;--primary-dark:#1d4ed8;--primary-pale:#eff6ff;--accent:#10b981;--accent-dark:#059669;--accent-pale:#ecfdf5;--text:#111827;--text-muted:#6b7280;--bg:#ffffff;--bg-gray:#f9fafb;--border:#e5e7eb;--shadow:0 1px 3px rgba(0,0,0,0.06),0 2px 8px rgba(0,0,0,0.04);--shadow-md:0 4px 16px rgba(0,0,0,0.08),0 8px 24px rgba(0,0,0,0.05);--radius:10px;--radius-lg:14px;}
 *,*::before,*::after{box-sizing:border-box;margin:0;padding:0;}
@@ -91,20 +53,6 @@ body{font-family:"Inter","Noto Sans JP",-apple-system,BlinkMacSystemFont,"Hiragi
 a{color:var(--primary);}a:hover{color:var(--primary-light);}
 img{max-width:100%;height:auto;}
 .container{max-width:1100px;margin:0 auto;padding:0 20px;}
-.site-header{background:#ffffff;color:var(--text);padding:14px 0;position:sticky;top:0;z-index:100;box-shadow:0 1px 0 var(--border);}
-.site-header .container{display:flex;align-items:center;justify-content:space-between;}
-.site-header .logo{font-size:1.0rem;font-weight:700;color:var(--text);text-decoration:none;letter-spacing:0.03em;}
-.site-header nav a{color:var(--text-muted);text-decoration:none;margin-left:24px;font-size:0.88rem;border-bottom:2px solid transparent;padding-bottom:2px;transition:color 0.2s,border-color 0.2s;}
-.site-header nav a:hover,.site-header nav a.active{color:var(--text);border-color:var(--primary);}
-.hamburger{display:none;background:none;border:none;cursor:pointer;padding:4px;width:36px;height:36px;position:relative;z-index:102;}
-.hamburger span{display:block;width:22px;height:2px;background:var(--text);margin:5px auto;border-radius:2px;transition:transform 0.3s,opacity 0.3s;}
-.hamburger.active span:nth-child(1){transform:translateY(7px) rotate(45deg);}
-.hamburger.active span:nth-child(2){opacity:0;}
-.hamburger.active span:nth-child(3){transform:translateY(-7px) rotate(-45deg);}
-.mobile-nav-overlay{display:none;position:fixed;inset:0;background:rgba(17,24,39,0.95);z-index:101;flex-direction:column;align-items:center;justify-content:center;gap:24px;}
-.mobile-nav-overlay.active{display:flex;}
-.mobile-nav-overlay a{color:white;text-decoration:none;font-size:1.2rem;font-weight:600;padding:12px 24px;border-radius:var(--radius);transition:background 0.2s;}
-.mobile-nav-overlay a:hover{background:rgba(255,255,255,0.1);}
 .breadcrumb{padding:12px 0;font-size:0.82rem;color:var(--text-muted);}
 .breadcrumb a{color:var(--text-muted);text-decoration:none;}
 .breadcrumb a:hover{color:var(--primary);}
@@ -169,7 +117,7 @@ img{max-width:100%;height:auto;}
 .related-phrases li{padding:8px 0;border-bottom:1px solid var(--border);font-size:0.93rem;}
 .related-phrases li:last-child{border-bottom:none;}
 @media(max-width:1024px){.article-layout{grid-template-columns:1fr;} .sidebar{display:none;}}
-@media(max-width:768px){.site-header nav{display:none;} .hamburger{display:block;} .article-content h1{font-size:1.3rem;} .footer-grid{grid-template-columns:1fr;}}'''
+@media(max-width:768px){.article-content h1{font-size:1.3rem;} .footer-grid{grid-template-columns:1fr;}}'''
 
 # ─────────────────── パーサー ───────────────────
 
@@ -467,6 +415,7 @@ def generate_page(meta: dict, json_ld: str, body: str) -> str:
   <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
   <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&family=Noto+Sans+JP:wght@400;600;700;800&display=swap" rel="stylesheet">
   <style>
+    {HEADER_CSS}
 {BASE_CSS}
   </style>
 </head>
@@ -475,7 +424,7 @@ def generate_page(meta: dict, json_ld: str, body: str) -> str:
   <noscript><iframe src="https://www.googletagmanager.com/ns.html?id={GTM_ID}"
   height="0" width="0" style="display:none;visibility:hidden"></iframe></noscript>
   <!-- End Google Tag Manager (noscript) -->
-{build_header('/real-phrases/')}
+{HEADER_HTML}
 <div class="breadcrumb container">
   <a href="/">ホーム</a><span>›</span>
   <a href="/real-phrases/">フレーズ集</a><span>›</span>
@@ -505,7 +454,7 @@ def generate_page(meta: dict, json_ld: str, body: str) -> str:
     </aside>
   </div>
 </div>
-{FOOTER_HTML}
+{FOOTER_HTML}{HEADER_JS}
 </body>
 </html>'''
 
@@ -564,6 +513,7 @@ def generate_index(all_meta: list) -> str:
   <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
   <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&family=Noto+Sans+JP:wght@400;600;700;800&display=swap" rel="stylesheet">
   <style>
+    {HEADER_CSS}
 {BASE_CSS}
 {index_css}
   </style>
@@ -571,7 +521,7 @@ def generate_index(all_meta: list) -> str:
 <body>
   <noscript><iframe src="https://www.googletagmanager.com/ns.html?id={GTM_ID}"
   height="0" width="0" style="display:none;visibility:hidden"></iframe></noscript>
-{build_header('/real-phrases/')}
+{HEADER_HTML}
 <section class="phrases-hero">
   <div class="container">
     <h1>ネイティブ英語フレーズ集</h1>
@@ -583,7 +533,7 @@ def generate_index(all_meta: list) -> str:
     {cards}
   </div>
 </div>
-{FOOTER_HTML}
+{FOOTER_HTML}{HEADER_JS}
 </body>
 </html>'''
 
@@ -5,20 +5,32 @@
 native-real/articles/{slug}/index.html に直接書き出す。
 APIキーは .env の ANTHROPIC_API_KEY から読み込む（ソースコードに書かないこと）。
 
+API 呼び出し（本文・メタディスクリプション）は全トピック分をまとめて同時に投げ
+（tools.content_gen.generate_articles。同時実行数と1分あたりの開始数に上限あり）、
+できた記事から順に HTML 化・引用リンク付与・書き出しをプロセスプールで行う。
+関連記事グラフ（data/related_articles.json）・内部リンク・sitemap・検索インデックスは最後に1回だけ更新する。
+
 使い方:
   python3 generate_articles.py            # 1件生成（デフォルト）
   python3 generate_articles.py --count 5  # 5件生成
+  python3 generate_articles.py --count 20 --concurrency 6 --rpm 50
   python3 generate_articles.py --list     # 未生成トピック一覧を表示
+  python3 generate_articles.py --rebuild  # テンプレートを変えたあと、保存済みの本文から全記事を書き直す（API不要）
+  python3 generate_articles.py --rebuild toeic-700-guide   # 指定記事だけ書き直す
+
+生成した記事の本文（Markdown）とメタ情報は data/article_sources/{slug}.json に残す。
+HTML 化は「本文 → 本文HTML と見出し（本文のハッシュでキャッシュ）」と「テンプレート」の2段で、
+--rebuild はキャッシュが当たればテンプレートの段と書き出しだけを行う。
 """
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
 import re
-import subprocess
 import sys
-import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -27,22 +39,52 @@ from dotenv import load_dotenv
 # ─── APIキー読み込み（.env のみ。ソースコードに書かない） ───────────────
 load_dotenv()
 API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
-if not API_KEY:
-    print("エラー: ANTHROPIC_API_KEY が .env に設定されていません")
-    print("  .env ファイルに以下を追記してください:")
-    print("  ANTHROPIC_API_KEY=sk-ant-api03-...")
-    sys.exit(1)
+
+
+def _require_api_key() -> None:
+    """記事生成（API 呼び出し）をするときだけ確認する。--list / --rebuild には不要"""
+    if not API_KEY:
+        print("エラー: ANTHROPIC_API_KEY が .env に設定されていません")
+        print("  .env ファイルに以下を追記してください:")
+        print("  ANTHROPIC_API_KEY=sk-ant-api03-...")
+        sys.exit(1)
 # ─────────────────────────────────────────────────────────────────────────────
 
 sys.path.insert(0, str(Path(__file__).parent))
-from tools.content_gen import generate_article
+from tools.content_gen import DEFAULT_CONCURRENCY, DEFAULT_RPM, generate_articles
+
+import add_citations
+import add_internal_links
+import build_search_index
+import build_sitemap
+import site_templates
+import unify_headers
 
 SITE_NAME = "英語学習サービス比較ナビ"
 BASE_URL = "https://native-real.com"
 GTM_ID = "GTM-PS9R9844"
 TOPICS_PATH = Path("data/article_topics.json")
 ARTICLES_DIR = Path("articles")
-SITEMAP_PATH = Path("sitemap.xml")
+SOURCES_DIR = Path("data/article_sources")   # 記事ごとの本文（Markdown）とメタ情報。--rebuild の入力
+SOURCE_FIELDS = ("slug", "title", "meta_description", "category", "published", "content")
+
+ARTICLES_HREF = "/articles/"   # ヘッダーで active にするナビ（unify_headers.detect_active_page と同じ判定）
+
+# フッターのリンク（_templates/partials/site_footer）
+FOOTER_SERVICES = [
+    {"href": "/services/dmm-eikaiwa/", "label": "DMM英会話"},
+    {"href": "/services/rarejob/", "label": "レアジョブ英会話"},
+    {"href": "/services/nativecamp/", "label": "ネイティブキャンプ"},
+    {"href": "/services/cambly/", "label": "Cambly"},
+    {"href": "/services/bizmates/", "label": "Bizmates"},
+    {"href": "/services/progrit/", "label": "プログリット"},
+]
+FOOTER_CONTENTS = [
+    {"href": "/articles/", "label": "学習コラム一覧"},
+    {"href": "/listening/", "label": "リスニングクイズ"},
+    {"href": "/prompts/", "label": "AIプロンプト"},
+    {"href": "/", "label": "ランキングTOP"},
+]
 
 CSS = """:root{--primary:#2563eb;--primary-light:#3b82f6;--primary-dark:#1d4ed8;--primary-pale:#eff6ff;--accent:#10b981;--accent-dark:#059669;--accent-pale:#ecfdf5;--text:#111827;--text-muted:#6b7280;--bg:#ffffff;--bg-gray:#f9fafb;--border:#e5e7eb;--shadow:0 1px 3px rgba(0,0,0,0.06),0 2px 8px rgba(0,0,0,0.04);--shadow-md:0 4px 16px rgba(0,0,0,0.08),0 8px 24px rgba(0,0,0,0.05);--radius:10px;--radius-lg:14px;}
 *,*::before,*::after{box-sizing:border-box;margin:0;padding:0;}
@@ -51,21 +93,6 @@ body{font-family:"Inter","Noto Sans JP",-apple-system,BlinkMacSystemFont,"Hiragi
 a{color:var(--primary);}a:hover{color:var(--primary-light);}
 img{max-width:100%;height:auto;}
 .container{max-width:1100px;margin:0 auto;padding:0 20px;}
-.site-header{background:#fff;color:var(--text);padding:14px 0;position:sticky;top:0;z-index:100;box-shadow:0 1px 0 var(--border);}
-.site-header .container{display:flex;align-items:center;justify-content:space-between;}
-.site-header .logo{font-size:1rem;font-weight:700;color:var(--text);text-decoration:none;letter-spacing:.03em;}
-.site-header .logo span{color:var(--primary);}
-.site-header nav a{color:var(--text-muted);text-decoration:none;margin-left:24px;font-size:.88rem;border-bottom:2px solid transparent;padding-bottom:2px;transition:color .2s,border-color .2s;}
-.site-header nav a:hover{color:var(--text);border-color:var(--primary);}
-.hamburger{display:none;background:none;border:none;cursor:pointer;padding:4px;width:36px;height:36px;position:relative;z-index:102;}
-.hamburger span{display:block;width:22px;height:2px;background:var(--text);margin:5px auto;border-radius:2px;transition:transform .3s,opacity .3s;}
-.hamburger.active span:nth-child(1){transform:translateY(7px) rotate(45deg);}
-.hamburger.active span:nth-child(2){opacity:0;}
-.hamburger.active span:nth-child(3){transform:translateY(-7px) rotate(-45deg);}
-.mobile-nav-overlay{display:none;position:fixed;inset:0;background:rgba(17,24,39,.95);z-index:101;flex-direction:column;align-items:center;justify-content:center;gap:24px;}
-.mobile-nav-overlay.active{display:flex;}
-.mobile-nav-overlay a{color:#fff;text-decoration:none;font-size:1.2rem;font-weight:600;padding:12px 24px;border-radius:var(--radius);transition:background .2s;}
-.mobile-nav-overlay a:hover{background:rgba(255,255,255,.1);}
 .breadcrumb{padding:12px 0;font-size:.82rem;color:var(--text-muted);}
 .breadcrumb a{color:var(--text-muted);text-decoration:none;}
 .breadcrumb a:hover{color:var(--primary);}
@@ -122,268 +149,186 @@ img{max-width:100%;height:auto;}
 .site-footer a{color:rgba(255,255,255,.6);text-decoration:none;transition:color .2s;}
 .site-footer a:hover{color:#f0a080;}
 .footer-bottom{border-top:1px solid rgba(255,255,255,.1);padding-top:20px;text-align:center;font-size:.78rem;color:rgba(255,255,255,.4);}
-@media(max-width:768px){.site-header nav{display:none;}.hamburger{display:block;}.article-layout{grid-template-columns:1fr;}.sidebar{display:none;}.footer-grid{grid-template-columns:1fr;}}"""
+@media(max-width:768px){.article-layout{grid-template-columns:1fr;}.sidebar{display:none;}.footer-grid{grid-template-columns:1fr;}}"""
 
 
-# ─── Markdownシンプル変換 ────────────────────────────────────────────────────
-def _md_to_html(text: str) -> str:
-    lines = text.split("\n")
-    out: list[str] = []
-    in_ul = in_ol = in_table = False
-    table_rows: list[str] = []
+# ─── Markdown → 本文HTML（テンプレートに依存しない段） ───────────────────────
+# 本文（Markdown）のハッシュごとに .pipeline_cache/article_render/<sha256>.json に
+# {html, headings} を保存する。テンプレート（CSS・ヘッダー・クイズ導線など）だけを変えて
+# --rebuild したときはここを読み直すだけで、Markdown の解析はやり直さない。
+RENDER_VERSION = 2   # レンダラーの出力を変えたら上げる（古いキャッシュは使われなくなる）
+RENDER_CACHE_DIR = Path(".pipeline_cache/article_render")
+
+# 強調（**太字** / *斜体*）は記号を外すだけ。1回の走査で両方を処理する（太字の中の斜体も外す）
+_INLINE_RE = re.compile(r"\*\*(.+?)\*\*|\*(.+?)\*")
+_OL_ITEM_RE = re.compile(r"^\d+\.\s")
+_TABLE_SEP_RE = re.compile(r"[-:]+")
+_ANCHOR_RE = re.compile(r"[^a-z0-9]")
+
+
+def _inline(s: str) -> str:
+    return _INLINE_RE.sub(lambda m: _inline(m.group(1)) if m.group(1) is not None else m.group(2), s)
+
 
-    def flush_list() -> None:
-        nonlocal in_ul, in_ol
-        if in_ul:
-            out.append("</ul>")
-            in_ul = False
-        if in_ol:
-            out.append("</ol>")
-            in_ol = False
+def _anchor(heading: str) -> str:
+    return _ANCHOR_RE.sub("-", heading.lower())[:30]
+
+
+def parse_blocks(text: str) -> list[list]:
+    """
+    Markdown を行ごとに見てブロックの列にする。
+      ["h2", anchor, テキスト] / ["h3", テキスト] / ["p", テキスト]
+      ["ul", [項目...]] / ["ol", [項目...]] / ["table", [[セル...], ...]]（先頭行が見出し）
+    H1 はテンプレート側にあるので捨てる。
+    """
+    blocks: list[list] = []
+    table_rows: list[str] = []
+    anchors: dict[str, int] = {}
 
     def flush_table() -> None:
-        nonlocal in_table, table_rows
-        if not table_rows:
-            return
-        out.append("<table>")
+        rows = []
         for i, row in enumerate(table_rows):
             cols = [c.strip() for c in row.strip("|").split("|")]
-            tag = "th" if i == 0 else "td"
-            if i == 1 and all(re.match(r"[-:]+", c) for c in cols if c):
+            if i == 1 and all(_TABLE_SEP_RE.match(c) for c in cols if c):
                 continue
-            out.append("<tr>" + "".join(f"<{tag}>{c}</{tag}>" for c in cols) + "</tr>")
-        out.append("</table>")
+            rows.append(cols)
+        blocks.append(["table", rows])
         table_rows.clear()
-        in_table = False
 
-    def inline(s: str) -> str:
-        s = re.sub(r"\*\*(.+?)\*\*", r"\1", s)
-        s = re.sub(r"\*(.+?)\*", r"\1", s)
-        return s
+    def list_item(kind: str, item: str) -> None:
+        if blocks and blocks[-1][0] == kind:
+            blocks[-1][1].append(item)
+        else:
+            blocks.append([kind, [item]])
+
+    def end_list() -> None:
+        # 空行などでリストを閉じたことを記録する（次の項目は新しいリストになる）
+        if blocks and blocks[-1][0] in ("ul", "ol"):
+            blocks.append(["end"])
 
-    for line in lines:
+    for line in text.split("\n"):
         if line.strip().startswith("|"):
-            if not in_table:
-                flush_list()
-                in_table = True
             table_rows.append(line)
             continue
-        if in_table:
+        if table_rows:
             flush_table()
 
         if line.startswith("### "):
-            flush_list()
-            out.append(f"<h3>{inline(line[4:])}</h3>")
+            blocks.append(["h3", _inline(line[4:])])
         elif line.startswith("## "):
-            flush_list()
-            h2text = inline(line[3:])
-            anchor = re.sub(r"[^a-z0-9]", "-", h2text.lower())[:30]
-            out.append(f'<h2 id="{anchor}">{h2text}</h2>')
+            heading = _inline(line[3:])
+            anchor = _anchor(heading)
+            # 日本語だけの見出しはどれも "-----" になるので、2つ目以降に番号を付けて目次のリンク先を分ける
+            anchors[anchor] = anchors.get(anchor, 0) + 1
+            if anchors[anchor] > 1:
+                anchor = f"{anchor}-{anchors[anchor]}"
+            blocks.append(["h2", anchor, heading])
         elif line.startswith("# "):
-            # テンプレートにH1が既にあるためスキップ（重複防止）
-            flush_list()
-        elif line.startswith("- ") or line.startswith("* "):
-            if not in_ul:
-                flush_list()
-                out.append("<ul>")
-                in_ul = True
-            out.append(f"<li>{inline(line[2:])}</li>")
-        elif re.match(r"^\d+\. ", line):
-            if not in_ol:
-                flush_list()
-                out.append("<ol>")
-                in_ol = True
-            out.append(f"<li>{inline(re.sub(r'^\\d+\\.\\s', '', line))}</li>")
+            end_list()
+        elif line.startswith(("- ", "* ")):
+            list_item("ul", _inline(line[2:]))
+        elif _OL_ITEM_RE.match(line):
+            list_item("ol", _inline(_OL_ITEM_RE.sub("", line, count=1)))
         elif line.strip() == "":
-            flush_list()
+            end_list()
         else:
-            flush_list()
-            out.append(f"<p>{inline(line)}</p>")
+            blocks.append(["p", _inline(line)])
 
-    flush_list()
-    if in_table:
+    if table_rows:
         flush_table()
+    return [b for b in blocks if b[0] != "end"]
+
+
+def render_blocks(blocks: list[list]) -> str:
+    out: list[str] = []
+    for block in blocks:
+        kind = block[0]
+        if kind == "h2":
+            out.append(f'<h2 id="{block[1]}">{block[2]}</h2>')
+        elif kind == "h3":
+            out.append(f"<h3>{block[1]}</h3>")
+        elif kind == "p":
+            out.append(f"<p>{block[1]}</p>")
+        elif kind in ("ul", "ol"):
+            out.append(f"<{kind}>")
+            out.extend(f"<li>{item}</li>" for item in block[1])
+            out.append(f"</{kind}>")
+        elif kind == "table":
+            out.append("<table>")
+            for i, cols in enumerate(block[1]):
+                tag = "th" if i == 0 else "td"
+                out.append("<tr>" + "".join(f"<{tag}>{c}</{tag}>" for c in cols) + "</tr>")
+            out.append("</table>")
     return "\n".join(out)
 
 
-def _extract_h2s(content: str) -> list[str]:
-    return re.findall(r"^## (.+)$", content, re.MULTILINE)
+def _render_cache_path(content: str) -> Path:
+    digest = hashlib.sha256(f"{RENDER_VERSION}\0{content}".encode("utf-8")).hexdigest()
+    return RENDER_CACHE_DIR / f"{digest}.json"
+
+
+def _render_cached(content: str) -> bool:
+    return _render_cache_path(content).exists()
+
+
+def render_markdown(content: str) -> dict:
+    """本文 → {"html": 本文HTML, "headings": [[anchor, H2見出し], ...]}。本文のハッシュでキャッシュする"""
+    path = _render_cache_path(content)
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pass
+    blocks = parse_blocks(content)
+    rendered = {
+        "html": render_blocks(blocks),
+        "headings": [[b[1], b[2]] for b in blocks if b[0] == "h2"],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(rendered, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    return rendered
 
 
 # ─── HTMLビルド ───────────────────────────────────────────────────────────────
 def build_html(article: dict) -> str:
+    """テンプレートの段（_templates/article.html）。本文の解析は render_markdown のキャッシュを使う"""
     title = article["title"]
-    meta_desc = article["meta_description"]
-    slug = article["slug"]
-    category = article["category"]
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    canonical = f"{BASE_URL}/articles/{slug}/"
-
-    h2s = _extract_h2s(article["content"])
-    toc_items = "\n".join(
-        f'<li><a href="#{re.sub(r"[^a-z0-9]", "-", h.lower())[:30]}">{h}</a></li>'
-        for h in h2s
-    )
+    today = article.get("published") or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    canonical = f"{BASE_URL}/articles/{article['slug']}/"
+
+    rendered = render_markdown(article["content"])
+    toc_items = "\n".join(f'<li><a href="#{anchor}">{h}</a></li>' for anchor, h in rendered["headings"])
     toc_html = f'<div class="toc"><h4>目次</h4><ol>{toc_items}</ol></div>' if toc_items else ""
-    content_html = _md_to_html(article["content"])
 
     schema = json.dumps({
         "@context": "https://schema.org",
         "@type": "Article",
         "headline": title,
-        "description": meta_desc,
+        "description": article["meta_description"],
         "datePublished": today,
         "publisher": {"@type": "Organization", "name": SITE_NAME},
     }, ensure_ascii=False, indent=2)
 
-    return f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-  <!-- Google Tag Manager -->
-  <script>(function(w,d,s,l,i){{w[l]=w[l]||[];w[l].push({{'gtm.start':new Date().getTime(),event:'gtm.js'}});var f=d.getElementsByTagName(s)[0],j=d.createElement(s),dl=l!='dataLayer'?'&l='+l:'';j.async=true;j.src='https://www.googletagmanager.com/gtm.js?id='+i+dl;f.parentNode.insertBefore(j,f);}})(window,document,'script','dataLayer','{GTM_ID}');</script>
-  <!-- End Google Tag Manager -->
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <link rel="icon" type="image/svg+xml" href="/favicon.svg">
-  <title>{title} | {SITE_NAME}</title>
-  <meta name="description" content="{meta_desc}">
-  <link rel="canonical" href="{canonical}">
-  <meta property="og:title" content="{title}">
-  <meta property="og:description" content="{meta_desc}">
-  <meta property="og:type" content="article">
-  <meta property="og:url" content="{canonical}">
-  <meta property="og:site_name" content="{SITE_NAME}">
-  <meta name="twitter:card" content="summary">
-  <script type="application/ld+json">
-{schema}
-</script>
-  <link rel="preconnect" href="https://fonts.googleapis.com">
-  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-  <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&family=Noto+Sans+JP:wght@400;600;700;800&display=swap" rel="stylesheet">
-  <style>{CSS}</style>
-</head>
-<body>
-  <!-- Google Tag Manager (noscript) -->
-  <noscript><iframe src="https://www.googletagmanager.com/ns.html?id={GTM_ID}" height="0" width="0" style="display:none;visibility:hidden"></iframe></noscript>
-  <!-- End Google Tag Manager (noscript) -->
-<header class="site-header">
-  <div class="container">
-    <a href="/" class="logo">{SITE_NAME}</a>
-    <nav><a href="/">ランキング</a><a href="/articles/">学習コラム</a><a href="/real-phrases/">フレーズ集</a><a href="/listening/">リスニングクイズ</a><a href="/prompts/">AIプロンプト</a></nav>
-    <button class="hamburger" aria-label="メニューを開く" onclick="document.querySelector('.hamburger').classList.toggle('active');document.querySelector('.mobile-nav-overlay').classList.toggle('active');document.body.style.overflow=document.querySelector('.mobile-nav-overlay').classList.contains('active')?'hidden':'';">
-      <span></span><span></span><span></span>
-    </button>
-  </div>
-</header>
-<div class="mobile-nav-overlay" onclick="if(event.target===this||event.target.tagName==='A'){{this.classList.remove('active');document.querySelector('.hamburger').classList.remove('active');document.body.style.overflow='';}}">
-  <a href="/">ランキング</a><a href="/articles/">学習コラム</a><a href="/real-phrases/">フレーズ集</a><a href="/listening/">リスニングクイズ</a><a href="/prompts/">AIプロンプト</a>
-</div>
-<div class="breadcrumb container">
-  <a href="/">ホーム</a><span>›</span><a href="/articles/">学習コラム</a><span>›</span>{title[:30]}{"..." if len(title) > 30 else ""}
-</div>
-<div class="container">
-  <div class="article-layout">
-    <main class="article-content">
-      <span style="display:inline-block;background:var(--primary-pale);color:var(--primary);font-size:.72rem;font-weight:700;padding:3px 10px;border-radius:6px;margin-bottom:16px;">{category}</span>
-      <h1>{title}</h1>
-      {toc_html}
-      {content_html}
-      <div class="quiz-promo">
-        <div class="quiz-promo-orb"></div>
-        <div class="quiz-promo-inner">
-          <div class="quiz-promo-icon">🎧</div>
-          <div class="quiz-promo-body">
-            <p class="quiz-promo-title">英語リスニング、今日の5問で実力チェック</p>
-            <p class="quiz-promo-sub">732問・5段階レベル・完全無料 — 今すぐ聴き取りに挑戦できます</p>
-          </div>
-          <a href="/listening/" class="quiz-promo-btn">無料で試す →</a>
-        </div>
-      </div>
-      <div class="disclaimer">
-        ※本記事はアフィリエイト広告を含みます。料金・サービス内容は変更される場合があります。最新情報は各公式サイトでご確認ください。
-      </div>
-    </main>
-    <aside class="sidebar">
-      <div class="sidebar-widget quiz-promo-widget">
-        <div class="quiz-promo-orb"></div>
-        <p class="quiz-promo-widget-label">🎧 英語力診断</p>
-        <p class="quiz-promo-widget-title">リスニングクイズで<br>実力チェック</p>
-        <p class="quiz-promo-widget-sub">732問・無料・5段階レベル</p>
-        <a href="/listening/" class="quiz-promo-btn">無料で試す →</a>
-      </div>
-      <div class="sidebar-widget">
-        <h4>人気ランキング</h4>
-        <div class="sidebar-service-list">
-          <div class="sidebar-service-item"><a href="/services/dmm-eikaiwa/">DMM英会話</a></div>
-          <div class="sidebar-service-item"><a href="/services/rarejob/">レアジョブ英会話</a></div>
-          <div class="sidebar-service-item"><a href="/services/nativecamp/">ネイティブキャンプ</a></div>
-        </div>
-        <div style="margin-top:14px;">
-          <a href="/" class="btn-primary" style="width:100%;display:block;text-align:center;">ランキングを見る</a>
-        </div>
-      </div>
-    </aside>
-  </div>
-</div>
-<footer class="site-footer">
-  <div class="container">
-    <div class="footer-grid">
-      <div>
-        <h4>{SITE_NAME}</h4>
-        <p>プロが選ぶオンライン英会話・英語アプリ徹底比較</p>
-        <p style="margin-top:12px;">※当サイトはアフィリエイトリンクを含みます。</p>
-      </div>
-      <div>
-        <h4>サービス一覧</h4>
-        <ul>
-          <li><a href="/services/dmm-eikaiwa/">DMM英会話</a></li>
-          <li><a href="/services/rarejob/">レアジョブ英会話</a></li>
-          <li><a href="/services/nativecamp/">ネイティブキャンプ</a></li>
-          <li><a href="/services/cambly/">Cambly</a></li>
-          <li><a href="/services/bizmates/">Bizmates</a></li>
-          <li><a href="/services/progrit/">プログリット</a></li>
-        </ul>
-      </div>
-      <div>
-        <h4>コンテンツ</h4>
-        <ul>
-          <li><a href="/articles/">学習コラム一覧</a></li>
-          <li><a href="/listening/">リスニングクイズ</a></li>
-          <li><a href="/prompts/">AIプロンプト</a></li>
-          <li><a href="/">ランキングTOP</a></li>
-        </ul>
-      </div>
-    </div>
-    <div class="footer-bottom"><p>© {datetime.now().year} {SITE_NAME}. All rights reserved.</p></div>
-  </div>
-</footer>
-</body>
-</html>"""
-
-
-# ─── sitemap.xml 更新 ─────────────────────────────────────────────────────────
-def update_sitemap(slug: str) -> None:
-    if not SITEMAP_PATH.exists():
-        return
-    ET.register_namespace("", "http://www.sitemaps.org/schemas/sitemap/0.9")
-    tree = ET.parse(SITEMAP_PATH)
-    root = tree.getroot()
-    ns = "http://www.sitemaps.org/schemas/sitemap/0.9"
-    url = f"{BASE_URL}/articles/{slug}/"
-
-    # 既存チェック
-    for u in root.findall(f"{{{ns}}}url"):
-        loc = u.find(f"{{{ns}}}loc")
-        if loc is not None and loc.text == url:
-            return
-
-    # 追加
-    url_el = ET.SubElement(root, f"{{{ns}}}url")
-    ET.SubElement(url_el, f"{{{ns}}}loc").text = url
-    ET.SubElement(url_el, f"{{{ns}}}lastmod").text = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    ET.SubElement(url_el, f"{{{ns}}}priority").text = "0.7"
-    ET.indent(tree, space="  ")
-    tree.write(str(SITEMAP_PATH), xml_declaration=True, encoding="UTF-8")
+    return site_templates.render("article", {
+        **unify_headers.header_context(ARTICLES_HREF),
+        "site_name": SITE_NAME,
+        "gtm_id": GTM_ID,
+        "title": title,
+        "breadcrumb_title": title[:30] + ("..." if len(title) > 30 else ""),
+        "meta_desc": article["meta_description"],
+        "canonical": canonical,
+        "category": article["category"],
+        "schema": schema,
+        "css": CSS,
+        "toc_html": toc_html,
+        "content_html": rendered["html"],
+        "stats": site_templates.bank_stats(),
+        "services": FOOTER_SERVICES,
+        "contents": FOOTER_CONTENTS,
+        "owner": False,
+        "year": datetime.now().year,
+    })
 
 
 # ─── トピック管理 ─────────────────────────────────────────────────────────────
@@ -399,19 +344,67 @@ def get_pending_topics(topics: list[dict]) -> list[dict]:
     return [t for t in topics if not (ARTICLES_DIR / t["slug"] / "index.html").exists()]
 
 
-# ─── 引用リンク付与 ───────────────────────────────────────────────────────────
-def _apply_citations(html_path: Path) -> None:
-    """生成した記事に add_citations.py で引用リンクを自動付与する"""
-    result = subprocess.run(
-        [sys.executable, str(Path(__file__).parent / "add_citations.py"), str(html_path.parent)],
-        capture_output=True,
-        text=True,
-    )
-    if result.returncode != 0:
-        print(f"  ⚠ add_citations エラー: {result.stderr[:200]}")
-    elif result.stdout.strip():
-        for line in result.stdout.strip().splitlines():
-            print(f"  {line}")
+# ─── 書き出し（HTML化 + 引用リンク付与） ───────────────────────────────────
+_citation_entries: list[dict] = []   # ワーカープロセスごとに1回だけ読み込む
+
+
+def _init_writer() -> None:
+    _citation_entries[:] = add_citations.load_citation_db()
+
+
+def save_source(article: dict) -> None:
+    SOURCES_DIR.mkdir(parents=True, exist_ok=True)
+    source = {k: article[k] for k in SOURCE_FIELDS if k in article}
+    (SOURCES_DIR / f"{article['slug']}.json").write_text(
+        json.dumps(source, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+
+
+def load_sources(slugs: list[str] | None = None) -> list[dict]:
+    """保存済みの記事本文。slugs を渡したらその記事だけ（無いものは警告して飛ばす）"""
+    if slugs:
+        paths = []
+        for slug in slugs:
+            path = SOURCES_DIR / f"{slug}.json"
+            if path.exists():
+                paths.append(path)
+            else:
+                print(f"  ⚠ {path} がありません（本文を保存する前に生成された記事は書き直せません）")
+    else:
+        paths = sorted(SOURCES_DIR.glob("*.json"))
+    return [json.loads(p.read_text(encoding="utf-8")) for p in paths]
+
+
+def write_article(article: dict, save: bool = True) -> tuple[str, list[str]]:
+    """記事を HTML にして引用リンクを付け、1回だけ書き出す。(slug, 付与した引用) を返す"""
+    if save:
+        save_source(article)
+    html, citations = add_citations.apply_citations_to_html(build_html(article), _citation_entries)
+    out_dir = ARTICLES_DIR / article["slug"]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "index.html").write_text(html, encoding="utf-8")
+    return article["slug"], citations
+
+
+def rebuild(slugs: list[str] | None, workers: int | None) -> None:
+    """保存済みの本文から記事 HTML を書き直す（API は呼ばない）"""
+    sources = load_sources(slugs)
+    if not sources:
+        print(f"書き直せる記事がありません（{SOURCES_DIR}/ に本文がありません）")
+        return
+    cached = sum(1 for a in sources if _render_cached(a["content"]))
+    print(f"=== 記事の書き直し: {len(sources)} 件（本文の解析済みキャッシュ {cached} 件） ===")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_writer) as pool:
+        futures = {pool.submit(write_article, a, False): a["slug"] for a in sources}
+        written = 0
+        for future in as_completed(futures):
+            try:
+                future.result()
+                written += 1
+            except Exception as e:
+                print(f"  ❌ 書き出し失敗: {futures[future]}: {e}")
+    print(f"\n=== 完了: {written} 件書き直し ===")
+    print("次のステップ:")
+    print("  1. python3 site_refresh.py  # 書き直した記事にヘッダー・内部リンク・共通CSSを付け直す")
 
 
 # ─── メイン ──────────────────────────────────────────────────────────────────
@@ -419,8 +412,19 @@ def main() -> None:
     parser = argparse.ArgumentParser(description="記事を生成してarticles/に書き出す")
     parser.add_argument("--count", type=int, default=1, help="生成件数（デフォルト: 1）")
     parser.add_argument("--list", action="store_true", help="未生成トピック一覧を表示して終了")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"同時に飛ばす API リクエスト数（デフォルト: {DEFAULT_CONCURRENCY}）")
+    parser.add_argument("--rpm", type=int, default=DEFAULT_RPM,
+                        help=f"1分あたりに開始する API リクエスト数の上限（デフォルト: {DEFAULT_RPM}、0 で無制限）")
+    parser.add_argument("--workers", type=int, default=None, help="HTML 書き出しのプロセス数（デフォルト: CPU 数）")
+    parser.add_argument("--rebuild", nargs="*", metavar="SLUG",
+                        help="保存済みの本文から記事を書き直す（SLUG 省略時は全記事。API は呼ばない）")
     args = parser.parse_args()
 
+    if args.rebuild is not None:
+        rebuild(args.rebuild, args.workers)
+        return
+
     topics = load_topics()
     pending = get_pending_topics(topics)
 
@@ -434,34 +438,47 @@ def main() -> None:
         print("すべてのトピックが生成済みです。data/article_topics.json に新しいトピックを追加してください。")
         return
 
+    _require_api_key()
     targets = pending[: args.count]
-    print(f"=== 記事生成開始: {len(targets)} 件 ===")
-
-    for i, topic in enumerate(targets, 1):
-        print(f"\n[{i}/{len(targets)}] {topic['title'][:40]}...")
-        try:
-            article = generate_article(API_KEY, topic)
-
-            # HTMLを直接書き出す
-            out_dir = ARTICLES_DIR / article["slug"]
-            out_dir.mkdir(parents=True, exist_ok=True)
-            html = build_html(article)
-            (out_dir / "index.html").write_text(html, encoding="utf-8")
-
-            # sitemap更新
-            update_sitemap(article["slug"])
-
-            # 引用リンク自動付与
-            _apply_citations(out_dir / "index.html")
-
-            print(f"  ✅ articles/{article['slug']}/index.html を生成しました")
-        except Exception as e:
-            print(f"  ❌ 生成失敗: {e}")
-
-    print(f"\n=== 完了 ===")
+    print(f"=== 記事生成開始: {len(targets)} 件（同時 {args.concurrency} リクエスト / {args.rpm or '無制限'} rpm） ===")
+
+    generated = 0
+    failed = 0
+    # API の応答を待つ間に、できた記事から順に書き出しを進める
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_writer) as pool:
+        writes = {}
+        for topic, result in generate_articles(API_KEY, targets, concurrency=args.concurrency, rpm=args.rpm):
+            if isinstance(result, Exception):
+                print(f"  ❌ 生成失敗: {topic['title'][:40]}: {result}")
+                failed += 1
+                continue
+            print(f"  ✍ 本文を受信: {topic['title'][:40]}")
+            result["published"] = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            writes[pool.submit(write_article, result)] = topic
+        for future in as_completed(writes):
+            try:
+                slug, citations = future.result()
+            except Exception as e:
+                print(f"  ❌ 書き出し失敗: {writes[future]['slug']}: {e}")
+                failed += 1
+                continue
+            print(f"  ✅ articles/{slug}/index.html を生成しました（引用リンク {len(citations)} 件）")
+            generated += 1
+
+    # 関連記事・sitemap・検索インデックスは最後に1回だけ更新する（追加した記事の数によらず書き込みは1回）
+    if generated:
+        print("\n関連記事リンクを更新:")
+        processed, added = add_internal_links.apply_related_links()
+        print(f"内部リンク: {processed} 記事に {added} 件追加")
+        result = build_sitemap.build()
+        print(f"\nsitemap 更新: {len(result['pages'])} URL（書き込み: {', '.join(result['written']) or 'なし'}）")
+        result = build_search_index.build()
+        print(f"検索インデックス更新: {result['docs']:,} 文書（書き込み {len(result['written'])} ファイル）")
+
+    print(f"\n=== 完了: {generated} 件生成" + (f" / {failed} 件失敗" if failed else "") + " ===")
     print("次のステップ:")
-    print("  1. python3 check_stats.py  # 統計・引用のチェック（引用リンク確認含む）")
-    print("  2. git add articles/ sitemap.xml && git commit -m 'add: 記事X件追加' && git push")
+    print("  1. python3 site_refresh.py  # ヘッダー・内部リンク・引用を入力が変わったページだけ更新 + 統計チェック")
+    print("  2. git add articles/ sitemap*.xml data/ search/ && git commit -m 'add: 記事X件追加' && git push")
 
 
 if __name__ == "__main__":
@@ -35,6 +35,7 @@ except ImportError:
 
 from lib import (GRAMMAR_VALID_FIELDS, VALID_AXES_GRAMMAR, VALID_DIFFS,
                  parse_grammar_response)
+import pipeline_trace as trace
 
 REPO_ROOT = Path(__file__).parent
 QUESTIONS_JS = REPO_ROOT / "grammar" / "questions.js"
@@ -345,7 +346,7 @@ def main():
     existing_stems = load_existing_stems()
     print(f"既存問題数: {len(existing_stems)} 問")
 
-    client = anthropic.Anthropic(api_key=api_key)
+    client = trace.instrument(anthropic.Anthropic(api_key=api_key))
 
     if args.batch:
         print("ERROR: Batch モードは未実装です（通常モードを使用してください）")
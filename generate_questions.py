@@ -38,6 +38,7 @@ except ImportError:
     pass
 
 from lib import VALID_FIELDS, VALID_DIFFS, parse_response  # noqa: E402
+import pipeline_trace as trace  # noqa: E402
 
 REPO_ROOT = Path(__file__).parent
 QUESTIONS_JS = REPO_ROOT / "listening" / "questions.js"
@@ -299,7 +300,7 @@ def main():
     existing_texts = load_existing_texts()
     print(f"既存問題数: {len(existing_texts)} 問")
 
-    client = anthropic.Anthropic(api_key=api_key)
+    client = trace.instrument(anthropic.Anthropic(api_key=api_key))
 
     if args.batch:
         run_batch(client, args.model, count, lv, existing_texts, axis_only=axis_only)
@@ -11,6 +11,8 @@ Usage:
 import argparse, json, os, re, sys, time
 from pathlib import Path
 
+import pipeline_trace as trace
+
 try:
     import anthropic
 except ImportError:
@@ -274,7 +276,7 @@ def main():
         print("ERROR: ANTHROPIC_API_KEY が設定されていません (.env または環境変数)")
         sys.exit(1)
 
-    client = anthropic.Anthropic(api_key=api_key)
+    client = trace.instrument(anthropic.Anthropic(api_key=api_key))
 
     # Resume モード: 既存の staging を読み込む
     all_passages = []
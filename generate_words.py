@@ -36,6 +36,7 @@ except ImportError:
     pass
 
 from lib import WORDS_VALID_FIELDS, VALID_AXES_WORDS, VALID_DIFFS, parse_words_response
+import pipeline_trace as trace
 
 REPO_ROOT = Path(__file__).parent
 QUESTIONS_JS = REPO_ROOT / "words" / "questions.js"
@@ -134,9 +135,20 @@ def build_prompt(count, lv_counts, existing_words, axis_only=None):
 """
 
 
+def generate_batch(client, count, lv_counts, exclude, model, axis_only=None):
+    """1回の API 呼び出しで count 問生成してパースする（パース失敗時は []）"""
+    prompt = build_prompt(count, lv_counts, exclude, axis_only)
+    response = client.messages.create(
+        model=model,
+        max_tokens=MAX_TOKENS,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return parse_words_response(response.content[0].text, raise_on_error=False)
+
+
 def run_generation(count, model, axis_only=None):
     """通常モード: 即時実行"""
-    client = anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+    client = trace.instrument(anthropic.Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY")))
     existing = load_existing_words()
     print(f"既存問題: {len(existing)} 語")
 
@@ -162,17 +174,9 @@ def run_generation(count, model, axis_only=None):
         diff = batch - sum(lv_batch)
         lv_batch[2] = max(0, lv_batch[2] + diff)
 
-        prompt = build_prompt(batch, lv_batch, existing + [q.get("word", "") for q in all_questions], axis_only)
-
         print(f"\n生成中: {batch} 問 (モデル: {model})...")
-        response = client.messages.create(
-            model=model,
-            max_tokens=MAX_TOKENS,
-            messages=[{"role": "user", "content": prompt}],
-        )
-
-        raw = response.content[0].text
-        questions = parse_words_response(raw, raise_on_error=False)
+        exclude = existing + [q.get("word", "") for q in all_questions]
+        questions = generate_batch(client, batch, lv_batch, exclude, model, axis_only)
 
         if not questions:
             print(f"  WARNING: パースに失敗。リトライします。")
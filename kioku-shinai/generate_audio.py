@@ -8,8 +8,12 @@ import json
 import sys
 from pathlib import Path
 
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT.parent))
+from tts_engine import rotate_voice, summarize, synthesize_async
+
 try:
-    import edge_tts
+    import edge_tts  # noqa: F401
 except ImportError:
     print("pip install edge-tts --break-system-packages")
     sys.exit(1)
@@ -23,45 +27,33 @@ VOICES = [
     "en-AU-NatashaNeural",
 ]
 
-ROOT = Path(__file__).resolve().parent
 DATA_DIR = ROOT / "data" / "words"
 AUDIO_DIR = ROOT / "audio"
 
 
-async def gen(text, voice, path):
-    c = edge_tts.Communicate(text, voice)
-    await c.save(str(path))
-
-
 async def main():
     files = sorted(DATA_DIR.glob("*.json"))
     if not files:
         print("No JSON files found")
         return
 
-    vi = 0
-    total_new = 0
+    # ボイスは既存ファイルも含めた通し番号でローテーション（既存分と割り当てを揃える）
+    jobs = []
     for jf in files:
         data = json.load(open(jf))
-        root_name = data["root"]
         for w in data["words"]:
             word = w["word"]
-            d = AUDIO_DIR / word
-            d.mkdir(parents=True, exist_ok=True)
-            mp3 = d / "word.mp3"
-            if mp3.exists():
-                vi += 1
-                continue
-            voice = VOICES[vi % len(VOICES)]
-            vi += 1
-            try:
-                await gen(word, voice, mp3)
-                print(f"  {word} -> {voice}")
-                total_new += 1
-            except Exception as e:
-                print(f"  ERROR {word}: {e}")
+            jobs.append({
+                "text": word,
+                "path": AUDIO_DIR / word / "word.mp3",
+                "voice": rotate_voice(len(jobs), VOICES),
+                "label": word,
+            })
+
+    results = await synthesize_async(jobs)
+    total_new, _, failed = summarize(results)
 
-    print(f"\nDone. {total_new} new files generated.")
+    print(f"\nDone. {total_new} new files generated, {len(failed)} errors.")
     print(f"Total audio dirs: {len(list(AUDIO_DIR.iterdir()))}")
 
 
@@ -2,7 +2,9 @@
 """lib.py - 問題パイプライン共通ユーティリティ"""
 
 import json
+import os
 import re
+from urllib.parse import urlparse
 
 VALID_FIELDS = {"diff", "text", "ja", "answer", "choices", "expl", "kp"}
 VALID_DIFFS = {"lv1", "lv2", "lv3", "lv4", "lv5"}
@@ -12,6 +14,9 @@ GRAMMAR_VALID_FIELDS = {"diff", "axis", "tags", "stem", "ja", "answer", "choices
 VALID_AXES_GRAMMAR = {"form", "vocab", "logic", "tense", "trap"}
 VALID_TAGS = {"toeic", "eiken4", "eiken3", "eikenpre2", "eiken2", "eikenpre1", "juken"}
 
+# bench/mock_servers.py の偽サーバーが待ち受けるホスト
+MOCK_HOSTS = {"127.0.0.1", "localhost", "::1", "0.0.0.0"}
+
 # WordsUp quiz fields
 WORDS_VALID_FIELDS = {"diff", "axis", "word", "text", "ja", "answer", "choices", "expl"}
 VALID_AXES_WORDS = {"meaning", "phrase", "idiom", "nuance", "context"}
@@ -130,3 +135,70 @@ def parse_words_response(raw, *, raise_on_error=True):
             continue
         valid.append(q)
     return valid
+
+
+def validate_question(q, fields, num_choices, axes=None, list_fields=()):
+    """staging の1問分のバリデーション。(エラーのリスト, 自動補正の内容 or None) を返す
+
+    list_fields: 1要素以上のリストであるべきフィールド（kp など）
+    answer と choices[0] が食い違っていれば q をその場で補正する（正解は常に choices[0]。
+    表示時に JS がシャッフルする）。
+    """
+    errors = []
+    missing = fields - set(q.keys())
+    if missing:
+        errors.append(f"必須フィールドが不足: {missing}")
+    if q.get("diff") not in VALID_DIFFS:
+        errors.append(f"diff が不正: {q.get('diff')}")
+    if axes is not None and q.get("axis") not in axes:
+        errors.append(f"axis が不正: {q.get('axis')}")
+    if not isinstance(q.get("choices"), list) or len(q["choices"]) != num_choices:
+        errors.append(f"choices は{num_choices}要素のリストが必要")
+    for field in list_fields:
+        if not isinstance(q.get(field), list) or len(q[field]) == 0:
+            errors.append(f"{field} は1要素以上のリストが必要")
+
+    fixed = None
+    choices = q.get("choices", [])
+    if isinstance(choices, list) and len(choices) > 0:
+        if q.get("answer") != choices[0]:
+            original = q.get("answer", "")
+            if original in choices:
+                idx = choices.index(original)
+                choices[0], choices[idx] = choices[idx], choices[0]
+                q["choices"] = choices
+                fixed = f"choices スワップ: [0]<->[{idx}]"
+            else:
+                q["answer"] = choices[0]
+                fixed = f"answer 自動補正: \"{original}\" -> \"{choices[0]}\""
+    return errors, fixed
+
+
+def validate_listening(q):
+    return validate_question(q, VALID_FIELDS, 5, list_fields=("kp",))
+
+
+def validate_grammar(q):
+    errors, fixed = validate_question(q, GRAMMAR_VALID_FIELDS, 5, VALID_AXES_GRAMMAR, list_fields=("kp",))
+    if not isinstance(q.get("tags"), list):
+        errors.append("tags はリストが必要")
+    return errors, fixed
+
+
+def validate_words(q):
+    return validate_question(q, WORDS_VALID_FIELDS, 4, VALID_AXES_WORDS)
+
+
+def mock_endpoints():
+    """偽サーバー（bench/mock_servers.py）に向いている環境変数名のリスト。
+
+    TTS_MOCK_URL は設定されていれば常に偽 TTS。ANTHROPIC_BASE_URL はループバックを指していれば
+    偽 LLM とみなす。空でなければ生成物は偽データなので、呼び出し側は commit / push しない。
+    """
+    found = []
+    if os.environ.get("TTS_MOCK_URL"):
+        found.append("TTS_MOCK_URL")
+    base_url = os.environ.get("ANTHROPIC_BASE_URL", "")
+    if base_url and urlparse(base_url).hostname in MOCK_HOSTS:
+        found.append("ANTHROPIC_BASE_URL")
+    return found
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+minify_site.py - 配信用にサイトを縮小したコピーを _site/ に作る
+
+クイズアプリ（listening/index.html 212KB など）や記事は、コメント・インデント付きのまま
+配信されている。ここでは元ファイルは変えずに、配信用のツリー _site/ に
+  .html  コメント削除・テキストの空白の畳み込み、インラインの <script> / <style> も縮小
+  .js    コメント削除・空白の畳み込み
+  .css   コメント削除・空白の削除
+を書き出し、それ以外のファイル（音声・画像など）はハードリンク（別ファイルシステムならコピー）する。
+
+安全側に倒すため、次のものは触らない:
+  - <pre> / <textarea> の中身、<script type="application/ld+json"> は JSON として詰めるだけ
+  - JS の文字列・テンプレートリテラル（${...} の中も含めて）・正規表現リテラル
+  - JS の改行（自動セミコロン挿入に関わるので、; { , ( [ の直後と } ) ] ; , . の直前以外は残す）
+  - タグ内の属性
+
+入力の sha256 をキーに縮小結果の記録を .pipeline_cache/minify.json に持ち、
+mtime・サイズ・内容が前回と同じファイルは処理しない。縮小はプロセスプールで並列に行う。
+
+Usage:
+  python3 minify_site.py                 # _site/ を更新
+  python3 minify_site.py --check         # 縮小後の JS を node --check で検証（node がある場合）
+  python3 minify_site.py --force         # 記録を無視して全ファイル縮小し直す
+  python3 minify_site.py --out /tmp/site
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+DEFAULT_OUT = ROOT / "_site"
+STATE_PATH = ROOT / ".pipeline_cache" / "minify.json"
+MINIFY_VERSION = 1
+
+MINIFY_SUFFIXES = {".html", ".js", ".css"}
+# 配信しないもの（リポジトリの作業用ファイル）
+SKIP_DIRS = {"__pycache__", "node_modules"}
+SKIP_SUFFIXES = {".py", ".pyc", ".log", ".bak", ".jsonl"}
+
+
+# ─────────────────────────────────────────
+# JavaScript
+# ─────────────────────────────────────────
+_JS_TOKEN_RE = re.compile(r"""
+    (?P<ws>[ \t\r\n\f\v\u00a0\ufeff\u2028\u2029]+)
+  | (?P<lc>//[^\n]*)
+  | (?P<bc>/\*.*?\*/)
+  | (?P<str>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')
+  | (?P<tpl>`)
+  | (?P<id>[A-Za-z0-9_$\\\u0080-\uffff]+)
+  | (?P<punct>.)
+""", re.DOTALL | re.VERBOSE)
+_JS_REGEX_RE = re.compile(r"/(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\[\n])+/[A-Za-z]*")
+
+# この直後の / は正規表現リテラルの始まり（それ以外は割り算）
+_REGEX_AFTER_PUNCT = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_AFTER_WORD = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void",
+                     "throw", "instanceof", "yield", "await"}
+# 改行を消しても文の区切りが変わらない位置
+_NL_DROP_AFTER = set(";{,([")
+_NL_DROP_BEFORE = set("}),];.")
+
+
+def _scan_template(src, i):
+    """i はテンプレートリテラルの開き ` の次。閉じ ` の次の位置を返す"""
+    n = len(src)
+    while i < n:
+        c = src[i]
+        if c == "\\":
+            i += 2
+        elif c == "`":
+            return i + 1
+        elif c == "$" and src.startswith("{", i + 1):
+            i = _scan_braces(src, i + 2)
+        else:
+            i += 1
+    raise ValueError("テンプレートリテラルが閉じていません")
+
+
+def _scan_braces(src, i):
+    """${ の中の式を読み飛ばし、対応する } の次の位置を返す"""
+    depth = 1
+    n = len(src)
+    while i < n:
+        m = _JS_TOKEN_RE.match(src, i)
+        kind, tok = m.lastgroup, m.group()
+        i = m.end()
+        if kind == "tpl":
+            i = _scan_template(src, i)
+        elif kind == "punct":
+            if tok == "{":
+                depth += 1
+            elif tok == "}":
+                depth -= 1
+                if depth == 0:
+                    return i
+    raise ValueError("テンプレートリテラルの ${ が閉じていません")
+
+
+def _regex_allowed(prev, prev2):
+    if prev is None:
+        return True
+    kind, tok = prev
+    if kind == "punct":
+        if tok in "+-" and prev2 is not None and prev2 == prev:
+            return False   # a++ / b
+        return tok in _REGEX_AFTER_PUNCT
+    return kind == "id" and tok in _REGEX_AFTER_WORD
+
+
+def _js_separator(pending, prev, kind, tok):
+    """トークン間の空白を何に縮めるか（"" / " " / "\\n"）"""
+    pkind, ptok = prev
+    if pending == "\n" and ptok[-1] not in _NL_DROP_AFTER and tok[0] not in _NL_DROP_BEFORE:
+        return "\n"
+    if pkind == "id" and kind == "id":
+        return " "
+    if pkind == "re" and kind == "id":
+        return " "   # /a/ instanceof ... のフラグと混ざらないように
+    if pkind == "id" and ptok.isdigit() and tok == ".":
+        return " "   # 1 .toString()
+    if pkind == "punct" and kind in ("punct", "re") and ptok + tok[0] in ("++", "--", "//", "+-", "-+"):
+        return " "   # a + +b / a - -b / 割り算の直後の正規表現
+    return ""
+
+
+def minify_js(src):
+    out = []
+    prev = prev2 = None
+    pending = None
+    i = 0
+    n = len(src)
+    while i < n:
+        m = _JS_TOKEN_RE.match(src, i)
+        kind, tok = m.lastgroup, m.group()
+        i = m.end()
+        if kind == "ws" or kind == "bc" or kind == "lc":
+            if kind != "lc" and ("\n" in tok or "\u2028" in tok or "\u2029" in tok):
+                pending = "\n"
+            elif pending is None:
+                pending = " "
+            continue
+        if kind == "tpl":
+            end = _scan_template(src, i)
+            tok, i, kind = src[i - 1:end], end, "str"
+        elif kind == "punct" and tok == "/" and _regex_allowed(prev, prev2):
+            rm = _JS_REGEX_RE.match(src, i - 1)
+            if rm:
+                tok, i, kind = rm.group(), rm.end(), "re"
+        if prev is not None and pending:
+            sep = _js_separator(pending, prev, kind, tok)
+            if sep:
+                out.append(sep)
+        pending = None
+        out.append(tok)
+        prev2, prev = prev, (kind, tok)
+    return "".join(out)
+
+
+# ─────────────────────────────────────────
+# CSS
+# ─────────────────────────────────────────
+_CSS_TOKEN_RE = re.compile(r"""(?P<c>/\*.*?\*/)|(?P<s>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(?P<ws>\s+)|(?P<o>[^\s"'/]+|/)""",
+                           re.DOTALL)
+# この前後の空白は不要（"(" の前は "and (" のように意味を持つので残す）
+_CSS_NO_SPACE_AFTER = set("{};,:>(")
+_CSS_NO_SPACE_BEFORE = set("{};,>)!")
+
+
+def minify_css(src):
+    out = []
+    pending = False
+    for m in _CSS_TOKEN_RE.finditer(src):
+        kind, tok = m.lastgroup, m.group()
+        if kind == "c":
+            if tok.startswith("/*!"):
+                out.append(tok)   # ライセンスコメントは残す
+            else:
+                pending = True
+            continue
+        if kind == "ws":
+            pending = True
+            continue
+        if kind == "o":
+            tok = tok.replace(";}", "}")
+            if tok[0] == "}" and out and out[-1].endswith(";"):
+                out[-1] = out[-1][:-1]
+                if not out[-1]:
+                    out.pop()
+        if pending and out and out[-1][-1] not in _CSS_NO_SPACE_AFTER and tok[0] not in _CSS_NO_SPACE_BEFORE:
+            out.append(" ")
+        pending = False
+        out.append(tok)
+    return "".join(out)
+
+
+# ─────────────────────────────────────────
+# HTML
+# ─────────────────────────────────────────
+_HTML_RE = re.compile(
+    r"<!--.*?-->"
+    r"|<(?P<raw>pre|textarea|script|style)\b(?P<attrs>[^>]*)>(?P<body>.*?)</(?P=raw)\s*>"
+    r"|<[^>]*>|[^<]+|<",
+    re.DOTALL | re.IGNORECASE,
+)
+_TYPE_ATTR_RE = re.compile(r"""\btype\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+_HTML_WS_RE = re.compile(r"[ \t\r\n\f]+")   # &nbsp;（U+00A0）は畳まない
+_JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+
+
+def _minify_script(attrs, body):
+    m = _TYPE_ATTR_RE.search(attrs)
+    script_type = m.group(1).lower() if m else ""
+    if script_type == "application/ld+json":
+        try:
+            return json.dumps(json.loads(body), ensure_ascii=False, separators=(",", ":"))
+        except ValueError:
+            return body
+    if script_type in _JS_TYPES and "src=" not in attrs.lower():
+        return minify_js(body)
+    return body
+
+
+def minify_html(src):
+    out = []
+    for m in _HTML_RE.finditer(src):
+        tok = m.group()
+        raw = m.group("raw")
+        if tok.startswith("<!--"):
+            if tok.startswith("<!--[if") or tok.startswith("<!--!"):
+                out.append(tok)
+            continue
+        if raw:
+            raw = raw.lower()
+            body = m.group("body")
+            if raw == "script":
+                body = _minify_script(m.group("attrs"), body)
+            elif raw == "style":
+                body = minify_css(body)
+            else:
+                out.append(tok)   # <pre> / <textarea> はそのまま
+                continue
+            out.append(tok[:m.start("body") - m.start()] + body + tok[m.end("body") - m.start():])
+            continue
+        if tok[0] == "<":
+            out.append(tok)
+            continue
+        text = _HTML_WS_RE.sub(lambda w: "\n" if "\n" in w.group() else " ", tok)
+        if text.isspace() and out and out[-1].isspace():
+            continue   # コメントを消して空白が並んだ所
+        out.append(text)
+    return "".join(out)
+
+
+MINIFIERS = {".html": minify_html, ".js": minify_js, ".css": minify_css}
+
+
+# ─────────────────────────────────────────
+# ビルド
+# ─────────────────────────────────────────
+def _code_hash():
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def discover():
+    """配信対象のファイル（リポジトリ相対パス）"""
+    files = []
+    for dirpath, dirnames, filenames in os.walk(ROOT):
+        rel_dir = Path(dirpath).relative_to(ROOT)
+        dirnames[:] = sorted(d for d in dirnames
+                             if not d.startswith(".") and d not in SKIP_DIRS
+                             and not (rel_dir == Path(".") and d.startswith("_")))
+        for name in sorted(filenames):
+            if name.startswith(".") or Path(name).suffix in SKIP_SUFFIXES:
+                continue
+            files.append(rel_dir / name)
+    return files
+
+
+def minify_file(rel, src_root, out_root):
+    """1ファイルを縮小して書き出す（プロセスプールから呼ばれる）。(rel, 入力 sha256, 入力バイト数, 出力バイト数, エラー)"""
+    data = (src_root / rel).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    dst = out_root / rel
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    error = None
+    try:
+        out = MINIFIERS[rel.suffix](data.decode("utf-8")).encode("utf-8")
+    except (ValueError, UnicodeDecodeError) as e:
+        out, error = data, str(e)   # 縮小できないファイルは元のまま配信する
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    tmp.write_bytes(out)
+    os.replace(tmp, dst)
+    return str(rel), digest, len(data), len(out), error
+
+
+def link_file(src, dst):
+    """音声・画像などはハードリンク（できなければコピー）。既に同じものがあれば何もしない"""
+    if dst.exists():
+        if os.path.samefile(src, dst):
+            return False
+        s, d = src.stat(), dst.stat()
+        if s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns:
+            return False
+        dst.unlink()
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return True
+
+
+def load_state(out_root):
+    try:
+        state = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        state = {}
+    if (state.get("version"), state.get("code"), state.get("out")) != (MINIFY_VERSION, _code_hash(), str(out_root)):
+        state = {"version": MINIFY_VERSION, "code": _code_hash(), "out": str(out_root), "files": {}}
+    return state
+
+
+def build(out_root, workers=None, force=False):
+    state = load_state(out_root)
+    previous = {} if force else state["files"]
+    files = discover()
+
+    to_minify = []
+    linked = 0
+    for rel in files:
+        src = ROOT / rel
+        if rel.suffix not in MINIFY_SUFFIXES:
+            linked += link_file(src, out_root / rel)
+            continue
+        st = src.stat()
+        old = previous.get(str(rel))
+        if old and (out_root / rel).exists():
+            if (st.st_size, st.st_mtime_ns) == (old["bytes"], old["mtime_ns"]):
+                continue
+            if hashlib.sha256(src.read_bytes()).hexdigest() == old["sha256"]:
+                old.update(bytes=st.st_size, mtime_ns=st.st_mtime_ns)
+                continue
+        to_minify.append(rel)
+
+    results = []
+    if to_minify:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(to_minify) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(minify_file, to_minify, [ROOT] * len(to_minify),
+                                    [out_root] * len(to_minify), chunksize=chunksize))
+
+    files_state = {k: v for k, v in previous.items() if (ROOT / k).exists()}
+    for rel, digest, in_size, out_size, error in results:
+        st = (ROOT / rel).stat()
+        files_state[rel] = {"bytes": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest,
+                            "in": in_size, "out": out_size}
+    state["files"] = files_state
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+
+    # 元ファイルが消えたものは _site からも消す
+    wanted = {str(rel) for rel in files}
+    removed = 0
+    for path in sorted(out_root.rglob("*"), reverse=True):
+        rel = str(path.relative_to(out_root))
+        if path.is_file() and rel not in wanted:
+            path.unlink()
+            removed += 1
+        elif path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+    return results, linked, removed, files_state
+
+
+def check_js(out_root, rels):
+    """縮小後の .js と HTML 内の <script> を node --check にかける。失敗した (ファイル, メッセージ) のリスト"""
+    node = shutil.which("node")
+    if not node:
+        print("⚠ node が見つからないので --check を省略します")
+        return []
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rel in rels:
+            path = out_root / rel
+            if path.suffix == ".js":
+                scripts = [(path, path.read_text(encoding="utf-8"), False)]
+            elif path.suffix == ".html":
+                scripts = []
+                for m in _HTML_RE.finditer(path.read_text(encoding="utf-8")):
+                    if (m.group("raw") or "").lower() == "script":
+                        attrs = m.group("attrs")
+                        t = _TYPE_ATTR_RE.search(attrs)
+                        script_type = t.group(1).lower() if t else ""
+                        if script_type in _JS_TYPES and "src=" not in attrs.lower():
+                            scripts.append((path, m.group("body"), script_type == "module"))
+            else:
+                continue
+            for n, (src_path, body, module) in enumerate(scripts):
+                test = Path(tmp) / f"s{n}{'.mjs' if module else '.js'}"
+                test.write_text(body, encoding="utf-8")
+                r = subprocess.run([node, "--check", str(test)], capture_output=True, text=True)
+                if r.returncode != 0:
+                    failures.append((str(rel), (r.stderr.strip().splitlines() or [""])[-1]))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="配信用に縮小したサイトを _site/ に作る")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT, help="出力先（デフォルト: _site/）")
+    parser.add_argument("--workers", type=int, default=None, help="並列プロセス数")
+    parser.add_argument("--force", action="store_true", help="記録を無視して全ファイル縮小し直す")
+    parser.add_argument("--check", action="store_true", help="縮小した JS を node --check で検証")
+    args = parser.parse_args()
+
+    out_root = args.out.resolve()
+    started = time.monotonic()
+    results, linked, removed, files_state = build(out_root, args.workers, args.force)
+    wall = time.monotonic() - started
+
+    print(f"縮小 {len(results)} ファイル / リンク {linked} ファイル / 削除 {removed} ファイル（{wall:.1f}s）→ {out_root}")
+    for rel, _, _, _, error in results:
+        if error:
+            print(f"  ⚠ {rel}: 縮小できないので元のまま（{error}）")
+    by_suffix = {}
+    for rel, entry in files_state.items():
+        total = by_suffix.setdefault(Path(rel).suffix, [0, 0, 0])
+        total[0] += 1
+        total[1] += entry["in"]
+        total[2] += entry["out"]
+    for suffix, (count, size_in, size_out) in sorted(by_suffix.items()):
+        print(f"  {suffix:5s} {count:4d} ファイル  {size_in / 1024:8.0f}KB → {size_out / 1024:8.0f}KB"
+              f"（-{(1 - size_out / size_in) * 100 if size_in else 0:.0f}%）")
+    biggest = sorted(files_state.items(), key=lambda kv: kv[1]["in"] - kv[1]["out"], reverse=True)[:5]
+    for rel, entry in biggest:
+        print(f"    {rel:40s} {entry['in'] / 1024:7.0f}KB → {entry['out'] / 1024:7.0f}KB")
+
+    if args.check:
+        failures = check_js(out_root, [Path(rel) for rel, *_ in results] if results else
+                            [Path(rel) for rel in files_state])
+        for rel, message in failures:
+            print(f"  ❌ {rel}: {message}")
+        if failures:
+            sys.exit(1)
+        print("  ✅ node --check OK")
+
+
+if __name__ == "__main__":
+    main()
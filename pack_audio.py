@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+pack_audio.py - 短い音声クリップをデッキ単位の1ファイル（オーディオスプライト）にまとめる
+
+phonics や kioku-shinai は1単語1 MP3 を都度取得しており、1ページで数十〜数百リクエストになる。
+デッキごとにクリップの MP3 フレームを連結した pack と、各クリップの (開始ms, 終了ms) を
+持つインデックス JSON を書き出す。ページ側は /shared/audio-sprite.js で pack を1回だけ取得し、
+Web Audio で該当区間だけを再生する（pack に無いクリップは従来どおり個別ファイルを再生）。
+
+  phonics/audio/packs/phonics.{mp3,json}
+  kioku-shinai/audio/packs/{語根JSON名}.{mp3,json}
+
+メンバー（キーと各クリップの sha256）が変わっていない pack は作り直さない。
+
+Usage:
+  python3 pack_audio.py                 # 全デッキ
+  python3 pack_audio.py --deck phonics  # 特定デッキのみ
+  python3 pack_audio.py --force         # 全 pack を作り直す
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from audio_cache import atomic_write_bytes
+from audio_manifest import build_manifest, mp3_frames, refs_phonics, save_manifest
+
+REPO_ROOT = Path(__file__).parent
+
+
+def _is_info_frame(data, pos, length):
+    """先頭の Xing/Info（VBR ヘッダ）フレームは無音扱いなので pack には入れない"""
+    head = data[pos:pos + min(length, 64)]
+    return b"Xing" in head or b"Info" in head
+
+
+def phonics_decks():
+    """phonics: 全クリップで1デッキ（キーは index.html の speak() が使うファイル名）"""
+    members = {Path(rel).stem: rel for rel in refs_phonics()}
+    return {"phonics": {"bank": "phonics", "out": "phonics/audio/packs/phonics", "members": members}}
+
+
+def kioku_shinai_decks():
+    """kioku-shinai: 語根グループ JSON 1ファイル = 1デッキ（キーは単語）"""
+    decks = {}
+    for jf in sorted((REPO_ROOT / "kioku-shinai" / "data" / "words").glob("*.json")):
+        data = json.loads(jf.read_text(encoding="utf-8"))
+        decks[f"kioku-shinai/{jf.stem}"] = {
+            "bank": "kioku-shinai",
+            "out": f"kioku-shinai/audio/packs/{jf.stem}",
+            "members": {w["word"]: f"kioku-shinai/audio/{w['word']}/word.mp3" for w in data["words"]},
+        }
+    return decks
+
+
+DECK_SOURCES = {
+    "phonics": phonics_decks,
+    "kioku-shinai": kioku_shinai_decks,
+}
+
+
+def members_hash(members, files):
+    """キーと各クリップ内容のハッシュ（pack 再生成の判定に使う）"""
+    h = hashlib.sha256()
+    for key in sorted(members):
+        entry = files.get(members[key])
+        h.update(f"{key}\0{entry['sha256'] if entry else '-'}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def build_pack(members, files):
+    """(pack のバイト列, クリップ索引, 除外したキー) を返す
+
+    フレームをそのまま連結するので、サンプルレートが先頭クリップと異なるものは除外する
+    （除外したクリップはページ側で個別ファイルにフォールバックする）。
+    """
+    chunks = []
+    clips = {}
+    excluded = []
+    rate = None
+    samples_total = 0
+    for key in sorted(members):
+        rel = members[key]
+        entry = files.get(rel)
+        if not entry or entry["status"] != "ok":
+            excluded.append(key)
+            continue
+        data = (REPO_ROOT / rel).read_bytes()
+        status, frames = mp3_frames(data)
+        if status != "ok":
+            excluded.append(key)
+            continue
+        if frames and _is_info_frame(data, frames[0][0], frames[0][1]):
+            frames = frames[1:]
+        clip_rate = frames[0][3] if frames else None
+        if not frames or (rate and clip_rate != rate):
+            excluded.append(key)
+            continue
+        rate = clip_rate
+        start = samples_total
+        for pos, length, samples, _ in frames:
+            chunks.append(data[pos:pos + length])
+            samples_total += samples
+        clips[key] = [round(start * 1000 / rate), round(samples_total * 1000 / rate)]
+    return b"".join(chunks), clips, excluded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="オーディオスプライト（pack）生成")
+    parser.add_argument("--deck", choices=list(DECK_SOURCES), action="append", help="対象（複数指定可。省略時は全デッキ）")
+    parser.add_argument("--force", action="store_true", help="変更がなくても作り直す")
+    args = parser.parse_args()
+
+    sources = args.deck or list(DECK_SOURCES)
+    decks = {}
+    for source in sources:
+        decks.update(DECK_SOURCES[source]())
+
+    manifest, _, _ = build_manifest(sorted({d["bank"] for d in decks.values()}))
+    save_manifest(manifest)
+    files = manifest["files"]
+
+    built = unchanged = 0
+    for name, deck in sorted(decks.items()):
+        out = REPO_ROOT / deck["out"]
+        index_path = out.with_suffix(".json")
+        digest = members_hash(deck["members"], files)
+        if not args.force and index_path.exists() and out.with_suffix(".mp3").exists():
+            if json.loads(index_path.read_text(encoding="utf-8")).get("members") == digest:
+                unchanged += 1
+                continue
+
+        audio, clips, excluded = build_pack(deck["members"], files)
+        if not clips:
+            print(f"  SKIP {name}: 有効なクリップがありません")
+            continue
+        atomic_write_bytes(out.with_suffix(".mp3"), audio)
+        index = {"src": out.with_suffix(".mp3").name, "members": digest, "clips": clips}
+        atomic_write_bytes(index_path, json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        built += 1
+        note = f"（除外 {len(excluded)}: {', '.join(excluded[:5])}）" if excluded else ""
+        print(f"  PACK {name}: {len(clips)} クリップ / {len(audio) / 1e3:.0f} KB{note}")
+
+    print(f"\n✅ 完了: 作成 {built} / 変更なし {unchanged}")
+    if built == 0 and unchanged == 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
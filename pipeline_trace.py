@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+pipeline_trace.py - パイプラインの計測（span を JSONL の trace に記録）と集計レポート
+
+各スクリプトはステージごとに span を記録する。1行 = 1 span:
+
+  {"kind": "span", "run": "3f2a…", "script": "batch_words", "stage": "generate",
+   "ts": 1760000000.0, "wall": 12.3, "items": 20, "out": 18, "ok": true, ...}
+
+  任意フィールド: out（通過件数） / model / in（API 呼び出し元のステージ） /
+                  tokens_in / tokens_out / cache_read / cache_write / retries / bytes / cached / error
+
+  stage="api"  : Messages API 1回分（instrument() で包んだクライアントが自動で記録。失敗した試行も1行）
+  stage="tts"  : 音声1件分（tts_engine が記録。wall は合成時間、retries は再試行回数。キャッシュヒットは tts_cache）
+  stage="git"  : commit + push
+  kind="run" / "run_end" : 実行の開始と終了（run_end の accepted が「採用した問題数」）
+
+記録先は .pipeline_cache/trace.jsonl（環境変数 PIPELINE_TRACE で変更、off で記録しない）。
+複数プロセスから同時に追記しても1行単位で混ざらない（O_APPEND の1回書き込み）。
+
+Usage:
+  python3 pipeline_trace.py report                  # 全期間
+  python3 pipeline_trace.py report --since 7        # 直近7日
+  python3 pipeline_trace.py report --script batch_words --runs 20
+  python3 pipeline_trace.py report --script quiz_pipeline  # quiz_pipeline:words なども含む
+"""
+
+import argparse
+import contextvars
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent
+TRACE_FILE = os.environ.get("PIPELINE_TRACE", str(REPO_ROOT / ".pipeline_cache" / "trace.jsonl"))
+
+# USD / 100万トークン（入力, 出力）。モデル名の前方一致。価格改定があれば更新する
+PRICES = {
+    "claude-opus-4": (5.0, 25.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-haiku-4": (1.0, 5.0),
+}
+CACHE_READ_RATE = 0.1     # キャッシュ読み出しは入力単価の 0.1 倍
+CACHE_WRITE_RATE = 1.25   # キャッシュ書き込みは入力単価の 1.25 倍
+
+_lock = threading.Lock()
+_run = {"run": uuid.uuid4().hex[:12], "script": Path(sys.argv[0]).stem or "python"}
+_stage = contextvars.ContextVar("pipeline_trace_stage", default=None)
+
+
+def enabled():
+    return TRACE_FILE.lower() not in ("", "0", "off")
+
+
+def _write(record):
+    if not enabled():
+        return
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    path = Path(TRACE_FILE)
+    with _lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def start_run(script=None, run_id=None, **meta):
+    """実行の開始を記録する。run_id を渡すと以降の span はその ID にまとまる（再開した run の合算用）"""
+    if script:
+        _run["script"] = script
+    if run_id:
+        _run["run"] = run_id
+    _write({"kind": "run", **_run, "ts": time.time(), **meta})
+    return _run["run"]
+
+
+def end_run(accepted, wall, **meta):
+    """実行の終了を記録する（accepted: この実行で採用した問題数）"""
+    _write({"kind": "run_end", **_run, "ts": time.time(), "accepted": accepted, "wall": round(wall, 3), **meta})
+
+
+def record(stage, wall, **fields):
+    """計測済みの span を1行記録する"""
+    rec = {"kind": "span", **_run, "stage": stage, "ts": time.time() - wall, "wall": round(wall, 4)}
+    parent = _stage.get()
+    if parent and parent != stage:
+        rec["in"] = parent
+    rec.update(fields)
+    rec.setdefault("ok", True)
+    _write(rec)
+
+
+class span:
+    """with trace.span("generate", items=n) as sp: ... sp.set(out=k)
+
+    ブロックの実時間を wall として記録する。例外で抜けたら ok=False と error を付けて再送出。
+    ブロック内で呼ばれた API の span には in=<このステージ名> が付く（スレッド・タスクをまたいでも
+    contextvars がコピーされる asyncio.to_thread 経由なら引き継がれる）。
+    """
+
+    def __init__(self, stage, **fields):
+        self.stage = stage
+        self.fields = fields
+        self.wall = 0.0
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def add(self, **fields):
+        for k, v in fields.items():
+            self.fields[k] = self.fields.get(k, 0) + v
+
+    def __enter__(self):
+        self._token = _stage.set(self.stage)
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.monotonic() - self._started
+        _stage.reset(self._token)
+        if exc_type is not None:
+            self.fields.update(ok=False, error=f"{exc_type.__name__}: {str(exc)[:200]}")
+        record(self.stage, self.wall, **self.fields)
+        return False
+
+
+def usage_fields(resp):
+    """Messages API のレスポンスから tokens_* を取り出す"""
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return {}
+    return {
+        "tokens_in": getattr(usage, "input_tokens", 0) or 0,
+        "tokens_out": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read": getattr(usage, "cache_read_input_tokens", 0) or 0,
+        "cache_write": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+    }
+
+
+class _Messages:
+    def __init__(self, messages):
+        self._messages = messages
+
+    def create(self, **kwargs):
+        with span("api", items=1, model=kwargs.get("model")) as sp:
+            resp = self._messages.create(**kwargs)
+            sp.set(**usage_fields(resp))
+            if getattr(resp, "stop_reason", None) == "max_tokens":
+                sp.set(truncated=True)
+            return resp
+
+    def __getattr__(self, name):
+        return getattr(self._messages, name)
+
+
+class _Client:
+    def __init__(self, client):
+        self._client = client
+        self.messages = _Messages(client.messages)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument(client):
+    """anthropic クライアントを包み、messages.create を1回ごとに stage="api" の span として記録する"""
+    if client is None or isinstance(client, _Client):
+        return client
+    return _Client(client)
+
+
+# ─────────────────────────────────────────
+# report
+# ─────────────────────────────────────────
+def price(model):
+    for prefix, p in PRICES.items():
+        if (model or "").startswith(prefix):
+            return p
+    return None
+
+
+def api_cost(rec):
+    p = price(rec.get("model"))
+    if not p:
+        return 0.0
+    inp, out = p
+    return (rec.get("tokens_in", 0) * inp
+            + rec.get("tokens_out", 0) * out
+            + rec.get("cache_read", 0) * inp * CACHE_READ_RATE
+            + rec.get("cache_write", 0) * inp * CACHE_WRITE_RATE) / 1_000_000
+
+
+def percentile(values, p):
+    """最近傍順位法のパーセンタイル（values はソート済み）"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def _script_matches(name, script):
+    """--script の絞り込み。quiz_pipeline は quiz_pipeline:words などの種別付きの記録にも当たる"""
+    return name == script or name.startswith(script + ":")
+
+
+def load_trace(path, since=None, script=None):
+    path = Path(path)
+    if not path.exists():
+        return []
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # 書き込み途中で落ちた行
+            if since and rec.get("ts", 0) < since:
+                continue
+            if script and not _script_matches(rec.get("script") or "", script):
+                continue
+            records.append(rec)
+    return records
+
+
+def report(records, n_runs=10):
+    spans = [r for r in records if r.get("kind") == "span"]
+    if not spans:
+        print("trace に記録がありません")
+        return
+
+    # ── ステージ別 ──
+    by_stage = defaultdict(list)
+    for r in spans:
+        by_stage[(r["script"], r["stage"])].append(r)
+    print("ステージ別（処理量は items / 合計 wall。p50/p95 は1 span あたりの実時間）:")
+    print(f"  {'script':14s} {'stage':10s} {'span':>6s} {'items':>7s} {'wall計':>9s} "
+          f"{'件/s':>7s} {'p50':>7s} {'p95':>7s} {'失敗':>5s} {'再試行':>6s} {'MB':>7s}")
+    for (script, stage), rs in sorted(by_stage.items()):
+        walls = sorted(r["wall"] for r in rs)
+        total = sum(walls)
+        items = sum(r.get("items", 0) for r in rs)
+        failed = sum(1 for r in rs if not r.get("ok", True))
+        retries = sum(r.get("retries", 0) for r in rs)
+        mb = sum(r.get("bytes", 0) for r in rs) / 1_000_000
+        rate = f"{items / total:7.2f}" if total and items else f"{'-':>7s}"
+        print(f"  {script:14s} {stage:10s} {len(rs):6d} {items:7d} {total:8.1f}s "
+              f"{rate} {percentile(walls, 50):6.2f}s {percentile(walls, 95):6.2f}s "
+              f"{failed:5d} {retries:6d} {mb:7.1f}")
+
+    # ── API（モデル別） ──
+    by_model = defaultdict(list)
+    for r in spans:
+        if r["stage"] == "api":
+            by_model[r.get("model") or "?"].append(r)
+    if by_model:
+        print("\nAPI（モデル別）:")
+        for model, rs in sorted(by_model.items()):
+            walls = sorted(r["wall"] for r in rs)
+            errors = sum(1 for r in rs if not r.get("ok", True))
+            truncated = sum(1 for r in rs if r.get("truncated"))
+            tok = {k: sum(r.get(k, 0) for r in rs) for k in ("tokens_in", "tokens_out", "cache_read", "cache_write")}
+            cost = sum(api_cost(r) for r in rs)
+            print(f"  {model}: {len(rs)}回（エラー {errors} / 打ち切り {truncated}）"
+                  f" p50 {percentile(walls, 50):.1f}s p95 {percentile(walls, 95):.1f}s")
+            print(f"    tokens 入力 {tok['tokens_in']:,} / 出力 {tok['tokens_out']:,}"
+                  f" / cache read {tok['cache_read']:,} / cache write {tok['cache_write']:,}"
+                  f" → ${cost:.2f}{'' if price(model) else '（単価未登録）'}")
+
+    # ── run 別 ──
+    runs = {}
+    for r in records:
+        run = runs.setdefault(r.get("run"), {"script": r.get("script"), "ts": r.get("ts", 0),
+                                             "accepted": 0, "wall": 0.0, "cost": 0.0, "ended": False})
+        run["ts"] = min(run["ts"], r.get("ts", run["ts"]))
+        if r.get("kind") == "run_end":
+            run["accepted"] += r.get("accepted", 0)
+            run["wall"] += r.get("wall", 0.0)
+            run["ended"] = True
+        elif r.get("kind") == "span" and r.get("stage") == "api":
+            run["cost"] += api_cost(r)
+    ended = [(rid, run) for rid, run in runs.items() if run["ended"]]
+    if ended:
+        print(f"\nrun 別（直近 {min(n_runs, len(ended))} 件 / 全 {len(ended)} 件）:")
+        for rid, run in sorted(ended, key=lambda x: x[1]["ts"])[-n_runs:]:
+            per = f"${run['cost'] / run['accepted']:.4f}/問" if run["accepted"] else "-"
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["ts"]))
+            print(f"  {when} {run['script']:14s} {rid}  採用 {run['accepted']:5d}問"
+                  f"  {run['wall']:7.0f}s  ${run['cost']:7.2f}  {per}")
+        accepted = sum(run["accepted"] for _, run in ended)
+        cost = sum(run["cost"] for _, run in ended)
+        if accepted:
+            print(f"  合計: 採用 {accepted}問 / ${cost:.2f} / ${cost / accepted:.4f}/問")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="パイプライン trace の集計")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("report", help="スループット・レイテンシ・コストを集計")
+    p.add_argument("--trace", default=TRACE_FILE, help=f"trace ファイル（デフォルト: {TRACE_FILE}）")
+    p.add_argument("--since", type=float, default=None, help="直近 N 日分だけ集計")
+    p.add_argument("--script", default=None, help="スクリプト名で絞り込み（例: batch_words, quiz_pipeline,"
+                   " quiz_pipeline:words。種別の付かない名前は全種別に当たる）")
+    p.add_argument("--runs", type=int, default=10, help="run 別に表示する件数（デフォルト: 10）")
+    args = parser.parse_args()
+
+    since = time.time() - args.since * 86400 if args.since else None
+    report(load_trace(args.trace, since, args.script), n_runs=args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+quiz_pipeline.py - クイズ問題の生成パイプライン（全種別共通エンジン）
+
+各種別（quiz_types.py の QUIZ_TYPES）が宣言したステージを次の形で実行する:
+
+  units ─┬─ prompt → generate → parse → validate → check ─┐   生成単位ごと（スレッドで並列）
+         └─ prompt → generate → parse → validate → check ─┴→ dedupe → audio → emit → git
+
+  - generate / check の出力は入力（プロンプト・モデル・問題 JSON）の sha256 をキーに
+    .pipeline_cache/{種別}/{ステージ}/ に保存し、同じ入力なら API を呼ばない
+  - 実行ごとに run_id を発行し（.pipeline_cache/{種別}/run.json）、プロンプト中の乱択を
+    run_id で固定する。途中で落ちても同じ引数で再実行すれば同じプロンプトになり、
+    完了済みの生成単位はキャッシュから再開する。emit まで終わると run.json を消す
+  - --dry-run はプロンプトを組み立ててキャッシュの有無を表示するだけ（API を呼ばない）
+  - ステージ・API 呼び出し・git の span を pipeline_trace の trace に記録する（run_id 単位。
+    集計は python3 pipeline_trace.py report）
+
+Usage:
+  python3 quiz_pipeline.py words --count 100
+  python3 quiz_pipeline.py listening --count 60 --axis-only speed,reduction
+  python3 quiz_pipeline.py grammar --count 90 --workers 6
+  python3 quiz_pipeline.py reading --topics daily,food
+  python3 quiz_pipeline.py words --count 100 --dry-run
+  python3 quiz_pipeline.py words --count 100 --no-push     # questions.js 更新まで（commit しない）
+  python3 quiz_pipeline.py words --count 100 --fresh       # 前回の run を再開せず新しく始める
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from audio_cache import atomic_write_bytes
+from lib import mock_endpoints
+import pipeline_trace as trace
+from quiz_types import QUIZ_TYPES
+import tts_queue
+
+REPO_ROOT = Path(__file__).parent
+CACHE_DIR = Path(os.environ.get("PIPELINE_CACHE_DIR", REPO_ROOT / ".pipeline_cache"))
+
+API_ATTEMPTS = 3
+API_BACKOFF_SEC = 2.0
+
+
+def _norm_key(value):
+    return " ".join(str(value).lower().split())
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class StageCache:
+    """ステージ出力の content-hash キャッシュ（{CACHE_DIR}/{種別}/{ステージ}/{sha256}.json）"""
+
+    def __init__(self, quiz_type, enabled=True):
+        self.root = CACHE_DIR / quiz_type
+        self.enabled = enabled
+        self.hits = self.misses = 0
+
+    def _path(self, stage, key):
+        return self.root / stage / f"{key[:2]}" / f"{key}.json"
+
+    def has(self, stage, key):
+        return self.enabled and self._path(stage, key).exists()
+
+    def get(self, stage, key):
+        if not self.enabled:
+            return None
+        path = self._path(stage, key)
+        if not path.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def put(self, stage, key, value):
+        if self.enabled:
+            atomic_write_bytes(self._path(stage, key), json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def load_run(quiz_type, params, fresh=False, persist=True):
+    """同じ引数の未完了 run があれば run_id を引き継ぐ（persist=False なら run.json を書かない）"""
+    path = CACHE_DIR / quiz_type / "run.json"
+    if not fresh and path.exists():
+        run = json.loads(path.read_text(encoding="utf-8"))
+        if run.get("params") == params:
+            return run, True
+    run = {"run_id": uuid.uuid4().hex[:12], "params": params, "started_at": time.time()}
+    if persist:
+        atomic_write_bytes(path, json.dumps(run, ensure_ascii=False).encode("utf-8"))
+    return run, False
+
+
+def finish_run(quiz_type):
+    path = CACHE_DIR / quiz_type / "run.json"
+    if path.exists():
+        path.unlink()
+
+
+def call_api(client, model, max_tokens, prompt):
+    """Messages API を呼び、本文テキストを返す（一時的な失敗は指数バックオフで再試行）"""
+    for attempt in range(1, API_ATTEMPTS + 1):
+        try:
+            resp = client.messages.create(
+                model=model, max_tokens=max_tokens,
+                messages=[{"role": "user", "content": prompt}],
+            )
+            return resp.content[0].text
+        except Exception as e:
+            if attempt == API_ATTEMPTS:
+                raise
+            delay = API_BACKOFF_SEC * (2 ** (attempt - 1))
+            print(f"  WARNING: API エラー（{attempt}/{API_ATTEMPTS}回目）: {e} → {delay:.0f}秒後に再試行")
+            time.sleep(delay)
+
+
+class Pipeline:
+    def __init__(self, quiz_type, args, client=None):
+        self.name = quiz_type
+        self.spec = QUIZ_TYPES[quiz_type]
+        self.args = args
+        self.client = client
+        self.model = args.model or self.spec["model"]
+        self.cache = StageCache(quiz_type, enabled=not args.no_cache)
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.n_units = 0
+
+    @contextmanager
+    def _stage(self, stage, n_in):
+        """ステージ1回分を計測する（report 用の集計と trace の span）。通過件数は sp.set(out=n)"""
+        with trace.span(stage, items=n_in, out=0) as sp:
+            yield sp
+        with self.stats_lock:
+            s = self.stats.setdefault(stage, {"in": 0, "out": 0, "sec": 0.0})
+            s["in"] += n_in
+            s["out"] += sp.fields["out"]
+            s["sec"] += sp.wall
+
+    # ── 生成単位ごとのステージ ───────────────────
+    def build_prompts(self, units, run_id, existing):
+        """prompt ステージ（乱択を run_id で固定するため、並列化せずメインスレッドで組み立てる）"""
+        limit = self.spec["exclude_limit"]
+        ctx = {"exclude": existing[-limit:] if limit else []}
+        prompts = []
+        for unit in units:
+            random.seed(f"{run_id}:{unit['index']}")
+            prompts.append(self.spec["prompt"](unit, ctx))
+        return prompts
+
+    def run_unit(self, unit, prompt):
+        """generate → parse → validate → check"""
+        label = f"[{unit['index'] + 1}/{self.n_units}]"
+        with self._stage("generate", unit["count"]) as sp:
+            gen_key = _digest("generate", self.model, self.spec["max_tokens"], prompt)
+            cached = self.cache.get("generate", gen_key)
+            raw = cached["raw"] if cached else call_api(self.client, self.model, self.spec["max_tokens"], prompt)
+            items = self.spec["parse"](raw, unit)
+            sp.set(out=len(items), cached=bool(cached))
+        if not items:
+            # パースできない応答はキャッシュしない（再実行で作り直す）
+            print(f"  {label} WARNING: パースに失敗（0件）")
+            return []
+        if not cached:
+            self.cache.put("generate", gen_key, {"raw": raw})
+
+        with self._stage("validate", len(items)) as sp:
+            valid = []
+            for item in items:
+                errors, _ = self.spec["validate"](item)
+                if errors:
+                    print(f"  {label} validate 除外: {errors[0]}")
+                    continue
+                valid.append(item)
+            sp.set(out=len(valid))
+
+        if self.args.no_check or not self.spec["check"] or not valid:
+            print(f"  {label} {len(valid)}件{'（キャッシュ）' if cached else ''}")
+            return valid
+        with self._stage("check", len(valid)) as sp:
+            check_key = _digest("check", self.name, valid)
+            checked = self.cache.get("check", check_key)
+            sp.set(cached=checked is not None)
+            if checked is None:
+                checked = self.spec["check"](self.client, valid)
+                self.cache.put("check", check_key, checked)
+            sp.set(out=len(checked))
+        print(f"  {label} 生成 {len(items)} → 検証 {len(valid)} → チェック通過 {len(checked)}"
+              f"{'（キャッシュ）' if cached else ''}")
+        return checked
+
+    # ── 全体 ─────────────────────────────────
+    def dedupe(self, batches, existing):
+        with self._stage("dedupe", sum(len(items) for items in batches)) as sp:
+            seen = {_norm_key(k) for k in existing}
+            kept = []
+            for items in batches:
+                for item in items:
+                    key = _norm_key(self.spec["key"](item))
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    kept.append(item)
+            sp.set(out=len(kept))
+        return kept
+
+    def audio(self, items):
+        if not self.spec["audio"]:
+            return True
+        with self._stage("audio", len(items)) as sp:
+            bank, jobs = self.spec["audio"](items)
+            ids = tts_queue.enqueue(jobs, bank)
+            if self.args.async_audio:
+                print(f"音声ジョブ {len(jobs)} 件をキューに追加（python3 tts_queue.py work で生成）")
+                return True
+            done, failed = tts_queue.work(bank=bank, ids=ids)
+            sp.set(out=done)
+        if failed:
+            print(f"ERROR: 音声生成失敗 {failed} 件（python3 tts_queue.py status で確認）", file=sys.stderr)
+        return not failed
+
+    def emit(self, items):
+        with self._stage("emit", len(items)) as sp:
+            paths, message = self.spec["emit"](items)
+            sp.set(out=len(items))
+        if not paths or self.args.no_push:
+            return
+        if self.args.async_audio and self.spec["audio"]:
+            # 音声はキューに積んだだけで MP3 がまだ無い。生成前の問題を公開しない
+            print("音声が未生成のため commit / push しません（python3 tts_queue.py work の後に commit してください）")
+            return
+        mock = mock_endpoints()
+        if mock:
+            print(f"{', '.join(mock)} が偽サーバーを指しているため commit / push しません")
+            return
+        rel = [str(Path(p).relative_to(REPO_ROOT)) for p in paths if Path(p).exists()]
+        with self._stage("git", len(items)) as sp:
+            subprocess.run(["git", "-C", str(REPO_ROOT), "add", "--", *rel], check=True)
+            subprocess.run(["git", "-C", str(REPO_ROOT), "commit", "-m", message], check=True)
+            subprocess.run(["git", "-C", str(REPO_ROOT), "push", "origin", "main"], check=True)
+            sp.set(out=len(items))
+
+    def dry_run(self, units, prompts):
+        for unit, prompt in zip(units, prompts):
+            gen_key = _digest("generate", self.model, self.spec["max_tokens"], prompt)
+            state = "キャッシュあり" if self.cache.has("generate", gen_key) else "API 呼び出し"
+            print(f"  [{unit['index'] + 1}/{len(units)}] {unit['count']}件 / プロンプト {len(prompt):,}文字 / {state}")
+        if prompts:
+            print("\n── 1件目のプロンプト（先頭 1500 文字）──")
+            print(prompts[0][:1500])
+
+    def report(self, wall):
+        print(f"\nステージ別（実時間 {wall:.1f}s / キャッシュ hit {self.cache.hits} miss {self.cache.misses}）:")
+        for stage, s in self.stats.items():
+            print(f"  {stage:9s} {s['in']:5d} → {s['out']:5d}  {s['sec']:7.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="クイズ問題の生成パイプライン（全種別共通）")
+    parser.add_argument("type", choices=list(QUIZ_TYPES), help="クイズの種別")
+    parser.add_argument("--count", type=int, default=100, help="生成する問題数（reading 以外）")
+    parser.add_argument("--axis-only", type=lambda s: [a.strip() for a in s.split(",")], default=None,
+                        help="特定 axis のみ生成（カンマ区切り）")
+    parser.add_argument("--topics", default=None, help="reading: 対象トピック ID（カンマ区切り。省略時は全トピック）")
+    parser.add_argument("--model", default=None, help="生成モデル（省略時は種別ごとの既定）")
+    parser.add_argument("--workers", type=int, default=4, help="生成単位の並列数（デフォルト: 4）")
+    parser.add_argument("--no-check", action="store_true", help="品質チェックをスキップ（非推奨）")
+    parser.add_argument("--no-cache", action="store_true", help="ステージキャッシュを使わない")
+    parser.add_argument("--fresh", action="store_true", help="未完了の run を再開せず新しく始める")
+    parser.add_argument("--dry-run", action="store_true", help="プロンプトとキャッシュ状況を表示するだけ")
+    parser.add_argument("--no-push", action="store_true", help="questions.js 更新まで（commit / push しない）")
+    parser.add_argument("--async-audio", action="store_true",
+                        help="音声ジョブはキューに積むだけにする（MP3 が無いので commit / push しない）")
+    args = parser.parse_args()
+
+    client = None
+    if not args.dry_run:
+        import anthropic
+
+        api_key = os.environ.get("ANTHROPIC_API_KEY")
+        if not api_key:
+            print("ERROR: ANTHROPIC_API_KEY が設定されていません")
+            sys.exit(1)
+        client = trace.instrument(anthropic.Anthropic(api_key=api_key))
+
+    pipeline = Pipeline(args.type, args, client)
+    spec = pipeline.spec
+    params = {"count": args.count, "axis_only": args.axis_only, "topics": args.topics,
+              "model": pipeline.model, "check": not args.no_check}
+    run, resumed = load_run(args.type, params, fresh=args.fresh, persist=not args.dry_run)
+    print(f"{args.type}: run {run['run_id']}{'（再開）' if resumed else ''} / モデル {pipeline.model}")
+    if not args.dry_run:
+        trace.start_run(f"quiz_pipeline:{args.type}", run["run_id"], resumed=resumed, params=params)
+
+    started = time.monotonic()
+    existing = spec["existing"]()
+    units = spec["units"](args)
+    pipeline.n_units = len(units)
+    prompts = pipeline.build_prompts(units, run["run_id"], existing)
+    print(f"既存 {len(existing)}件 / 生成単位 {len(units)}件（並列 {args.workers}）")
+
+    if args.dry_run:
+        pipeline.dry_run(units, prompts)
+        return
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(pipeline.run_unit, unit, prompt) for unit, prompt in zip(units, prompts)]
+        batches = []
+        for unit, fut in zip(units, futures):
+            try:
+                batches.append(fut.result())
+            except Exception as e:
+                print(f"  [{unit['index'] + 1}/{len(units)}] ERROR: {e}", file=sys.stderr)
+                batches.append([])
+
+    items = pipeline.dedupe(batches, existing)
+    if not items:
+        print("ERROR: 追加できる問題がありません", file=sys.stderr)
+        pipeline.report(time.monotonic() - started)
+        trace.end_run(0, time.monotonic() - started, error="no items")
+        sys.exit(1)
+    if not pipeline.audio(items):
+        pipeline.report(time.monotonic() - started)
+        trace.end_run(0, time.monotonic() - started, error="audio failed")
+        sys.exit(1)
+    pipeline.emit(items)
+    finish_run(args.type)
+
+    pipeline.report(time.monotonic() - started)
+    trace.end_run(len(items), time.monotonic() - started)
+    failed_units = sum(1 for b in batches if not b)
+    print(f"\n✅ 完了: {len(items)}件追加（失敗した生成単位 {failed_units}件）")
+
+
+if __name__ == "__main__":
+    main()
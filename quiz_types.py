@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+quiz_types.py - quiz_pipeline.py が扱うクイズ種別の定義
+
+各種別は以下のステージ関数を辞書で宣言する（既存の generate_* / add_* の関数をそのまま使う）:
+
+  units(args)            -> [unit]          生成単位（1回の API 呼び出し分）
+  prompt(unit, ctx)      -> str             プロンプト
+  parse(raw, unit)       -> [item]          レスポンスのパース
+  validate(item)         -> (errors, fixed) 1件のバリデーション（answer 補正などはその場で）
+  key(item)              -> str             重複判定のキー（大文字小文字・空白は無視して比較）
+  existing()             -> [str]           既存バンクのキー（重複判定・除外リスト用）
+  check(client, items)   -> [item]          品質チェックを通ったもの（None なら無し）
+  audio(items)           -> (bank, jobs)    tts_queue に積む音声ジョブ（None なら無し）
+  emit(items)            -> (paths, msg)    バンクへの書き出し。commit 対象と commit メッセージ
+
+新しい種別は QUIZ_TYPES に1エントリ足すだけで、キャッシュ・再開・並列化・dry-run が効く。
+"""
+
+import json
+import re
+from pathlib import Path
+
+import add_grammar
+import add_questions
+import add_words
+import generate_grammar
+import generate_questions
+import generate_readup
+import generate_words
+from lib import (parse_grammar_response, parse_response, parse_words_response,
+                 validate_grammar, validate_listening, validate_words)
+
+REPO_ROOT = Path(__file__).parent
+LV_RATIOS = [0.25, 0.30, 0.25, 0.15, 0.05]
+
+
+def _bank_values(path, field):
+    """questions.js から field の値をすべて取り出す"""
+    if not path.exists():
+        return []
+    content = path.read_text(encoding="utf-8")
+    values = []
+    for raw in re.findall(rf'\b{field}:\s*"((?:[^"\\]|\\.)*)"', content):
+        try:
+            values.append(json.loads(f'"{raw}"'))  # \" などのエスケープを戻す
+        except ValueError:
+            values.append(raw)
+    return values
+
+
+def count_units(batch_size):
+    """--count 問を batch_size ずつに分け、難易度配分（25/30/25/15/5%）を割り振る"""
+    def units(args):
+        lv_total = [round(args.count * r) for r in LV_RATIOS]
+        lv_total[2] += args.count - sum(lv_total)
+        out = []
+        remaining, remaining_lv = args.count, list(lv_total)
+        while remaining > 0:
+            n = min(batch_size, remaining)
+            lv = generate_questions.split_levels(remaining_lv, remaining, n)
+            out.append({"index": len(out), "count": n, "lv": lv, "axis_only": args.axis_only})
+            remaining_lv = [max(0, a - b) for a, b in zip(remaining_lv, lv)]
+            remaining -= n
+        return out
+    return units
+
+
+def _check_questions(quiz_type):
+    """check_questions.run_check で severity=FAIL の issue がある問題を除外（WARN のみは保持）"""
+    def check(client, items):
+        from check_questions import run_check
+
+        results = run_check(items, quiz_type)
+        fail = {r.get("index") for r in results
+                if any(issue.get("severity") == "FAIL" for issue in r.get("issues", []))}
+        return [q for i, q in enumerate(items) if i not in fail]
+    return check
+
+
+# ── words ──────────────────────────────────────
+def _words_audio(items):
+    return "words", add_words.audio_jobs(items, add_words.get_next_audio_num())
+
+
+def _words_emit(items):
+    add_words.append_to_questions_js(items)
+    paths = [add_words.QUESTIONS_JS] + [add_words.AUDIO_DIR / Path(q["audio"]).name for q in items]
+    return paths, f"WordsUp: {len(items)}問追加（品質チェック済み）"
+
+
+# ── listening ──────────────────────────────────
+def _listening_audio(items):
+    content = add_questions.QUESTIONS_JS.read_text(encoding="utf-8")
+    return "listening", add_questions.audio_jobs(items, add_questions.get_existing_count(content))
+
+
+def _listening_emit(items):
+    content = add_questions.QUESTIONS_JS.read_text(encoding="utf-8")
+    existing = add_questions.get_existing_count(content)
+    add_questions.append_to_questions_js(content, items)
+    paths = [add_questions.QUESTIONS_JS] + [REPO_ROOT / "listening" / q["audio"] for q in items]
+    return paths, f"Add {len(items)} questions (total: {existing + len(items)})"
+
+
+# ── grammar ────────────────────────────────────
+def _grammar_prompt(unit, ctx):
+    if "grammar_rules" not in ctx:
+        ctx["grammar_rules"] = generate_grammar.load_rules()
+    return generate_grammar.build_prompt(unit["count"], *unit["lv"], ctx["exclude"],
+                                         axis_only=unit["axis_only"], rules=ctx["grammar_rules"])
+
+
+def _grammar_emit(items):
+    content = add_grammar.QUESTIONS_JS.read_text(encoding="utf-8")
+    existing = add_grammar.get_existing_count(content)
+    max_id = add_grammar.get_max_id(content)
+    for i, q in enumerate(items):
+        q["id"] = f"g{max_id + i + 1:03d}"
+    add_grammar.append_to_questions_js(content, items)
+    return [add_grammar.QUESTIONS_JS], f"Add {len(items)} grammar questions (total: {existing + len(items)})"
+
+
+# ── reading（パッセージ単位。questions.js は build_readup.py が staging から全体を作り直す）──
+def _reading_units(args):
+    topics = generate_readup.TOPICS
+    if args.topics:
+        wanted = set(args.topics.split(","))
+        topics = [t for t in topics if t["id"] in wanted]
+    return [{"index": i, "count": generate_readup.PASSAGES_PER_TOPIC, "topic": t} for i, t in enumerate(topics)]
+
+
+def _reading_staging():
+    if not generate_readup.STAGING_JSON.exists():
+        return []
+    return json.loads(generate_readup.STAGING_JSON.read_text(encoding="utf-8") or "[]")
+
+
+def _reading_validate(p):
+    errors = []
+    if not p.get("questions"):
+        errors.append("questions が空")
+    return errors, None
+
+
+def _reading_emit(items):
+    """reading/staging.json に pid 単位でマージする（commit はしない。次は build_readup.py）"""
+    by_pid = {p["pid"]: p for p in _reading_staging()}
+    for p in items:
+        by_pid[p["pid"]] = p
+    generate_readup.STAGING_JSON.write_text(
+        json.dumps(list(by_pid.values()), ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"reading/staging.json に {len(items)} パッセージを保存（次: python3 build_readup.py）")
+    return [], None
+
+
+QUIZ_TYPES = {
+    "words": {
+        "model": generate_words.DEFAULT_MODEL,
+        "max_tokens": generate_words.MAX_TOKENS,
+        "exclude_limit": generate_words.EXCLUDE_LIMIT,
+        "units": count_units(generate_words.BATCH_SIZE),
+        "prompt": lambda unit, ctx: generate_words.build_prompt(
+            unit["count"], unit["lv"], ctx["exclude"], unit["axis_only"]),
+        "parse": lambda raw, unit: parse_words_response(raw, raise_on_error=False),
+        "validate": validate_words,
+        "key": lambda q: q["word"],
+        "existing": lambda: _bank_values(add_words.QUESTIONS_JS, "word"),
+        "check": _check_questions("words"),
+        "audio": _words_audio,
+        "emit": _words_emit,
+    },
+    "listening": {
+        "model": generate_questions.DEFAULT_MODEL,
+        "max_tokens": generate_questions.MAX_TOKENS,
+        "exclude_limit": generate_questions.EXCLUDE_LIMIT,
+        "units": count_units(generate_questions.BATCH_SIZE),
+        "prompt": lambda unit, ctx: generate_questions.build_prompt(
+            unit["count"], *unit["lv"], ctx["exclude"], axis_only=unit["axis_only"]),
+        "parse": lambda raw, unit: parse_response(raw, raise_on_error=False),
+        "validate": validate_listening,
+        "key": lambda q: q["text"],
+        "existing": lambda: _bank_values(add_questions.QUESTIONS_JS, "text"),
+        "check": _check_questions("listen"),
+        "audio": _listening_audio,
+        "emit": _listening_emit,
+    },
+    "grammar": {
+        "model": generate_grammar.DEFAULT_MODEL,
+        "max_tokens": generate_grammar.MAX_TOKENS,
+        "exclude_limit": generate_grammar.EXCLUDE_LIMIT,
+        "units": count_units(generate_grammar.BATCH_SIZE),
+        "prompt": _grammar_prompt,
+        "parse": lambda raw, unit: parse_grammar_response(raw, raise_on_error=False),
+        "validate": validate_grammar,
+        "key": lambda q: q["stem"],
+        "existing": lambda: _bank_values(add_grammar.QUESTIONS_JS, "stem"),
+        "check": lambda client, items: generate_grammar.verify_questions(
+            client, generate_grammar.VERIFY_MODEL, items),
+        "audio": None,
+        "emit": _grammar_emit,
+    },
+    "reading": {
+        "model": generate_readup.GEN_MODEL,
+        "max_tokens": generate_readup.MAX_TOKENS,
+        "exclude_limit": 0,
+        "units": _reading_units,
+        "prompt": lambda unit, ctx: generate_readup.build_gen_prompt(unit["topic"]),
+        "parse": lambda raw, unit: generate_readup.parse_passages(raw, unit["topic"]["id"]),
+        "validate": _reading_validate,
+        "key": lambda p: p["passage"],
+        "existing": lambda: [p["passage"] for p in _reading_staging()],
+        "check": generate_readup.factcheck_passages,
+        "audio": None,
+        "emit": _reading_emit,
+    },
+}
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+related_articles.py - 本文の類似度から記事ごとの関連記事を選ぶ
+
+add_internal_links.ARTICLE_LINKS は記事ごとのリンクを手で書いた表で、generate_articles.py で
+記事が増えるたびに古くなる。ここでは全記事のタイトルと本文を TF-IDF ベクトルにして、
+記事ごとに類似度の高い上位 TOP_K 本を関連記事にする。
+
+  語     日本語は文字 2-gram（ひらがな・カタカナ・漢字の連続部分）、英数字は単語（NFKC・小文字化）
+  重み   (1 + log tf) × log(N / df)、タイトルは TITLE_WEIGHT 倍。L2 正規化し、1記事あたり重みの大きい
+         MAX_TERMS 語だけ残す（疎ベクトル）
+  類似度 語 → (記事, 重み) の転置インデックスで全記事対のコサイン類似度をまとめて計算する
+         （疎行列の X・Xᵀ と同じ）。df が MAX_DF を超える語はどの記事にも出るので使わない。
+         各記事対は1回だけ計算する。df が MAX_POSTINGS を超える語は重みの大きい MAX_POSTINGS 記事の
+         間でだけ使う（1語あたりの計算量が記事数によらず頭打ちになる）
+
+結果は data/related_articles.json に保存する。ARTICLE_LINKS に書いたリンクはピン留めとして先頭に
+置き、残りを類似度順で MAX_LINKS 本まで埋める（タイトルは各ページの <h1> から取る）。
+site_refresh.py の links パスはこのファイルを使い、記事の追加・削除があれば作り直す。
+
+Usage:
+  python3 related_articles.py                   # 作り直して data/related_articles.json に保存
+  python3 related_articles.py --show toeic-600-study-plan
+  python3 related_articles.py --dry-run         # 保存せずに各記事の関連記事を表示
+"""
+
+import argparse
+import heapq
+import html
+import json
+import math
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+ARTICLES_DIR = ROOT / "articles"
+RELATED_JSON = ROOT / "data" / "related_articles.json"
+
+TOP_K = 5            # 類似度で選ぶ関連記事の数
+MAX_LINKS = 6        # ピン留めを含めた関連記事の上限
+TITLE_WEIGHT = 3
+MAX_TERMS = 300
+MAX_DF = 0.5         # これより多くの記事に出る語は使わない
+MAX_POSTINGS = 200   # 1語あたり類似度の計算に使う記事数（重みの大きい順）
+MIN_SCORE = 0.05
+
+_JA = "぀-ヿ㐀-鿿豈-﫿"
+_JA_BIGRAM_RE = re.compile(rf"(?=([{_JA}]{{2}}))")          # 重なりを含む 2-gram を1回の走査で
+_JA_SINGLE_RE = re.compile(rf"(?<![{_JA}])[{_JA}](?![{_JA}])")   # 1文字だけの連続部分
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_MAIN_RE = re.compile(r"<main\b[^>]*>(.*?)</main>", re.DOTALL)
+_H1_RE = re.compile(r"<h1\b[^>]*>(.*?)</h1>", re.DOTALL)
+_TITLE_RE = re.compile(r"<title>(.*?)</title>", re.DOTALL)
+_DROP_RE = re.compile(
+    r'<(script|style)\b.*?</\1>'
+    r'|<div class="related-articles">.*?</div>'
+    r'|<section class="related-posts">.*?</section>',
+    re.DOTALL,
+)
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+# ── 本文の取り出しと語の切り出し ────────────
+def _plain(fragment):
+    return " ".join(html.unescape(_TAG_RE.sub(" ", fragment)).split())
+
+
+def page_title(text):
+    m = _H1_RE.search(text)
+    if m:
+        return _plain(m.group(1))
+    m = _TITLE_RE.search(text)
+    return _plain(m.group(1)).split(" | ")[0] if m else ""
+
+
+def extract(text):
+    """記事 HTML から (タイトル, 本文テキスト)。関連記事欄・スクリプト・スタイルは除く"""
+    m = _MAIN_RE.search(text)
+    body = m.group(1) if m else text
+    return page_title(text), _plain(_DROP_RE.sub(" ", body))
+
+
+def terms(text):
+    """語の出現回数"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    counts = Counter(_WORD_RE.findall(text))
+    counts.update(_JA_BIGRAM_RE.findall(text))
+    counts.update(_JA_SINGLE_RE.findall(text))
+    return counts
+
+
+# ── TF-IDF と類似度 ───────────────────────
+def vectorize(docs):
+    """docs: [(タイトル, 本文)] → 正規化した疎ベクトル [{語: 重み}]"""
+    counts = []
+    for title, body in docs:
+        c = terms(body)
+        for term, n in terms(title).items():
+            c[term] += n * TITLE_WEIGHT
+        counts.append(c)
+    n_docs = len(counts)
+    df = Counter()
+    for c in counts:
+        df.update(c.keys())
+    max_df = max(2, MAX_DF * n_docs)
+    idf = {t: math.log(n_docs / d) for t, d in df.items() if d <= max_df}
+    log_tf = [0.0] + [1 + math.log(n) for n in range(1, max((max(c.values(), default=0) for c in counts), default=0) + 1)]
+    vectors = []
+    for c in counts:
+        weights = {t: log_tf[n] * idf[t] for t, n in c.items() if t in idf}
+        if len(weights) > MAX_TERMS:
+            # heapq.nlargest と同じ結果（同点は先に出た語が優先）。C 実装のソートの方が速い
+            weights = dict(sorted(weights.items(), key=itemgetter(1), reverse=True)[:MAX_TERMS])
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors.append({t: w / norm for t, w in weights.items()})
+    return vectors
+
+
+def neighbors(vectors, k=TOP_K, min_score=MIN_SCORE):
+    """各記事について類似度上位 k 件の [(記事番号, 類似度)]
+
+    記事を順に転置インデックスへ足しながら、それまでに足した記事とだけ内積を取る（各対を1回だけ計算し、
+    上位 k 件のヒープを両方の記事に積む）。語ごとに重みの大きい MAX_POSTINGS 記事だけを残す。
+    """
+    by_term = defaultdict(list)
+    for i, vec in enumerate(vectors):
+        for term, w in vec.items():
+            by_term[term].append((w, i))
+    keep = {term: {i for _, i in heapq.nlargest(MAX_POSTINGS, plist)}
+            for term, plist in by_term.items() if len(plist) > MAX_POSTINGS}
+    postings = defaultdict(lambda: ([], []))   # 語 → (記事番号のリスト, 重みのリスト)
+    tops = [[] for _ in vectors]               # 記事ごとの上位 k 件（(類似度, -番号, 番号) の最小ヒープ）
+    for i, vec in enumerate(vectors):
+        scores = [0.0] * i
+        for term, w in vec.items():
+            if term in keep and i not in keep[term]:
+                continue
+            ids, weights = postings[term]
+            for j, wj in zip(ids, weights):
+                scores[j] += w * wj
+            ids.append(i)
+            weights.append(w)
+        for j, s in enumerate(scores):
+            if s >= min_score:
+                for heap, item in ((tops[i], (s, -j, j)), (tops[j], (s, -i, i))):
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+    return [[(j, s) for s, _, j in sorted(heap, reverse=True)] for heap in tops]
+
+
+# ── 関連記事グラフ ─────────────────────────
+def article_pages():
+    """(slug, パス)。記事一覧 articles/index.html は含めない"""
+    return [(p.parent.name, p) for p in sorted(ARTICLES_DIR.glob("*/index.html"))]
+
+
+def build(pages=None, k=TOP_K):
+    """全記事を読んで {slug: {"title", "related": [[slug, 類似度], ...]}} を返す"""
+    pages = article_pages() if pages is None else pages
+    slugs = [slug for slug, _ in pages]
+    docs = [extract(path.read_text(encoding="utf-8")) for _, path in pages]
+    near = neighbors(vectorize(docs), k)
+    return {
+        slug: {"title": docs[i][0], "related": [[slugs[j], round(s, 4)] for j, s in near[i]]}
+        for i, slug in enumerate(slugs)
+    }
+
+
+def save(graph):
+    RELATED_JSON.write_text(json.dumps({"articles": graph}, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+
+
+_graph = None
+
+
+def load():
+    """data/related_articles.json（無ければ空）。プロセス内で1回だけ読む"""
+    global _graph
+    if _graph is None:
+        try:
+            _graph = json.loads(RELATED_JSON.read_text(encoding="utf-8"))["articles"]
+        except (OSError, ValueError, KeyError):
+            _graph = {}
+    return _graph
+
+
+def ensure_current():
+    """記事の追加・削除があればグラフを作り直して保存する。作り直したら True"""
+    global _graph
+    current = {slug for slug, _ in article_pages()}
+    if set(load()) == current:
+        return False
+    _graph = build()
+    save(_graph)
+    return True
+
+
+@lru_cache(maxsize=None)
+def _title_for(url, fallback):
+    """リンク先のタイトル（記事はグラフから、それ以外はページの <h1> から）"""
+    m = re.fullmatch(r"/articles/([^/]+)/", url)
+    if m and m.group(1) in load():
+        return load()[m.group(1)]["title"] or fallback
+    page = ROOT / url.strip("/") / "index.html"
+    if page.exists():
+        return page_title(page.read_text(encoding="utf-8")) or fallback
+    return fallback
+
+
+def links_for(slug):
+    """記事の関連記事リンク [(url, タイトル)]。ピン留め（ARTICLE_LINKS）→ 類似度順で MAX_LINKS 本まで"""
+    from add_internal_links import ARTICLE_LINKS
+
+    links = [(url, _title_for(url, title)) for url, title in ARTICLE_LINKS.get(slug, [])]
+    seen = {url for url, _ in links} | {f"/articles/{slug}/"}
+    for other, _ in load().get(slug, {}).get("related", []):
+        if len(links) >= MAX_LINKS:
+            break
+        url = f"/articles/{other}/"
+        if url not in seen:
+            links.append((url, load()[other]["title"]))
+            seen.add(url)
+    return links
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本文の類似度から関連記事を選ぶ")
+    parser.add_argument("--show", metavar="SLUG", help="1記事の関連記事リンクを表示")
+    parser.add_argument("--dry-run", action="store_true", help="保存せずに表示")
+    parser.add_argument("--k", type=int, default=TOP_K, help=f"類似度で選ぶ件数（デフォルト: {TOP_K}）")
+    args = parser.parse_args()
+
+    if args.show:
+        for url, title in links_for(args.show):
+            print(f"  {url}  {title}")
+        return
+
+    global _graph
+    started = time.monotonic()
+    _graph = build(k=args.k)
+    wall = time.monotonic() - started
+    if args.dry_run:
+        for slug, entry in _graph.items():
+            print(f"{slug}")
+            for other, score in entry["related"]:
+                print(f"    {score:.3f}  {other}")
+    else:
+        save(_graph)
+    print(f"{len(_graph)} 記事の関連記事を計算（{wall:.1f}s）"
+          + ("" if args.dry_run else f" → {RELATED_JSON.relative_to(ROOT)}"))
+
+
+if __name__ == "__main__":
+    main()
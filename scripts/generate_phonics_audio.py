@@ -7,7 +7,10 @@ Output: phonics/audio/{word}.mp3
 import asyncio
 import os
 import sys
-import edge_tts
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tts_engine import summarize, synthesize_async
 
 VOICE = "en-US-AriaNeural"
 OUT_DIR = os.path.join(os.path.dirname(__file__), "../phonics/audio")
@@ -50,15 +53,9 @@ WORDS = sorted(set([
 ]))
 
 
-async def generate(word: str, force: bool = False):
+def word_job(word: str) -> dict:
     filename = word.lower().replace(" ", "_") + ".mp3"
-    path = os.path.join(OUT_DIR, filename)
-    if not force and os.path.exists(path):
-        print(f"  skip  {filename}")
-        return
-    communicate = edge_tts.Communicate(word, VOICE)
-    await communicate.save(path)
-    print(f"  gen   {filename}")
+    return {"text": word, "path": Path(OUT_DIR) / filename, "voice": VOICE}
 
 
 async def main():
@@ -66,9 +63,12 @@ async def main():
     os.makedirs(OUT_DIR, exist_ok=True)
     print(f"Generating {len(WORDS)} audio files → {OUT_DIR}")
     print(f"Voice: {VOICE}\n")
-    tasks = [generate(w, force) for w in WORDS]
-    await asyncio.gather(*tasks)
-    print(f"\nDone. {len(WORDS)} files.")
+    # 並列数は tts_engine 側で制限（全単語を一斉に投げない）
+    results = await synthesize_async([word_job(w) for w in WORDS], skip_existing=not force, refresh_cache=force)
+    generated, skipped, failed = summarize(results)
+    print(f"\nDone. {generated} generated, {skipped} skipped, {len(failed)} errors.")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -11,12 +11,18 @@ Usage:
     python3 scripts/generate_phonics_phonemes.py           # skip existing
     python3 scripts/generate_phonics_phonemes.py --force   # regenerate all
 """
+import asyncio
 import base64
 import os
 import sys
+from pathlib import Path
+
 import requests
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tts_engine import summarize, synthesize
+
 load_dotenv(os.path.join(os.path.dirname(__file__), "../.env"))
 
 API_KEY = os.environ.get("GOOGLE_CLOUD_API_KEY")
@@ -70,28 +76,31 @@ def build_payload(input_type: str, value: str) -> dict:
         return {"input": {"text": value}}
 
 
-def generate_phoneme(letter: str, input_type: str, value: str, force: bool = False) -> bool:
-    filename = f"phoneme_{letter}.mp3"
-    path = os.path.join(OUT_DIR, filename)
-    if not force and os.path.exists(path):
-        print(f"  skip  {filename}")
-        return True
+def _post_synthesize(payload: dict) -> bytes:
+    resp = requests.post(URL, json=payload, timeout=30)
+    if resp.status_code != 200:
+        raise RuntimeError(f"{resp.status_code} {resp.text[:200]}")
+    return base64.b64decode(resp.json()["audioContent"])
 
-    payload = build_payload(input_type, value)
-    payload["voice"] = {"languageCode": "en-US", "name": "en-US-Neural2-F"}
+
+async def google_tts_synth(job: dict):
+    """tts_engine 用バックエンド: Google Cloud TTS REST API（境界イベントなし）"""
+    payload = build_payload(job["input_type"], job["text"])
+    payload["voice"] = {"languageCode": "en-US", "name": job["voice"]}
     payload["audioConfig"] = {"audioEncoding": "MP3", "speakingRate": 0.85}
+    audio = await asyncio.to_thread(_post_synthesize, payload)
+    return audio, []
 
-    resp = requests.post(URL, json=payload)
-    if resp.status_code != 200:
-        print(f"  ERROR {filename}: {resp.status_code} {resp.text[:200]}")
-        return False
 
-    audio_content = base64.b64decode(resp.json()["audioContent"])
-    with open(path, "wb") as f:
-        f.write(audio_content)
+def phoneme_job(letter: str, input_type: str, value: str) -> dict:
     label = f'IPA /{value}/' if input_type == 'ssml' else f'text "{value}"'
-    print(f"  gen   {filename}  {label}")
-    return True
+    return {
+        "text": value,
+        "input_type": input_type,
+        "path": Path(OUT_DIR) / f"phoneme_{letter}.mp3",
+        "voice": "en-US-Neural2-F",
+        "label": f"phoneme_{letter}.mp3  {label}",
+    }
 
 
 def main():
@@ -99,15 +108,12 @@ def main():
     os.makedirs(OUT_DIR, exist_ok=True)
     print(f"Generating {len(PHONEME_MAP)} phoneme files → {OUT_DIR}\n")
 
-    ok = err = 0
-    for letter, (input_type, value) in PHONEME_MAP.items():
-        if generate_phoneme(letter, input_type, value, force):
-            ok += 1
-        else:
-            err += 1
+    jobs = [phoneme_job(letter, t, v) for letter, (t, v) in PHONEME_MAP.items()]
+    results = synthesize(jobs, synth=google_tts_synth, skip_existing=not force, refresh_cache=force)
+    generated, skipped, failed = summarize(results)
 
-    print(f"\nDone. {ok} generated, {err} errors.")
-    if err:
+    print(f"\nDone. {generated} generated, {skipped} skipped, {len(failed)} errors.")
+    if failed:
         sys.exit(1)
 
 
@@ -0,0 +1,233 @@
+/*
+ * search.js - サイト内検索のクライアント
+ *
+ * build_search_index.py が書いた search/index.json（シャードの先頭語と文書チャンクの一覧）を読み、
+ * クエリの語を含むシャードだけを取りに行く。前回の併合より後に追加した文書は差分セグメント
+ * （manifest.delta）にあるので、それも読んで同じ語のポスティングを合わせる。語の切り出し（tokens / lemma）は
+ * build_search_index.py と同じ規則なので、片方を変えたらもう片方も合わせること。
+ */
+(function () {
+  'use strict';
+
+  var BASE = '/search/';
+  var LIMIT = 30;
+  var STOPWORDS = new Set(('a an and are as at be but by for from has have he her his i in is it its me my of on or ' +
+    'our she so that the their them they this to was we were with you your').split(' '));
+  var JA_RUN = /[\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff]+/g;
+  var WORD = /[a-z0-9]+/g;
+  var DOUBLE = /([b-df-hj-kmnp-rtv-z])\1$/;
+  var SUFFIXES = [['ies', 'y'], ['sses', 'ss'], ['ches', 'ch'], ['shes', 'sh'], ['xes', 'x']];
+
+  // ── 語の切り出し（build_search_index.tokens と同じ） ──
+  function lemma(w) {
+    if (w.length <= 3 || /^[0-9]+$/.test(w)) return w;
+    for (var i = 0; i < SUFFIXES.length; i++) {
+      var s = SUFFIXES[i][0];
+      if (w.endsWith(s) && w.length > s.length + 2) return w.slice(0, -s.length) + SUFFIXES[i][1];
+    }
+    if (w.endsWith('ing') && w.length > 5) w = w.slice(0, -3).replace(DOUBLE, '$1');
+    else if (w.endsWith('ed') && w.length > 4) w = w.slice(0, -2).replace(DOUBLE, '$1');
+    else if (w.endsWith('s') && !/(ss|us|is)$/.test(w)) w = w.slice(0, -1);
+    if (w.endsWith('e') && w.length > 3) w = w.slice(0, -1);
+    return w;
+  }
+
+  // [{term, prefix}]。入力途中の最後の英単語（2文字以上）と、1文字だけの日本語は前方一致で探す
+  function queryTerms(q) {
+    var text = q.normalize('NFKC').toLowerCase();
+    var terms = new Map();
+    var words = text.match(WORD) || [];
+    var typing = !/\s$/.test(q);
+    words.forEach(function (w, i) {
+      var last = typing && i === words.length - 1 && w.length >= 2 && text.endsWith(w);
+      if (STOPWORDS.has(w) && !last) return;
+      var t = lemma(w);
+      terms.set(t, terms.get(t) || last);
+    });
+    (text.match(JA_RUN) || []).forEach(function (run) {
+      if (run.length === 1) { terms.set(run, true); return; }
+      for (var i = 0; i < run.length - 1; i++) terms.set(run.slice(i, i + 2), terms.get(run.slice(i, i + 2)) || false);
+    });
+    return Array.from(terms, function (e) { return { term: e[0], prefix: e[1] }; });
+  }
+
+  // ── インデックスの読み込み ──
+  var manifest = null;
+  var shards = new Map();   // ファイル名 → Promise<Map<語, {df, body}>>
+  var chunks = new Map();   // ファイル名 → Promise<文書の配列>
+  var decoder = new TextDecoder();
+
+  function loadManifest() {
+    if (!manifest) {
+      manifest = fetch(BASE + 'index.json', { cache: 'no-cache' }).then(function (r) { return r.json(); });
+    }
+    return manifest;
+  }
+
+  function readVarint(bytes, pos) {
+    var n = 0, shift = 0, b;
+    do {
+      b = bytes[pos.i++];
+      n += (b & 0x7f) * Math.pow(2, shift);
+      shift += 7;
+    } while (b >= 0x80);
+    return n;
+  }
+
+  function loadShard(name) {
+    if (!shards.has(name)) {
+      shards.set(name, fetch(BASE + name).then(function (r) { return r.arrayBuffer(); }).then(function (buf) {
+        var bytes = new Uint8Array(buf);
+        var pos = { i: 0 };
+        var terms = new Map();
+        while (pos.i < bytes.length) {
+          var len = readVarint(bytes, pos);
+          var term = decoder.decode(bytes.subarray(pos.i, pos.i + len));
+          pos.i += len;
+          var df = readVarint(bytes, pos);
+          var size = readVarint(bytes, pos);
+          terms.set(term, { df: df, body: bytes.subarray(pos.i, pos.i + size) });
+          pos.i += size;
+        }
+        return terms;
+      }));
+    }
+    return shards.get(name);
+  }
+
+  function loadChunk(name) {
+    if (!chunks.has(name)) {
+      chunks.set(name, fetch(BASE + name).then(function (r) { return r.json(); }));
+    }
+    return chunks.get(name);
+  }
+
+  // 先頭語が term 以下の最後のシャード
+  function shardIndex(m, term) {
+    var lo = 0, hi = m.shards.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (m.shards[mid][0] <= term) lo = mid + 1; else hi = mid;
+    }
+    return lo - 1;
+  }
+
+  // 語（前方一致なら範囲）を含むシャードと差分セグメントを読み、語ごとの [{df, bodies}] を返す
+  // （本体と差分の文書 ID は重ならないので、df は合計し、ポスティングは別々に読む）
+  function lookup(m, t) {
+    var from = shardIndex(m, t.term);
+    var to = t.prefix ? shardIndex(m, t.term + '\uffff') : from;
+    var names = m.shards.slice(from, to + 1).map(function (s) { return s[1]; });
+    if (m.delta) names.push(m.delta);
+    return Promise.all(names.map(loadShard)).then(function (maps) {
+      var found = new Map();
+      function add(term, entry) {
+        var f = found.get(term);
+        if (!f) found.set(term, f = { df: 0, bodies: [] });
+        f.df += entry.df;
+        f.bodies.push(entry.body);
+      }
+      maps.forEach(function (terms) {
+        if (!t.prefix) {
+          if (terms.has(t.term)) add(t.term, terms.get(t.term));
+          return;
+        }
+        terms.forEach(function (entry, term) {
+          if (term.startsWith(t.term)) add(term, entry);
+        });
+      });
+      return Array.from(found.values());
+    });
+  }
+
+  // ── 検索と順位付け（build_search_index.query と同じ） ──
+  function search(q) {
+    var terms = queryTerms(q);
+    if (!terms.length) return Promise.resolve({ terms: terms, total: 0, results: [] });
+    return loadManifest().then(function (m) {
+      return Promise.all(terms.map(function (t) { return lookup(m, t); })).then(function (lists) {
+        var scores = new Map();
+        var hits = new Map();
+        lists.forEach(function (entries) {
+          var best = new Map();   // 前方一致で複数の語に当たった文書は一番高い1つだけ数える
+          entries.forEach(function (e) {
+            var idf = Math.log(1 + m.docs / e.df);
+            e.bodies.forEach(function (body) {
+              var pos = { i: 0 }, id = 0;
+              while (pos.i < body.length) {
+                var v = readVarint(body, pos);
+                id += Math.floor(v / 2);
+                var s = idf * (v & 1 ? 3 : 1);
+                if (!best.has(id) || best.get(id) < s) best.set(id, s);
+              }
+            });
+          });
+          best.forEach(function (s, id) {
+            scores.set(id, (scores.get(id) || 0) + s);
+            hits.set(id, (hits.get(id) || 0) + 1);
+          });
+        });
+        var need = terms.length <= 2 ? terms.length : Math.ceil(terms.length * 2 / 3);
+        var ids = [];
+        hits.forEach(function (h, id) { if (h >= need) ids.push(id); });
+        ids.sort(function (a, b) { return (hits.get(b) - hits.get(a)) || (scores.get(b) - scores.get(a)); });
+        var top = ids.slice(0, LIMIT);
+        return Promise.all(top.map(function (id) {
+          return loadChunk(m.chunks[Math.floor(id / m.chunk)]).then(function (rows) { return rows[id % m.chunk]; });
+        })).then(function (docs) {
+          return { terms: terms, total: ids.length, kinds: m.kinds, results: docs.filter(Boolean) };
+        });
+      });
+    });
+  }
+
+  // ── 画面 ──
+  function escapeHtml(s) {
+    return s.replace(/[&<>"]/g, function (c) { return { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;' }[c]; });
+  }
+
+  function render(list, status, res) {
+    if (!res.terms.length) {
+      status.textContent = '';
+      list.innerHTML = '';
+      return;
+    }
+    status.textContent = res.total ? res.total + ' 件' + (res.total > LIMIT ? '（上位 ' + LIMIT + ' 件を表示）' : '')
+                                   : '見つかりませんでした';
+    list.innerHTML = res.results.map(function (d) {
+      return '<li class="sr-item"><span class="sr-kind sr-' + d[0] + '">' + escapeHtml(res.kinds[d[0]] || d[0]) + '</span>' +
+        '<a href="' + escapeHtml(d[1]) + '">' + escapeHtml(d[2]) + '</a>' +
+        '<p>' + escapeHtml(d[3]) + '</p></li>';
+    }).join('');
+  }
+
+  function init() {
+    var input = document.getElementById('searchInput');
+    var list = document.getElementById('searchResults');
+    var status = document.getElementById('searchStatus');
+    if (!input) return;
+    var timer = null;
+    var seq = 0;
+    function run() {
+      var q = input.value;
+      var mine = ++seq;
+      var url = new URL(location.href);
+      if (q.trim()) url.searchParams.set('q', q); else url.searchParams.delete('q');
+      history.replaceState(null, '', url);
+      search(q).then(function (res) { if (mine === seq) render(list, status, res); })
+        .catch(function () { if (mine === seq) status.textContent = '検索インデックスを読み込めませんでした'; });
+    }
+    input.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(run, 150);
+    });
+    var q = new URLSearchParams(location.search).get('q');
+    if (q) {
+      input.value = q;
+      run();
+    }
+  }
+
+  window.SiteSearch = { search: search, queryTerms: queryTerms, lemma: lemma };
+  if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', init); else init();
+})();
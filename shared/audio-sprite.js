@@ -0,0 +1,81 @@
+/* ─────────────────────────────────────────────
+   NativeReal 共通 Audio Sprite  v1.0
+   /shared/audio-sprite.js
+   pack_audio.py が書き出した pack（連結MP3 + 索引JSON）を1回だけ取得し、
+   クリップ単位で再生する。pack に無いキーは play() が false を返すので
+   呼び出し側で従来の個別ファイル再生にフォールバックする。
+   ───────────────────────────────────────────── */
+(function () {
+  'use strict';
+
+  var ctx = null;
+  var packs = [];      // { clips: {key: [startMs, endMs]}, buffer: AudioBuffer|null }
+  var loading = {};    // indexUrl -> Promise
+  var current = null;
+
+  function getContext() {
+    if (ctx) return ctx;
+    var AC = window.AudioContext || window.webkitAudioContext;
+    if (!AC) return null;
+    ctx = new AC();
+    return ctx;
+  }
+
+  function decode(ac, arrayBuffer) {
+    // Safari の古い実装はコールバック形式のみ
+    return new Promise(function (resolve, reject) {
+      var p = ac.decodeAudioData(arrayBuffer, resolve, reject);
+      if (p && p.then) p.then(resolve, reject);
+    });
+  }
+
+  function load(indexUrl) {
+    if (loading[indexUrl]) return loading[indexUrl];
+    var ac = getContext();
+    if (!ac || !window.fetch) return Promise.resolve(null);
+    var base = indexUrl.slice(0, indexUrl.lastIndexOf('/') + 1);
+    loading[indexUrl] = fetch(indexUrl)
+      .then(function (res) { if (!res.ok) throw new Error(res.status); return res.json(); })
+      .then(function (index) {
+        return fetch(base + index.src)
+          .then(function (res) { if (!res.ok) throw new Error(res.status); return res.arrayBuffer(); })
+          .then(function (buf) { return decode(ac, buf); })
+          .then(function (buffer) {
+            var pack = { clips: index.clips, buffer: buffer };
+            packs.push(pack);
+            return pack;
+          });
+      })
+      .catch(function () { return null; });
+    return loading[indexUrl];
+  }
+
+  function find(key) {
+    for (var i = 0; i < packs.length; i++) {
+      if (packs[i].clips[key]) return packs[i];
+    }
+    return null;
+  }
+
+  function stop() {
+    if (!current) return;
+    try { current.stop(); } catch (_) {}
+    current = null;
+  }
+
+  function play(key) {
+    var pack = find(key);
+    if (!pack || !ctx) return false;
+    var range = pack.clips[key];
+    if (ctx.state === 'suspended') ctx.resume();
+    stop();
+    var src = ctx.createBufferSource();
+    src.buffer = pack.buffer;
+    src.connect(ctx.destination);
+    src.start(0, range[0] / 1000, (range[1] - range[0]) / 1000);
+    current = src;
+    return true;
+  }
+
+  window.AudioSprite = { load: load, play: play, stop: stop, has: function (key) { return !!find(key); } };
+})();
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+shared_css.py - ページごとにインライン展開している共通 CSS を /assets/site.<hash>.css に切り出す
+
+記事（generate_articles.CSS）・フレーズ集（convert_real_phrases.BASE_CSS）・統一ヘッダー
+（unify_headers.HEADER_CSS）はほぼ同じ CSS を全ページの <style> に持っていて、ページを
+開くたびに同じ CSS を読み直している。
+
+  plan     全ページの先頭の <style> をルール単位に分け、多くのページで共通する「先頭から連続した
+           ルール列」を選んで assets/site.<hash>.css に書き出す（一覧は data/shared_css.json）
+  適用     site_refresh.py の css パスが、<style> の先頭がシートと一致するページの該当部分を
+           <link rel="stylesheet" href="/assets/site.<hash>.css" data-shared-css> に置き換える
+
+シートはページの <style> の「先頭部分そのもの」なので、<link> + 残りの <style> に置き換えても
+カスケードの順序は元と変わらない（他ページ専用のルールが混ざることもない）。
+ヘッダーの再生成などで <style> を触るパスの前には expand で元のインライン CSS に戻し、
+最後に css パスで切り出し直す。
+
+Usage:
+  python3 shared_css.py plan                 # シートを選び直す（次の site_refresh.py で全ページに適用）
+  python3 shared_css.py plan --dry-run       # 書き出さずに削減見込みだけ表示
+  python3 shared_css.py plan --max-sheets 3 --min-pages 20
+  python3 shared_css.py report               # 現在の適用状況（ページごとの削減バイト数）
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+ASSETS_DIR = ROOT / "assets"
+MANIFEST_PATH = ROOT / "data" / "shared_css.json"
+SHEET_GLOB = "site.*.css"
+
+MAX_SHEETS = 4
+MIN_PAGES = 10          # これより少ないページでしか共有されないルール列はシートにしない
+MIN_SAVING = 50_000     # シート1枚あたりの最低削減バイト数（全ページ合計）
+
+_SCAN_RE = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|[{};]', re.DOTALL)
+_LINK_RE = re.compile(r'<link rel="stylesheet" href="/assets/(site\.[0-9a-f]{12}\.css)" data-shared-css>\n  <style>')
+
+
+# ── CSS のルール分割 ───────────────────────
+def _rule(css, start, end):
+    text = css[start:end]
+    start += len(text) - len(text.lstrip())
+    return start, end, " ".join(text.split())
+
+
+def split_rules(css):
+    """トップレベルのルール（@media などのブロック・コメントを含む）を (開始, 終了, 正規化テキスト) で返す"""
+    rules = []
+    pos = 0
+    depth = 0
+    for m in _SCAN_RE.finditer(css):
+        tok = m.group()
+        if tok.startswith("/*"):
+            if depth == 0 and not css[pos:m.start()].strip():
+                rules.append(_rule(css, pos, m.end()))
+                pos = m.end()
+        elif tok == "{":
+            depth += 1
+        elif tok == "}":
+            depth -= 1
+            if depth <= 0:
+                depth = 0
+                rules.append(_rule(css, pos, m.end()))
+                pos = m.end()
+        elif tok == ";" and depth == 0:
+            rules.append(_rule(css, pos, m.end()))
+            pos = m.end()
+    return rules
+
+
+def first_style(html):
+    """<head> 内の最初の <style> の (内容の開始, 終了) 。無ければ None"""
+    start = html.find("<style>")
+    head_end = html.find("</head>")
+    if start < 0 or (0 <= head_end < start):
+        return None
+    end = html.find("</style>", start)
+    return (start + len("<style>"), end) if end >= 0 else None
+
+
+# ── 適用 / 復元 ────────────────────────────
+def load_sheets():
+    """[(ファイル名, 正規化ルールのリスト)]。長いシートから順に並べる"""
+    if not MANIFEST_PATH.exists():
+        return []
+    manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    sheets = []
+    for sheet in manifest["sheets"]:
+        text = (ASSETS_DIR / sheet["file"]).read_text(encoding="utf-8")
+        sheets.append((sheet["file"], [r[2] for r in split_rules(text)]))
+    return sorted(sheets, key=lambda s: -len(s[1]))
+
+
+def extract(html, sheets):
+    """<style> の先頭がシートと一致すれば <link> に置き換える。(新しい HTML, 参照したシート, 削減バイト数)"""
+    span = first_style(html)
+    if not span or not sheets:
+        return html, None, 0
+    css = html[span[0]:span[1]]
+    rules = split_rules(css)
+    norms = [r[2] for r in rules]
+    for name, sheet in sheets:
+        n = len(sheet)
+        if n and norms[:n] == sheet:
+            link = f'<link rel="stylesheet" href="/assets/{name}" data-shared-css>\n  <style>'
+            cut = rules[n - 1][1]
+            new_html = html[:span[0] - len("<style>")] + link + css[cut:] + html[span[1]:]
+            return new_html, name, len(html.encode("utf-8")) - len(new_html.encode("utf-8"))
+    return html, None, 0
+
+
+def expand(html):
+    """extract の逆。シートへの <link> を元のインライン CSS に戻す（シートが消えていればそのまま）"""
+    def inline(m):
+        path = ASSETS_DIR / m.group(1)
+        if not path.exists():
+            return m.group(0)
+        return "<style>\n" + path.read_text(encoding="utf-8").rstrip("\n")
+    return _LINK_RE.sub(inline, html)
+
+
+def referenced_sheet(html):
+    m = _LINK_RE.search(html)
+    return m.group(1) if m else None
+
+
+# ── シートの選定 ───────────────────────────
+class _Node:
+    __slots__ = ("children", "pages", "size", "parent", "rule")
+
+    def __init__(self, parent=None, rule=None):
+        self.children = {}
+        self.pages = []
+        self.parent = parent
+        self.rule = rule
+        self.size = parent.size + len(rule.encode("utf-8")) + 1 if parent else 0
+
+    def rules(self):
+        out = []
+        node = self
+        while node.parent:
+            out.append(node.rule)
+            node = node.parent
+        return out[::-1]
+
+
+def choose_sheets(page_rules, max_sheets=MAX_SHEETS, min_pages=MIN_PAGES, min_saving=MIN_SAVING):
+    """
+    page_rules: {ページ: [正規化ルール, ...]}
+    各ページの先頭ルール列をトライ木に入れ、「(共有ページでの削減量) - (シート自体の1回分)」が
+    最大になる接頭辞を貪欲に選ぶ。各ページは選ばれたシートのうち最も長い接頭辞を使う。
+    返り値は [(ルールのリスト, 使うページのリスト)]
+    """
+    root = _Node()
+    nodes = []
+    for page, rules in page_rules.items():
+        node = root
+        for rule in rules:
+            child = node.children.get(rule)
+            if child is None:
+                child = _Node(node, rule)
+                node.children[rule] = child
+                nodes.append(child)
+            node = child
+            node.pages.append(page)
+    candidates = [n for n in nodes if len(n.pages) >= min_pages]
+
+    assigned = defaultdict(int)   # ページ → 現在使うシートのサイズ
+    chosen = []
+    for _ in range(max_sheets):
+        best, best_gain = None, min_saving
+        for node in candidates:
+            gain = sum(max(0, node.size - assigned[p]) for p in node.pages) - node.size
+            if gain > best_gain:
+                best, best_gain = node, gain
+        if best is None:
+            break
+        chosen.append(best)
+        for p in best.pages:
+            assigned[p] = max(assigned[p], best.size)
+    sheets = []
+    for node in chosen:
+        users = [p for p in node.pages if assigned[p] == node.size]
+        sheets.append((node.rules(), users))
+    return sheets
+
+
+def sheet_name(text):
+    return f"site.{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}.css"
+
+
+def collect_page_rules(files):
+    page_rules = {}
+    for path in files:
+        html = expand(path.read_text(encoding="utf-8"))
+        span = first_style(html)
+        if span:
+            page_rules[str(path.relative_to(ROOT))] = [r[2] for r in split_rules(html[span[0]:span[1]])]
+    return page_rules
+
+
+def cmd_plan(args):
+    import site_refresh
+
+    page_rules = collect_page_rules(site_refresh.discover())
+    sheets = choose_sheets(page_rules, args.max_sheets, args.min_pages)
+    if not sheets:
+        print(f"共有できる CSS が見つかりません（{len(page_rules)} ページ）")
+        return
+
+    manifest = {"sheets": []}
+    total = 0
+    print(f"{len(page_rules)} ページの <style> からシート {len(sheets)} 枚を選定")
+    for rules, users in sheets:
+        text = "\n".join(rules)
+        name = sheet_name(text)
+        size = len(text.encode("utf-8"))
+        saved = size * len(users)
+        total += saved - size
+        sections = defaultdict(int)
+        for p in users:
+            sections[p.split("/")[0] if "/" in p else "."] += 1
+        print(f"  /assets/{name}  {size / 1024:6.1f}KB × {len(users):3d} ページ"
+              f"（{', '.join(f'{k} {v}' for k, v in sorted(sections.items(), key=lambda kv: -kv[1]))}）")
+        manifest["sheets"].append({"file": name, "rules": len(rules), "bytes": size, "pages": len(users)})
+        if not args.dry_run:
+            ASSETS_DIR.mkdir(exist_ok=True)
+            (ASSETS_DIR / name).write_text(text + "\n", encoding="utf-8")
+    print(f"削減見込み: 全ページ合計 {total / 1024:.0f}KB（シート本体の初回ダウンロード分を差し引き）")
+    if args.dry_run:
+        return
+    MANIFEST_PATH.write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"{MANIFEST_PATH.relative_to(ROOT)} を更新しました。python3 site_refresh.py で全ページに適用されます")
+
+
+def cmd_report(args):
+    import site_refresh
+
+    rows = []
+    for path in site_refresh.discover():
+        html = path.read_text(encoding="utf-8")
+        name = referenced_sheet(html)
+        if name:
+            saved = len(expand(html).encode("utf-8")) - len(html.encode("utf-8"))
+            rows.append((str(path.relative_to(ROOT)), name, saved))
+    if not rows:
+        print("共通 CSS を参照しているページはありません")
+        return
+    for rel, name, saved in rows:
+        print(f"  {rel:60s} {name}  -{saved / 1024:5.1f}KB")
+    print(f"{len(rows)} ページ / 合計 -{sum(r[2] for r in rows) / 1024:.0f}KB")
+
+
+def prune_sheets(keep):
+    """manifest に無いシートファイルを消す（全ページを切り出し直した後に呼ぶ）"""
+    removed = []
+    for path in ASSETS_DIR.glob(SHEET_GLOB):
+        if path.name not in keep:
+            path.unlink()
+            removed.append(path.name)
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共通 CSS を /assets/site.<hash>.css に切り出す")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("plan", help="共通シートを選び直す")
+    p.add_argument("--max-sheets", type=int, default=MAX_SHEETS, help=f"シートの最大枚数（デフォルト: {MAX_SHEETS}）")
+    p.add_argument("--min-pages", type=int, default=MIN_PAGES, help=f"シートを共有する最小ページ数（デフォルト: {MIN_PAGES}）")
+    p.add_argument("--dry-run", action="store_true", help="書き出さずに削減見込みだけ表示")
+    sub.add_parser("report", help="ページごとの削減バイト数")
+    args = parser.parse_args()
+    {"plan": cmd_plan, "report": cmd_report}[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
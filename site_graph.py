@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+site_graph.py - 静的ページの後処理（site_refresh.py）のビルドグラフ
+
+出力ページごとに「前回処理したときの入力のハッシュ」を記録し、入力が変わったページだけを
+作り直す。記録先は .pipeline_cache/site_graph.json。
+
+ページ1枚の入力:
+  page       ページ自身のバイト列（generate_articles.py が書いた/手で直した内容。前回の出力と比較）
+  header     そのページ用に組み立てたヘッダー（unify_headers.build_header + HEADER_CSS/JS）
+  links      その記事の関連記事リンク（related_articles.links_for）
+  citations  citation_db.json のうち、そのページにマッチするエントリ（ID → エントリのハッシュ）
+  code       後処理のコード（site_refresh / add_citations / check_stats / shared_css / site_graph）と
+             共通 CSS シートの一覧。全ページ共通
+
+citation_db.json のエントリを1件直したときは、そのエントリに依存していたページと、
+新しいキーワードにマッチするページだけが対象になる。
+ページのハッシュは mtime・サイズが前回と同じなら計算し直さない（audio_manifest.py と同じ方式）。
+
+Usage:
+  python3 site_graph.py               # 記録済みページ数と、いま作り直しが必要なページを表示
+  python3 site_graph.py --clear       # 記録を消す（次回の site_refresh.py は全ページ処理）
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import related_articles
+import unify_headers
+
+ROOT = Path(__file__).parent
+GRAPH_PATH = ROOT / ".pipeline_cache" / "site_graph.json"
+GRAPH_VERSION = 1
+
+# ここに挙げたファイルが変わったら全ページを作り直す。
+# unify_headers / related_articles はページ単位の header / links ハッシュで追跡するので含めない
+# （ヘッダーのテンプレート _templates/partials/site_header.* の変更も描画結果のハッシュに出る）。
+# data/shared_css.json（共通 CSS シートの一覧）が変わったときも全ページで切り出し直す。
+CODE_FILES = ["site_refresh.py", "site_graph.py", "add_citations.py", "check_stats.py", "shared_css.py",
+              "data/shared_css.json"]
+
+
+def digest(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def code_hash():
+    return digest(b"".join((ROOT / name).read_bytes() for name in CODE_FILES if (ROOT / name).exists()))
+
+
+def header_hash(path):
+    """そのページに入るヘッダーのハッシュ（ヘッダー統一の対象外なら "-"）"""
+    if not unify_headers.is_target(path):
+        return "-"
+    header = unify_headers.build_header(unify_headers.detect_active_page(path))
+    return digest(header + unify_headers.HEADER_CSS + unify_headers.HEADER_JS)
+
+
+def links_hash(slug):
+    links = related_articles.links_for(slug) if slug else None
+    return digest(json.dumps(links, ensure_ascii=False)) if links else "-"
+
+
+def entry_hashes(entries):
+    """citation_db のエントリ ID → ハッシュ"""
+    return {e["id"]: digest(json.dumps(e, ensure_ascii=False, sort_keys=True)) for e in entries}
+
+
+def entry_matches(entry, text):
+    """エントリがページに関係するか（既にリンク済み、またはキーワードのどれかが出現）"""
+    if f'href="{entry["url"]}"' in text:
+        return True
+    for pattern in entry["keywords"]:
+        try:
+            if re.search(pattern, text):
+                return True
+        except re.error:
+            pass
+    return False
+
+
+def citation_deps(text, entries, hashes):
+    """ページが依存する citation エントリ（ID → ハッシュ）"""
+    return {e["id"]: hashes[e["id"]] for e in entries if entry_matches(e, text)}
+
+
+def page_record(path, data, slug, entries, hashes):
+    """処理後のページの記録を作る（path は書き込み後の stat を取るので実ファイル）"""
+    st = path.stat()
+    record = {
+        "bytes": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": digest(data),
+        "header": header_hash(path),
+        "links": links_hash(slug),
+    }
+    if entries is not None:
+        record["citations"] = citation_deps(data.decode("utf-8"), entries, hashes)
+    return record
+
+
+def stale_reasons(path, slug, record, changed_entries):
+    """作り直しが必要な理由のリスト（空なら前回の出力のままでよい）と、読み込んだ内容（未読なら None）
+
+    changed_entries: 前回から追加・変更・削除された citation エントリ（ID → 現在のエントリ or None）
+    """
+    if record is None:
+        return ["新規"], None
+    reasons = []
+    data = None
+    st = path.stat()
+    if (st.st_size, st.st_mtime_ns) != (record["bytes"], record["mtime_ns"]):
+        data = path.read_bytes()
+        if digest(data) != record["sha256"]:
+            reasons.append("ページ")
+    if header_hash(path) != record["header"]:
+        reasons.append("ヘッダー")
+    if links_hash(slug) != record["links"]:
+        reasons.append("内部リンク")
+    if changed_entries and "citations" in record:
+        deps = record["citations"]
+        hit = [eid for eid in changed_entries if eid in deps]
+        candidates = [e for eid, e in changed_entries.items() if e is not None and eid not in deps]
+        if candidates:
+            data = data if data is not None else path.read_bytes()
+            text = data.decode("utf-8")
+            hit += [e["id"] for e in candidates if entry_matches(e, text)]
+        reasons += [f"引用:{eid}" for eid in sorted(hit)]
+    return reasons, data
+
+
+def changed_entries(graph, entries, hashes):
+    """前回の記録から追加・変更・削除されたエントリ（ID → 現在のエントリ、削除なら None）"""
+    previous = graph.get("citations", {})
+    by_id = {e["id"]: e for e in entries}
+    changed = {eid: by_id[eid] for eid, h in hashes.items() if previous.get(eid) != h}
+    changed.update({eid: None for eid in previous if eid not in hashes})
+    return changed
+
+
+def load():
+    """記録を読む。形式やコードが変わっていれば空の記録を返す（= 全ページ作り直し）"""
+    try:
+        graph = json.loads(GRAPH_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        graph = {}
+    if graph.get("version") != GRAPH_VERSION or graph.get("code") != code_hash():
+        return {"version": GRAPH_VERSION, "code": code_hash(), "citations": {}, "pages": {}}
+    return graph
+
+
+def save(graph):
+    GRAPH_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = GRAPH_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(graph, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, GRAPH_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="site_refresh.py のビルドグラフの確認")
+    parser.add_argument("--clear", action="store_true", help="記録を消す（次回は全ページ処理）")
+    args = parser.parse_args()
+
+    if args.clear:
+        GRAPH_PATH.unlink(missing_ok=True)
+        print(f"{GRAPH_PATH.relative_to(ROOT)} を削除しました")
+        return
+
+    import add_citations
+    import site_refresh
+
+    graph = load()
+    entries = add_citations.load_citation_db()
+    changed = changed_entries(graph, entries, entry_hashes(entries))
+    stale = []
+    for path in site_refresh.discover():
+        rel = str(path.relative_to(ROOT))
+        reasons, _ = stale_reasons(path, site_refresh._article_slug(path), graph["pages"].get(rel), changed)
+        if reasons:
+            stale.append((rel, reasons))
+    print(f"記録済み {len(graph['pages'])} ページ / 作り直しが必要 {len(stale)} ページ")
+    if changed:
+        print(f"  変更された引用エントリ: {', '.join(sorted(changed))}")
+    for rel, reasons in stale:
+        print(f"  {rel}（{', '.join(reasons)}）")
+
+
+if __name__ == "__main__":
+    main()
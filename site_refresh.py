@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+site_refresh.py - 静的ページの後処理を1パスでまとめて実行する
+
+unify_headers.py / add_internal_links.py / add_citations.py / check_stats.py は
+それぞれ全ページを読み直して書き換えていたが、ここでは1ファイルにつき
+「1回読む → メモリ上でパスを順に適用 → バイト列が変わったときだけ1回書く」にまとめる。
+
+  header     unify_headers.rewrite_header        全 index.html（unify_headers の除外ルールに従う）
+  links      add_internal_links.add_links        記事（related_articles.links_for: ピン留め + 本文の類似度で選んだ記事）
+  citations  add_citations.apply_citations_to_html 記事（articles/*/index.html）
+  css        shared_css.extract                  <style> の先頭が共通シートと一致するページ（/assets/site.<hash>.css）
+  audit      check_stats.check_text / check_citation_text  記事。書き換え後の内容を検査するだけ
+
+各パスは (HTML 文字列, ページ情報) → HTML 文字列 の関数で、PASSES に並べた順に合成する。
+共通シートに切り出し済みのページは、最初にインライン CSS に戻してからパスを通す。
+ページ単位で独立しているのでプロセスプールで並列に処理する。
+
+全パスを実行するときは site_graph.py のビルドグラフを使い、入力（ページ本体・ヘッダー・
+関連記事リンク・マッチする citation エントリ・後処理のコード）が前回から
+変わったページだけを処理する。--full で全ページを処理し直す。
+
+Usage:
+  python3 site_refresh.py                          # 全パス・入力が変わったページだけ
+  python3 site_refresh.py --full                   # 全パス・全ページ
+  python3 site_refresh.py --dry-run                # 書き込まずに変更件数と監査結果だけ表示
+  python3 site_refresh.py --passes citations,audit articles/toeic-700-guide
+  python3 site_refresh.py --workers 1              # 並列化しない（デバッグ用）
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import add_citations
+import add_internal_links
+import build_search_index
+import build_sitemap
+import check_stats
+import related_articles
+import shared_css
+import site_graph
+import unify_headers
+
+ROOT = Path(__file__).parent
+ARTICLES_DIR = ROOT / "articles"
+
+_ctx = {}   # ワーカープロセスごとに1回だけ読み込むデータ（citation_db など）
+
+
+def _init_worker(passes, changed_entries=None):
+    _ctx["passes"] = passes
+    _ctx["changed_entries"] = changed_entries
+    if "citations" in passes:
+        _ctx["citation_entries"] = add_citations.load_citation_db()
+        _ctx["citation_hashes"] = site_graph.entry_hashes(_ctx["citation_entries"])
+    _ctx["css_sheets"] = shared_css.load_sheets()
+    if "audit" in passes:
+        _ctx["citation_keywords"] = check_stats.load_citation_keywords()
+
+
+def _article_slug(path):
+    """articles/{slug}/index.html なら slug、それ以外（記事一覧など）は None"""
+    rel = path.relative_to(ROOT)
+    if len(rel.parts) == 3 and rel.parts[0] == "articles" and rel.parts[2] == "index.html":
+        return rel.parts[1]
+    return None
+
+
+# ── パス ─────────────────────────────────────
+def header_pass(html, page):
+    if not unify_headers.is_target(page["path"]):
+        return html
+    new_html = unify_headers.rewrite_header(html, page["path"])
+    return html if new_html is None else new_html
+
+
+def links_pass(html, page):
+    links = related_articles.links_for(page["slug"]) if page["slug"] else None
+    if not links:
+        return html
+    new_html, added = add_internal_links.add_links(html, links)
+    if added is None:
+        new_html, added = add_internal_links.insert_section(html, links)
+    if added:
+        page["notes"].append(f"内部リンク {added}件追加")
+    return new_html
+
+
+def citations_pass(html, page):
+    if not page["slug"]:
+        return html
+    new_html, changes = add_citations.apply_citations_to_html(html, _ctx["citation_entries"])
+    page["notes"].extend(c.strip() for c in changes)
+    return new_html
+
+
+def css_pass(html, page):
+    new_html, sheet, saved = shared_css.extract(html, _ctx["css_sheets"])
+    if sheet and not page["inlined"]:
+        page["css_saved"] = saved
+        page["notes"].append(f"CSS -{saved / 1024:.1f}KB（/assets/{sheet} を参照）")
+    return new_html
+
+
+def audit_pass(html, page):
+    if page["slug"]:
+        page["audit"] = check_stats.check_text(html)
+        page["unlinked"] = check_stats.check_citation_text(html, _ctx["citation_keywords"])
+    return html
+
+
+PASSES = {
+    "header": header_pass,
+    "links": links_pass,
+    "citations": citations_pass,
+    "css": css_pass,
+    "audit": audit_pass,
+}
+
+
+def refresh_page(path, dry_run=False, track=False, incremental=False, record=None):
+    """1ページにパスを順に適用し、変わっていれば書き込む。結果は dict で返す（プロセス間で受け渡す）
+
+    track なら処理後の入力ハッシュを page["record"] に入れて返す（ビルドグラフ用）。
+    incremental なら record（前回の記録）と入力を比べ、変わっていなければ処理しない。
+    """
+    path = Path(path)
+    slug = _article_slug(path)
+    page = {"path": path, "slug": slug, "notes": [], "audit": [], "unlinked": [], "changed": [],
+            "reasons": [], "skipped": False, "written": False, "record": None, "css_saved": 0}
+    original = None
+    if incremental:
+        page["reasons"], original = site_graph.stale_reasons(path, slug, record, _ctx["changed_entries"])
+        if not page["reasons"]:
+            page["skipped"] = True
+            if original is not None:   # 触られただけで内容は同じ → mtime だけ記録し直す
+                st = path.stat()
+                page["record"] = {**record, "bytes": st.st_size, "mtime_ns": st.st_mtime_ns}
+            page["path"] = str(path.relative_to(ROOT))
+            return page
+
+    if original is None:
+        original = path.read_bytes()
+    html = original.decode("utf-8")
+    expanded = shared_css.expand(html)
+    page["inlined"] = expanded != html
+    html = expanded
+    for name in _ctx["passes"]:
+        before = html
+        html = PASSES[name](html, page)
+        if html != before:
+            page["changed"].append(name)
+    if page["inlined"] and "css" not in _ctx["passes"]:
+        html = css_pass(html, page)   # 元どおりシート参照に戻す
+    data = html.encode("utf-8")
+    if data == original:
+        page["changed"] = []   # インライン CSS に戻して切り出し直しただけ
+    page["written"] = data != original and not dry_run
+    if page["written"]:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    if track and not dry_run:
+        page["record"] = site_graph.page_record(path, data, slug, _ctx["citation_entries"], _ctx["citation_hashes"])
+    page["path"] = str(path.relative_to(ROOT))
+    return page
+
+
+def discover(targets=None):
+    """対象の index.html を列挙する（隠しディレクトリと orbit などの除外ディレクトリは見ない）"""
+    if targets:
+        files = []
+        for t in targets:
+            t = Path(t).resolve()
+            files.extend(sorted(t.rglob("index.html")) if t.is_dir() else [t])
+        return files
+    return [p for p in sorted(ROOT.rglob("index.html"))
+            if not any(d in unify_headers.EXCLUDE_DIRS or d.startswith(".")
+                       for d in p.relative_to(ROOT).parts[:-1])]
+
+
+def report(pages, passes, dry_run, wall):
+    skipped = [p for p in pages if p["skipped"]]
+    pages = [p for p in pages if not p["skipped"]]
+    changed = [p for p in pages if p["changed"]]
+    by_pass = {name: sum(1 for p in pages if name in p["changed"]) for name in passes if name != "audit"}
+    verb = "書き込み予定" if dry_run else "書き込み"
+    print(f"{len(pages)} ページを処理 / {verb} {len(changed)} ページ（{wall:.1f}s）")
+    if skipped:
+        print(f"  入力に変更なし {len(skipped)} ページはスキップ（--full で全ページ）")
+    rebuilt = [p for p in pages if p["reasons"]]
+    if skipped and rebuilt:
+        print("  処理した理由:")
+        for p in rebuilt:
+            print(f"    {p['path']}（{', '.join(p['reasons'])}）")
+    for name, n in by_pass.items():
+        print(f"  {name:10s} {n:4d} ページを変更")
+    for p in changed:
+        print(f"  📄 {p['path']}（{', '.join(p['changed'])}）")
+        for note in p["notes"]:
+            print(f"     {note}")
+    css_saved = [p["css_saved"] for p in pages if p["css_saved"]]
+    if css_saved:
+        print(f"  共通 CSS に切り出し: {len(css_saved)} ページ / 合計 -{sum(css_saved) / 1024:.0f}KB")
+
+    if "audit" not in passes:
+        return
+    flagged = [p for p in pages if p["audit"]]
+    unlinked = [p for p in pages if p["unlinked"]]
+    print(f"\n統計監査: {len(flagged)} 記事で {sum(len(p['audit']) for p in flagged)} 件の要確認箇所"
+          f" / 引用リンク未付与 {sum(len(p['unlinked']) for p in unlinked)} 件")
+    for p in flagged:
+        print(f"  📄 {p['path']}")
+        for lineno, label, snippet in p["audit"]:
+            print(f"    L{lineno:4d} [{label}] {snippet}")
+    for p in unlinked:
+        for label, snippet in p["unlinked"]:
+            print(f"  🔗 {p['path']} [{label}] 「{snippet}」")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="静的ページの後処理（ヘッダー・内部リンク・引用・統計監査）を1パスで実行")
+    parser.add_argument("targets", nargs="*", help="対象のディレクトリまたは HTML（省略時はサイト全体）")
+    parser.add_argument("--passes", default=",".join(PASSES),
+                        help=f"実行するパス（カンマ区切り。デフォルト: {','.join(PASSES)}）")
+    parser.add_argument("--dry-run", action="store_true", help="書き込まずに結果だけ表示")
+    parser.add_argument("--full", action="store_true", help="ビルドグラフを使わず全ページを処理")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="並列プロセス数")
+    args = parser.parse_args()
+
+    passes = [p.strip() for p in args.passes.split(",") if p.strip()]
+    unknown = [p for p in passes if p not in PASSES]
+    if unknown:
+        parser.error(f"不明なパス: {', '.join(unknown)}")
+    passes.sort(key=list(PASSES).index)   # 適用順は常に header → links → citations → audit
+
+    # 記事が増えた・消えたときは関連記事を計算し直す（links パスとビルドグラフの両方が使う）
+    if "links" in passes and not args.dry_run and related_articles.ensure_current():
+        print(f"記事の追加・削除があったため {related_articles.RELATED_JSON.relative_to(ROOT)} を更新しました")
+
+    files = discover(args.targets)
+    started = time.monotonic()
+
+    # ビルドグラフは全パスを通したときの結果だけを記録する（一部のパスだけでは入力と出力が対応しない）
+    graph = None
+    changed = None
+    if passes == list(PASSES):
+        graph = site_graph.load()
+        entries = add_citations.load_citation_db()
+        hashes = site_graph.entry_hashes(entries)
+        changed = site_graph.changed_entries(graph, entries, hashes)
+    track = graph is not None   # --full のときも記録は取る（次回から差分で処理できるように）
+    incremental = track and not args.full
+    previous = graph["pages"] if track else {}
+    records = [previous.get(str(f.relative_to(ROOT))) for f in files]
+
+    n = len(files)
+    if args.workers <= 1:
+        _init_worker(passes, changed)
+        pages = [refresh_page(f, args.dry_run, track, incremental, r) for f, r in zip(files, records)]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(passes, changed)) as pool:
+            pages = list(pool.map(refresh_page, files, [args.dry_run] * n, [track] * n, [incremental] * n,
+                                  records, chunksize=max(1, n // (args.workers * 4))))
+    report(pages, passes, args.dry_run, time.monotonic() - started)
+
+    if "css" in passes and not args.dry_run and not args.targets and not any(p["skipped"] for p in pages):
+        # 全ページを切り出し直した後なら、manifest に無い古いシートはもう参照されていない
+        keep = {name for name, _ in shared_css.load_sheets()}
+        for name in shared_css.prune_sheets(keep):
+            print(f"  🗑 assets/{name}（どのページからも参照されなくなったシート）")
+
+    if track and not args.dry_run:
+        current = {p["path"]: p["record"] or previous[p["path"]] for p in pages if p["record"] or p["skipped"]}
+        # サイト全体を見たときは消えたページの記録を残さない
+        if args.targets:
+            # 対象外のページには citation の変更がまだ反映されていないので、エントリの記録は進めない
+            graph["pages"] = {**previous, **current}
+        else:
+            graph["pages"] = current
+            graph["citations"] = hashes
+        site_graph.save(graph)
+    # 書き換えたページの lastmod を sitemap に反映する（本文が変わったページだけ日付が進む）
+    if not args.dry_run and not args.targets and any(p["written"] for p in pages):
+        result = build_sitemap.build()
+        if result["written"]:
+            print(f"sitemap 更新: {', '.join(result['written'])}")
+        # 検索インデックスも変わったページだけ読み直す（語が変わらなければ何も書かない）
+        result = build_search_index.build()
+        if result["written"] or result["removed"]:
+            print(f"検索インデックス更新: 書き込み {len(result['written'])} / 削除 {len(result['removed'])}")
+    if not files:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
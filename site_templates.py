@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+site_templates.py - ページ生成用の小さなテンプレートエンジンと共通パーツ
+
+ヘッダー・フッター・クイズ導線は generate_articles.build_html / convert_real_phrases に
+f-string でそれぞれ書かれ、さらに unify_headers が正規表現で後から差し替えていた。
+ここでは _templates/ 以下のテンプレートを1回だけコンパイルし、生成スクリプトは
+最終的なマークアップを直接書き出す（後からの置換は要らない）。
+
+  テンプレート  _templates/<名前>.html。共通パーツは _templates/partials/ に置く。
+               _ で始まるディレクトリなので GitHub Pages（Jekyll）では公開されない。
+               ファイル末尾の改行1つはテンプレートに含めない
+  記法（Mustache のサブセット）
+    {{name}} / {{a.b}}     値を HTML エスケープして埋め込む（文脈を内側から外側へ探す）
+    {{{name}}}             エスケープせずに埋め込む（組み立て済みの HTML・CSS）
+    {{#name}}…{{/name}}    リストなら要素ごとに繰り返す（要素の dict が内側の文脈になる）。
+                           真なら1回、偽・空なら出さない
+    {{^name}}…{{/name}}    偽・空のときだけ出す
+    {{> partials/name}}    別テンプレートをその場に展開する（コンパイル時に展開済み）
+    {{! コメント }}
+    セクション・コメントのタグだけの行は、行ごと（インデントと改行も）出力しない
+  統計         bank_stats() は各問題バンク（questions.js）の問題数。クイズ導線の「N問」はここから入れる
+
+Usage:
+  python3 site_templates.py                         # テンプレートをすべてコンパイルして問題数を表示
+  python3 site_templates.py partials/quiz_promo     # 1つ描画して表示（問題数だけを文脈に入れる）
+"""
+
+import argparse
+import html
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+TEMPLATES_DIR = ROOT / "_templates"
+
+# 問題バンク → 1問に1回だけ出てくるフィールド（add_questions.get_existing_count と同じ数え方）
+BANK_COUNT_FIELDS = {
+    "listening": "audio",
+    "grammar": "stem",
+    "reading": "question",
+    "words": "word",
+}
+
+_TAG_RE = re.compile(r"\{\{\{\s*(.+?)\s*\}\}\}|\{\{\s*([#^/>!]?)\s*(.*?)\s*\}\}", re.DOTALL)
+_STANDALONE = {"#", "^", "/", "!"}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+# ── コンパイル ─────────────────────────────
+def _tokens(source, name):
+    """[(種別, 値)]。種別は text / var / raw / # / ^ / / / >。タグだけの行の空白はここで落とす"""
+    tokens = []
+    pos = 0
+    for m in _TAG_RE.finditer(source):
+        kind = "raw" if m.group(1) is not None else (m.group(2) or "var")
+        value = m.group(1) if m.group(1) is not None else m.group(3)
+        text = source[pos:m.start()]
+        end = m.end()
+        if kind in _STANDALONE:
+            line_start = text.rfind("\n") + 1
+            line_end = source.find("\n", end)
+            line_end = len(source) if line_end < 0 else line_end + 1
+            if not text[line_start:].strip(" \t") and not source[end:line_end].strip(" \t\r\n"):
+                text = text[:line_start]
+                end = line_end
+        if text:
+            tokens.append(("text", text))
+        if kind != "!":
+            if not value:
+                raise TemplateError(f"{name}: 空のタグ {m.group(0)!r}")
+            tokens.append((kind, value))
+        pos = end
+    if pos < len(source):
+        tokens.append(("text", source[pos:]))
+    return tokens
+
+
+def _parse(tokens, name, stack):
+    """トークン列 → ノードの木。パーシャルはここで展開する"""
+    root = []
+    open_sections = [(None, root)]
+    for kind, value in tokens:
+        nodes = open_sections[-1][1]
+        if kind == "text":
+            if nodes and isinstance(nodes[-1], str):
+                nodes[-1] += value
+            else:
+                nodes.append(value)
+        elif kind in ("var", "raw"):
+            nodes.append((kind, value.split(".")))
+        elif kind in ("#", "^"):
+            children = []
+            nodes.append((kind, value.split("."), children))
+            open_sections.append((value, children))
+        elif kind == "/":
+            if open_sections[-1][0] != value:
+                raise TemplateError(f"{name}: {{{{/{value}}}}} に対応する開始タグがありません")
+            open_sections.pop()
+        elif kind == ">":
+            if value in stack:
+                raise TemplateError(f"{name}: パーシャルが循環しています: {' → '.join(stack + (value,))}")
+            nodes.extend(_compile_file(value, stack + (value,)))
+    if len(open_sections) > 1:
+        raise TemplateError(f"{name}: {{{{#{open_sections[-1][0]}}}}} が閉じていません")
+    return root
+
+
+def _read(name):
+    path = TEMPLATES_DIR / f"{name}.html"
+    if not path.exists():
+        path = TEMPLATES_DIR / name
+    try:
+        source = path.read_text(encoding="utf-8")
+    except OSError as e:
+        raise TemplateError(f"テンプレートがありません: {name}") from e
+    return source[:-1] if source.endswith("\n") else source
+
+
+def _compile_file(name, stack):
+    return _parse(_tokens(_read(name), name), name, stack)
+
+
+def compile_template(source, name="<string>"):
+    return Template(_parse(_tokens(source, name), name, ()))
+
+
+@lru_cache(maxsize=None)
+def get(name):
+    """コンパイル済みテンプレート（プロセス内で1回だけコンパイルする）"""
+    return Template(_compile_file(name, (name,)))
+
+
+def source(name):
+    """テンプレートファイルの中身をそのまま返す（CSS・JS のパーツ用）"""
+    return _read(name)
+
+
+# ── 描画 ───────────────────────────────────
+def _lookup(stack, path):
+    for scope in reversed(stack):
+        if isinstance(scope, dict) and path[0] in scope:
+            value = scope[path[0]]
+            for key in path[1:]:
+                value = value.get(key) if isinstance(value, dict) else getattr(value, key, None)
+            return value
+    if path == ["."]:
+        return stack[-1]
+    return None
+
+
+def _render(nodes, stack, out):
+    for node in nodes:
+        if isinstance(node, str):
+            out.append(node)
+            continue
+        kind, path = node[0], node[1]
+        value = _lookup(stack, path)
+        if kind == "var":
+            if value is not None:
+                out.append(html.escape(str(value), quote=True))
+        elif kind == "raw":
+            if value is not None:
+                out.append(str(value))
+        elif kind == "#":
+            if isinstance(value, (list, tuple)):
+                for item in value:
+                    stack.append(item)
+                    _render(node[2], stack, out)
+                    stack.pop()
+            elif value:
+                stack.append(value)
+                _render(node[2], stack, out)
+                stack.pop()
+        elif kind == "^":
+            if not value:
+                _render(node[2], stack, out)
+
+
+class Template:
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def render(self, context=None, **kwargs):
+        out = []
+        _render(self.nodes, [{**(context or {}), **kwargs}], out)
+        return "".join(out)
+
+
+def render(name, context=None, **kwargs):
+    return get(name).render(context, **kwargs)
+
+
+# ── 問題バンクの統計 ───────────────────────
+@lru_cache(maxsize=None)
+def _count(path, field, mtime_ns, size):
+    text = path.read_text(encoding="utf-8")
+    return len(re.findall(rf"\b{field}:", text))
+
+
+def bank_stats(root=ROOT):
+    """{バンク: "1,496"}（3桁区切りの問題数）。questions.js が無いバンクは含めない"""
+    stats = {}
+    for bank, field in BANK_COUNT_FIELDS.items():
+        path = root / bank / "questions.js"
+        if path.exists():
+            st = path.stat()
+            stats[bank] = f"{_count(path, field, st.st_mtime_ns, st.st_size):,}"
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="テンプレートのコンパイル確認と問題数の表示")
+    parser.add_argument("name", nargs="?", help="描画して表示するテンプレート（_templates/ からの相対名）")
+    args = parser.parse_args()
+
+    stats = bank_stats()
+    if args.name:
+        print(render(args.name, stats=stats))
+        return
+    errors = 0
+    for path in sorted(TEMPLATES_DIR.rglob("*.html")):
+        name = path.relative_to(TEMPLATES_DIR).with_suffix("").as_posix()
+        try:
+            get(name)
+            print(f"  ✅ {name}")
+        except TemplateError as e:
+            print(f"  ❌ {e}")
+            errors += 1
+    print("問題数: " + " / ".join(f"{bank} {n}問" for bank, n in stats.items()))
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
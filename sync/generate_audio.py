@@ -11,7 +11,12 @@ import json
 import os
 import re
 import sys
-import edge_tts
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tts_engine import summarize, synthesize_async
+
+import timings
 
 VOICE = "en-US-JennyNeural"
 AUDIO_DIR = os.path.join(os.path.dirname(__file__), "audio")
@@ -90,85 +95,10 @@ PASSAGES = {
 }
 
 
-def estimate_word_timings(text: str, sentences: list[dict]) -> list[dict]:
-    """
-    SentenceBoundaryの時間情報と文字数比率から単語ごとのタイミングを推定する。
-
-    Returns: [{"word": str, "start": float, "end": float}, ...]
-    """
-    # 全テキストをトークン分割（単語 + 区切り文字）
-    all_words = re.findall(r'\S+', text)
-    word_index = 0
-    result = []
-
-    for sent in sentences:
-        sent_text = sent["text"]
-        sent_start = sent["start"]
-        sent_dur = sent["duration"]
-
-        # この文に含まれる単語を抽出
-        sent_words = re.findall(r'\S+', sent_text)
-        if not sent_words:
-            continue
-
-        # 文字数（句読点除く）ベースで各単語の比率を計算
-        clean_lens = [len(re.sub(r'[^\w]', '', w)) or 1 for w in sent_words]
-        total_chars = sum(clean_lens)
-
-        # 先頭に小さなポーズを入れる（50ms）
-        current = sent_start + 0.05
-        remaining_dur = sent_dur - 0.05
-
-        for i, (w, cl) in enumerate(zip(sent_words, clean_lens)):
-            ratio = cl / total_chars
-            duration = remaining_dur * ratio
-            # 最後の単語は文の終端まで
-            if i == len(sent_words) - 1:
-                end_time = sent_start + sent_dur
-            else:
-                end_time = round(current + duration, 3)
-            result.append({
-                "word": w,
-                "start": round(current, 3),
-                "end": end_time
-            })
-            current = end_time
-
-    return result
-
-
-async def generate_passage(level: int, index: int, passage: dict) -> None:
-    key = f"lv{level}_{index}"
-    mp3_path = os.path.join(AUDIO_DIR, f"{key}.mp3")
-    json_path = os.path.join(AUDIO_DIR, f"{key}.json")
-
-    print(f"  生成中: {key} — {passage['title']}", flush=True)
-
-    communicate = edge_tts.Communicate(passage["text"], VOICE)
-    sentences = []
-    audio_chunks = []
-
-    async for chunk in communicate.stream():
-        if chunk["type"] == "audio":
-            audio_chunks.append(chunk["data"])
-        elif chunk["type"] == "SentenceBoundary":
-            sentences.append({
-                "text": chunk["text"],
-                "start": round(chunk["offset"] / 10_000_000, 3),
-                "duration": round(chunk["duration"] / 10_000_000, 3)
-            })
-
-    # MP3保存
-    with open(mp3_path, "wb") as f:
-        for chunk in audio_chunks:
-            f.write(chunk)
-
-    # タイミングJSON保存
-    timings = estimate_word_timings(passage["text"], sentences)
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(timings, f, ensure_ascii=False, indent=2)
-
-    print(f"  ✓ {key}: {len(timings)}語 / {sentences[-1]['start'] + sentences[-1]['duration']:.1f}秒", flush=True)
+def write_timings(key: str, text: str, boundaries: list[dict]) -> None:
+    n = timings.write_timings(os.path.join(AUDIO_DIR, f"{key}.json"), text, boundaries, VOICE)
+    end = max((b["offset"] + b["duration"] for b in boundaries), default=0) / 10_000_000
+    print(f"  ✓ {key}: {n}語 / {end:.1f}秒", flush=True)
 
 
 async def main():
@@ -177,13 +107,27 @@ async def main():
     # フィルター（引数で特定キーのみ再生成可能）
     target = sys.argv[1] if len(sys.argv) > 1 else None
 
+    jobs = []
     for level, passages in PASSAGES.items():
-        print(f"\n── Level {level} ──")
         for i, passage in enumerate(passages):
             key = f"lv{level}_{i}"
             if target and key != target:
                 continue
-            await generate_passage(level, i, passage)
+            jobs.append({
+                "text": passage["text"],
+                "path": Path(AUDIO_DIR) / f"{key}.mp3",
+                "voice": VOICE,
+                "boundary": "WordBoundary",
+                "label": f"{key} — {passage['title']}",
+                "key": key,
+            })
+
+    print(f"生成中: {len(jobs)} パッセージ")
+    results = await synthesize_async(jobs, skip_existing=False)
+    for r in results:
+        if r["ok"]:
+            write_timings(r["job"]["key"], r["job"]["text"], r["boundaries"])
+    _, _, failed = summarize(results)
 
     # passages.json を書き出し（フロントエンド用メタデータ）
     meta = {}
@@ -195,6 +139,9 @@ async def main():
     with open(PASSAGES_FILE, "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
+    if failed:
+        print(f"\nERROR: {len(failed)} パッセージの生成に失敗", file=sys.stderr)
+        sys.exit(1)
     print("\n✅ 全パッセージ生成完了")
 
 
@@ -2,9 +2,13 @@
 ReadUpパッセージからSyncReader用音声・タイミングデータを一括生成
 
 Usage:
-  python3 generate_audio_readup.py          # 全200本生成
-  python3 generate_audio_readup.py lv1      # Level 1のみ
-  python3 generate_audio_readup.py --skip   # 既存ファイルをスキップ
+  python3 generate_audio_readup.py                   # 本文・音声が変わったパッセージだけ生成
+  python3 generate_audio_readup.py lv1               # Level 1のみ
+  python3 generate_audio_readup.py --force           # 全パッセージを作り直す
+  python3 generate_audio_readup.py --concurrency 16  # 同時合成数（デフォルト: TTS_CONCURRENCY or 8）
+
+タイミング JSON の "h"（本文と音声のハッシュ）が一致し MP3 もあるパッセージはスキップする。
+（--skip は旧オプション。現在は常にハッシュでスキップ判定する）
 """
 
 import asyncio
@@ -12,7 +16,13 @@ import json
 import os
 import re
 import sys
-import edge_tts
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from tts_engine import summarize, synthesize_async
+
+import timings
 
 VOICE = "en-US-JennyNeural"
 AUDIO_DIR = os.path.join(os.path.dirname(__file__), "audio")
@@ -47,72 +57,50 @@ def extract_readup_passages(js_path: str) -> dict:
     return levels
 
 
-def estimate_word_timings(text: str, sentences: list) -> list:
-    """SentenceBoundary情報 + 文字数比率で単語タイミングを推定"""
-    result = []
-
-    for sent in sentences:
-        sent_words = re.findall(r'\S+', sent["text"])
-        if not sent_words:
-            continue
-
-        clean_lens = [len(re.sub(r'[^\w]', '', w)) or 1 for w in sent_words]
-        total_chars = sum(clean_lens)
-        current = sent["start"] + 0.05
-        remaining_dur = sent["duration"] - 0.05
-
-        for i, (w, cl) in enumerate(zip(sent_words, clean_lens)):
-            ratio = cl / total_chars
-            if i == len(sent_words) - 1:
-                end_time = sent["start"] + sent["duration"]
-            else:
-                end_time = round(current + remaining_dur * ratio, 3)
-            result.append({"word": w, "start": round(current, 3), "end": end_time})
-            current = end_time
-
-    return result
+def passage_job(pid: str, text: str) -> dict:
+    """1パッセージ分の tts_engine ジョブ（単語境界イベントを収集）"""
+    return {
+        "text": text,
+        "path": Path(AUDIO_DIR) / f"{pid}.mp3",
+        "voice": VOICE,
+        "boundary": "WordBoundary",
+        "label": f"{pid} ({len(text.split())}語)",
+        "pid": pid,
+    }
 
 
-async def generate_passage_audio(pid: str, text: str, skip_existing: bool = False) -> bool:
-    mp3_path = os.path.join(AUDIO_DIR, f"{pid}.mp3")
-    json_path = os.path.join(AUDIO_DIR, f"{pid}.json")
+def is_up_to_date(pid: str, text: str) -> bool:
+    """MP3 があり、タイミング JSON の "h" が現在の (本文, 音声) と一致すれば True"""
+    if not os.path.exists(os.path.join(AUDIO_DIR, f"{pid}.mp3")):
+        return False
+    stored = timings.stored_hash(os.path.join(AUDIO_DIR, f"{pid}.json"))
+    return stored == timings.source_hash(text, VOICE)
 
-    if skip_existing and os.path.exists(mp3_path) and os.path.exists(json_path):
-        return False  # スキップ
 
-    communicate = edge_tts.Communicate(text, VOICE)
-    sentences = []
-    audio_chunks = []
-
-    async for chunk in communicate.stream():
-        if chunk["type"] == "audio":
-            audio_chunks.append(chunk["data"])
-        elif chunk["type"] == "SentenceBoundary":
-            sentences.append({
-                "text": chunk["text"],
-                "start": round(chunk["offset"] / 10_000_000, 3),
-                "duration": round(chunk["duration"] / 10_000_000, 3)
-            })
-
-    with open(mp3_path, "wb") as f:
-        for chunk in audio_chunks:
-            f.write(chunk)
-
-    timings = estimate_word_timings(text, sentences)
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(timings, f, ensure_ascii=False)
-
-    return True
+def report_latency(results: list, wall: float) -> None:
+    """パッセージごとの合成レイテンシ（キャッシュヒットを除く）の分布と遅いものを表示"""
+    synthesized = sorted((r for r in results if r["ok"] and not r["cached"]), key=lambda r: r["elapsed"])
+    if not synthesized:
+        return
+    lat = [r["elapsed"] for r in synthesized]
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))]
+    print(f"\n合成レイテンシ: {len(lat)}本 / p50 {pct(0.5):.1f}s / p95 {pct(0.95):.1f}s / "
+          f"最大 {lat[-1]:.1f}s / 合計 {sum(lat):.0f}s → 実時間 {wall:.0f}s")
+    for r in reversed(synthesized[-5:]):
+        print(f"  {r['elapsed']:5.1f}s  {r['job']['label']}（試行 {r['attempts']}回）")
 
 
 async def main():
     os.makedirs(AUDIO_DIR, exist_ok=True)
 
     target_lv = None
-    skip_existing = "--skip" in sys.argv
-    for arg in sys.argv[1:]:
+    force = "--force" in sys.argv
+    concurrency = None
+    for i, arg in enumerate(sys.argv[1:], 1):
         if arg.startswith("lv"):
             target_lv = arg
+        elif arg == "--concurrency" and i + 1 < len(sys.argv):
+            concurrency = int(sys.argv[i + 1])
 
     print(f"ReadUpパッセージ抽出中...")
     levels = extract_readup_passages(READUP_JS)
@@ -130,27 +118,33 @@ async def main():
     with open(PASSAGES_JSON, "w", encoding="utf-8") as f:
         json.dump(meta, f, ensure_ascii=False, indent=2)
 
-    total_generated = 0
+    jobs = []
     total_skipped = 0
-
     for lv, items in levels.items():
         if target_lv and lv != target_lv:
             continue
-
-        print(f"\n── {lv} ({len(items)}本) ──")
-        for i, item in enumerate(items):
+        print(f"── {lv} ({len(items)}本) ──")
+        for item in items:
             pid = item["pid"]
-            text = item["passage"]
-            words = len(text.split())
-            generated = await generate_passage_audio(pid, text, skip_existing)
-            if generated:
-                print(f"  [{i+1:3d}/{len(items)}] ✓ {pid} ({words}語)", flush=True)
-                total_generated += 1
-            else:
-                print(f"  [{i+1:3d}/{len(items)}] - {pid} (スキップ)", flush=True)
+            if not force and is_up_to_date(pid, item["passage"]):
                 total_skipped += 1
-
-    print(f"\n✅ 完了: 生成 {total_generated}本 / スキップ {total_skipped}本")
+                continue
+            jobs.append(passage_job(pid, item["passage"]))
+
+    print(f"\n生成対象: {len(jobs)}本（変更なし {total_skipped}本）")
+    start = time.monotonic()
+    # ハッシュで判定済みなので MP3 の有無ではスキップしない（タイミング JSON も作り直す）
+    results = await synthesize_async(jobs, concurrency=concurrency, skip_existing=False, refresh_cache=force)
+    for r in results:
+        if r["ok"]:
+            json_path = os.path.join(AUDIO_DIR, f"{r['job']['pid']}.json")
+            timings.write_timings(json_path, r["job"]["text"], r["boundaries"], VOICE)
+    total_generated, _, failed = summarize(results)
+
+    report_latency(results, time.monotonic() - start)
+    print(f"\n✅ 完了: 生成 {total_generated}本 / スキップ {total_skipped}本 / 失敗 {len(failed)}本")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
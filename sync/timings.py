@@ -0,0 +1,133 @@
+"""
+SyncReader 単語タイミングの生成・保存（generate_audio.py / generate_audio_readup.py 共通）
+
+edge-tts の WordBoundary（100ns 単位）を本文の空白区切りトークンに対応付け、
+ブラウザ向けのコンパクトな列形式で保存する:
+
+  {"v": 2, "s": [開始msの差分...], "d": [長さms...]}
+
+  s[0] は先頭トークンの開始ms、s[i] は直前トークンの開始からの差分。
+  単語そのものは本文（index.html の passage テキスト）から復元できるので持たない。
+  生成元の (本文, 音声) のハッシュを "h" に持たせ、変更のないパッセージの再生成を省く。
+
+Usage:
+  python3 timings.py            # 旧形式（[{"word","start","end"}]）の JSON を新形式に変換
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+FORMAT_VERSION = 2
+AUDIO_DIR = os.path.join(os.path.dirname(__file__), "audio")
+
+
+def source_hash(text: str, voice: str) -> str:
+    """タイミング JSON の "h"（本文か音声が変わったら再生成する）"""
+    return hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).hexdigest()[:16]
+
+
+def stored_hash(json_path: str) -> str | None:
+    """既存タイミング JSON の "h"（無い・壊れている・旧形式なら None）"""
+    try:
+        with open(json_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data.get("h") if isinstance(data, dict) else None
+
+
+def _norm(word: str) -> str:
+    return re.sub(r"[^\w]", "", word).lower()
+
+
+def align_word_timings(text: str, boundaries: list[dict]) -> list[tuple[int, int]]:
+    """WordBoundary を本文の \\S+ トークンに対応付け、トークンごとの (開始ms, 終了ms) を返す
+
+    TTS は句読点を落とし、ハイフン語などを複数イベントに分けることがあるので、
+    正規化した文字列を連結しながらトークンと突き合わせる。読み替え（数字など）で
+    一致しない場合は次のトークンと一致するイベントまで読み飛ばして同期し直す。
+    """
+    tokens = re.findall(r"\S+", text)
+    words = [
+        (_norm(b["text"]), b["offset"] // 10_000, (b["offset"] + b["duration"]) // 10_000)
+        for b in boundaries if b["type"] == "WordBoundary" and _norm(b["text"])
+    ]
+    result = []
+    j = 0
+    for i, token in enumerate(tokens):
+        target = _norm(token)
+        last_end = result[-1][1] if result else 0
+        if not target or j >= len(words):
+            result.append((last_end, last_end))
+            continue
+        acc, start, end = words[j]
+        j += 1
+        while acc != target and j < len(words) and target.startswith(acc + words[j][0]):
+            acc += words[j][0]
+            end = words[j][2]
+            j += 1
+        if acc != target and i + 1 < len(tokens):
+            following = _norm(tokens[i + 1])
+            for k in range(4):
+                if j + k < len(words) and words[j + k][0] == following:
+                    if k:
+                        end = words[j + k - 1][2]
+                    j += k
+                    break
+        result.append((max(start, last_end), end))
+    return result
+
+
+def encode_timings(spans: list[tuple[int, int]], source: str | None = None) -> dict:
+    """(開始ms, 終了ms) のリストを差分エンコードした列形式にする"""
+    starts, durations = [], []
+    prev = 0
+    for start, end in spans:
+        starts.append(start - prev)
+        durations.append(max(0, end - start))
+        prev = start
+    data = {"v": FORMAT_VERSION, "s": starts, "d": durations}
+    if source:
+        data["h"] = source
+    return data
+
+
+def write_timings(json_path: str, text: str, boundaries: list[dict], voice: str | None = None) -> int:
+    """タイミング JSON を書き出し、トークン数を返す（voice 指定時は "h" も記録）"""
+    spans = align_word_timings(text, boundaries)
+    source = source_hash(text, voice) if voice else None
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(encode_timings(spans, source), f, separators=(",", ":"))
+    return len(spans)
+
+
+def convert_legacy(json_path: str) -> bool:
+    """旧形式 [{"word","start","end"}]（秒）を新形式に書き換える。変換したら True"""
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, list):
+        return False
+    spans = [(round(t["start"] * 1000), round(t["end"] * 1000)) for t in data]
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(encode_timings(spans), f, separators=(",", ":"))
+    return True
+
+
+def main():
+    before = after = converted = 0
+    for name in sorted(os.listdir(AUDIO_DIR)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(AUDIO_DIR, name)
+        before += os.path.getsize(path)
+        if convert_legacy(path):
+            converted += 1
+        after += os.path.getsize(path)
+    print(f"✅ {converted} ファイルを変換: {before / 1e3:.0f} KB → {after / 1e3:.0f} KB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
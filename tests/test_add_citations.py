@@ -0,0 +1,37 @@
+from add_citations import apply_citations_to_html
+
+
+def _entry(entry_id, url, keywords):
+    return {"id": entry_id, "url": url, "label": entry_id, "keywords": keywords}
+
+
+def test_linked_entry_does_not_hide_overlapping_keyword():
+    entries = [_entry("A", "u1", ["Lally"]), _entry("B", "u2", ["Lally et al"])]
+    html = '<p><a href="u1">x</a> Lally et al 2009.</p>'
+
+    new_html, changes = apply_citations_to_html(html, entries)
+
+    assert '<a href="u2" target="_blank" rel="noopener">Lally et al</a> 2009.' in new_html
+    assert len(changes) == 1
+
+
+def test_each_entry_is_linked_once_per_page():
+    entries = [_entry("A", "u1", ["Lally"]), _entry("B", "u2", ["Ebbinghaus"])]
+    html = "<p>Lally and Ebbinghaus.</p><p>Lally again, Ebbinghaus again.</p>"
+
+    new_html, changes = apply_citations_to_html(html, entries)
+
+    assert new_html.count('href="u1"') == 1
+    assert new_html.count('href="u2"') == 1
+    assert "<p>Lally again, Ebbinghaus again.</p>" in new_html
+    assert len(changes) == 2
+
+
+def test_linked_prefix_keyword_does_not_hide_longer_keyword():
+    entries = [_entry("A", "u1", ["Study1"]), _entry("B", "u2", ["Study12"])]
+    html = '<p><a href="u1">x</a> Study1 and Study12.</p>'
+
+    new_html, changes = apply_citations_to_html(html, entries)
+
+    assert 'Study1 and <a href="u2" target="_blank" rel="noopener">Study12</a>.' in new_html
+    assert len(changes) == 1
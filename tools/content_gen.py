@@ -4,14 +4,25 @@ Claude API を使って記事本文（Markdown）を生成する。
 
 APIキーは呼び出し元（generate_articles.py）が .env から読み込んで渡す。
 このファイルにAPIキーを書かないこと。
+
+本文とメタディスクリプションの2回の呼び出しは互いに独立なので、generate_articles() は
+複数トピック分の呼び出しをまとめてスレッドプールで同時に投げる。同時に飛ばすリクエスト数と
+1分あたりの開始数は RateLimiter で上限をかけ、429 / 529 は SDK のリトライ（指数バックオフ）に任せる。
 """
 from __future__ import annotations
 
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any
 
 import anthropic
 
 MODEL = "claude-sonnet-4-6"
+MAX_RETRIES = 6          # 429 / 529 / 接続エラーを SDK が指数バックオフで再試行する回数
+DEFAULT_CONCURRENCY = 4  # 同時に飛ばすリクエスト数
+DEFAULT_RPM = 40         # 1分あたりに開始するリクエスト数
 
 ARTICLE_PROMPT = """\
 あなたは英語学習・転職・AI活用の専門ライターです。
@@ -46,9 +57,114 @@ H2構成: {h2_topics}
 """
 
 
+class RateLimiter:
+    """
+    同時実行数（concurrency）と1分あたりの開始数（rpm）の上限。スレッド間で共有する。
+
+        with limiter:
+            client.messages.create(...)
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rpm: int = DEFAULT_RPM) -> None:
+        self._slots = threading.Semaphore(max(1, concurrency))
+        self._interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self) -> "RateLimiter":
+        self._slots.acquire()
+        # 開始時刻を interval ずつずらして予約する（待つのはロックの外）
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._slots.release()
+
+
+def _complete(client: anthropic.Anthropic, limiter: RateLimiter, prompt: str, max_tokens: int) -> str:
+    with limiter:
+        msg = client.messages.create(
+            model=MODEL,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+    return msg.content[0].text.strip()
+
+
+def _prompts(topic: dict[str, Any]) -> tuple[str, str]:
+    """(本文のプロンプト, メタディスクリプションのプロンプト)"""
+    h2_str = "・".join(topic["h2_topics"])
+    article = ARTICLE_PROMPT.format(
+        title=topic["title"],
+        target_keyword=topic["target_keyword"],
+        target_reader=topic["target_reader"],
+        category=topic["category"],
+        h2_topics=h2_str,
+    )
+    meta = META_PROMPT.format(
+        title=topic["title"],
+        category=topic["category"],
+        target_reader=topic["target_reader"],
+        h2_topics=h2_str,
+    )
+    return article, meta
+
+
+def generate_articles(
+    api_key: str,
+    topics: list[dict[str, Any]],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    rpm: int = DEFAULT_RPM,
+) -> Iterator[tuple[dict[str, Any], dict[str, Any] | Exception]]:
+    """
+    複数トピックの記事を同時に生成し、できた順に (topic, 記事 or 例外) を返す。
+
+    全トピックの本文・メタの呼び出しを1つのスレッドプールに投げ、RateLimiter で
+    同時実行数と開始レートを抑える。1トピックが失敗しても他のトピックは続ける。
+    記事の dict は generate_article() と同じ形。
+    """
+    client = anthropic.Anthropic(api_key=api_key, max_retries=MAX_RETRIES)
+    limiter = RateLimiter(concurrency, rpm)
+    pending: dict[int, dict[str, str] | None] = {}   # トピック番号 → できた部分（失敗したら None）
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {}
+        for i, topic in enumerate(topics):
+            article_prompt, meta_prompt = _prompts(topic)
+            futures[pool.submit(_complete, client, limiter, article_prompt, 4096)] = (i, "content")
+            futures[pool.submit(_complete, client, limiter, meta_prompt, 200)] = (i, "meta_description")
+        for future in as_completed(futures):
+            i, field = futures[future]
+            if i not in pending:
+                pending[i] = {}
+            parts = pending[i]
+            if parts is None:
+                continue  # もう片方の呼び出しで失敗を返したトピック
+            try:
+                parts[field] = future.result()
+            except Exception as e:  # noqa: BLE001 - トピック単位で失敗を返す
+                pending[i] = None
+                yield topics[i], e
+                continue
+            if len(parts) == 2:
+                topic = topics[i]
+                del pending[i]
+                yield topic, {
+                    "slug": topic["slug"],
+                    "title": topic["title"],
+                    "meta_description": parts["meta_description"],
+                    "content": parts["content"],
+                    "category": topic["category"],
+                }
+
+
 def generate_article(api_key: str, topic: dict[str, Any]) -> dict[str, Any]:
     """
-    1記事分のコンテンツを生成して返す。
+    1記事分のコンテンツを生成して返す（本文とメタディスクリプションは同時に生成する）。
 
     引数:
         api_key: Anthropic APIキー（.envから取得済みのもの）
@@ -57,46 +173,8 @@ def generate_article(api_key: str, topic: dict[str, Any]) -> dict[str, Any]:
     返り値:
         {slug, title, meta_description, content, category}
     """
-    client = anthropic.Anthropic(api_key=api_key)
-    h2_str = "・".join(topic["h2_topics"])
-
-    # 本文生成
-    content_msg = client.messages.create(
-        model=MODEL,
-        max_tokens=4096,
-        messages=[{
-            "role": "user",
-            "content": ARTICLE_PROMPT.format(
-                title=topic["title"],
-                target_keyword=topic["target_keyword"],
-                target_reader=topic["target_reader"],
-                category=topic["category"],
-                h2_topics=h2_str,
-            ),
-        }],
-    )
-    content = content_msg.content[0].text.strip()
-
-    # メタディスクリプション生成
-    meta_msg = client.messages.create(
-        model=MODEL,
-        max_tokens=200,
-        messages=[{
-            "role": "user",
-            "content": META_PROMPT.format(
-                title=topic["title"],
-                category=topic["category"],
-                target_reader=topic["target_reader"],
-                h2_topics=h2_str,
-            ),
-        }],
-    )
-    meta_desc = meta_msg.content[0].text.strip()
-
-    return {
-        "slug": topic["slug"],
-        "title": topic["title"],
-        "meta_description": meta_desc,
-        "content": content,
-        "category": topic["category"],
-    }
+    for _, result in generate_articles(api_key, [topic], concurrency=2, rpm=0):
+        if isinstance(result, Exception):
+            raise result
+        return result
+    raise RuntimeError(f"記事を生成できませんでした: {topic['slug']}")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+transcode_audio.py - 音声マニフェスト上の MP3 を低ビットレート・モノラルに再エンコード
+
+edge-tts の出力（24kHz / 48kbps）をそのまま置いているため音声が肥大化している。
+マニフェスト（audio_manifest.py）の status=ok のファイルを対象に、原本の隣へ
+  {name}.opus   : Opus（既定 20kbps・モノラル）
+  {name}.lo.mp3 : MP3 フォールバック（既定 32kbps・モノラル）
+を書き出す。変換時に前後の無音をトリムし、ラウドネスを -16 LUFS に揃える。
+
+原本の sha256 と変換設定を transcode_state.json に記録し、どちらも変わっていない
+ファイルは再エンコードしない。ffmpeg はプロセスプールで並列実行する。
+
+Usage:
+  python3 transcode_audio.py                    # 全バンク
+  python3 transcode_audio.py --bank words       # 特定バンクのみ
+  python3 transcode_audio.py --opus-bitrate 16k --mp3-bitrate 24k
+  python3 transcode_audio.py --dry-run          # 対象件数だけ表示
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from audio_cache import CACHE_DIR, atomic_write_bytes
+from audio_manifest import BANKS, build_manifest, save_manifest
+
+REPO_ROOT = Path(__file__).parent
+STATE_PATH = CACHE_DIR / "transcode_state.json"
+
+# 前後の無音トリム → ラウドネス正規化（音声用途なので LRA は狭め）
+SILENCE_TRIM = "silenceremove=start_periods=1:start_threshold=-50dB:start_silence=0.05"
+AUDIO_FILTER = f"{SILENCE_TRIM},areverse,{SILENCE_TRIM},areverse,loudnorm=I=-16:TP=-1.5:LRA=7"
+
+
+def output_paths(src):
+    src = Path(src)
+    stem = src.name[:-len(".mp3")]
+    return {"opus": src.with_name(f"{stem}.opus"), "mp3": src.with_name(f"{stem}.lo.mp3")}
+
+
+def encoder_args(opus_bitrate, mp3_bitrate):
+    """出力形式ごとの ffmpeg 引数（設定ハッシュの元にもなる）"""
+    return {
+        "opus": ["-ac", "1", "-ar", "24000", "-c:a", "libopus", "-b:a", opus_bitrate,
+                 "-application", "voip", "-f", "ogg"],
+        "mp3": ["-ac", "1", "-ar", "22050", "-c:a", "libmp3lame", "-b:a", mp3_bitrate, "-f", "mp3"],
+    }
+
+
+def settings_hash(encoders):
+    raw = json.dumps({"filter": AUDIO_FILTER, "encoders": encoders}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def transcode_one(src, encoders):
+    """1ファイルを全形式に変換し {形式: 出力バイト数} を返す（プロセスプールから呼ばれる）"""
+    sizes = {}
+    for fmt, dest in output_paths(src).items():
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", str(src),
+               "-af", AUDIO_FILTER, *encoders[fmt], str(tmp)]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr.strip()[:200])
+            os.replace(tmp, dest)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        sizes[fmt] = dest.stat().st_size
+    return sizes
+
+
+def load_state():
+    if STATE_PATH.exists():
+        return json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    return {}
+
+
+def save_state(state):
+    data = json.dumps(state, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    atomic_write_bytes(STATE_PATH, data.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音声の低ビットレート再エンコード")
+    parser.add_argument("--bank", choices=list(BANKS), action="append", help="対象バンク（複数指定可。省略時は全バンク）")
+    parser.add_argument("--opus-bitrate", default="20k", help="Opus のビットレート（デフォルト: 20k）")
+    parser.add_argument("--mp3-bitrate", default="32k", help="MP3 フォールバックのビットレート（デフォルト: 32k）")
+    parser.add_argument("--workers", type=int, default=None, help="並列プロセス数（デフォルト: CPU数）")
+    parser.add_argument("--dry-run", action="store_true", help="変換対象を数えるだけ")
+    args = parser.parse_args()
+
+    if not args.dry_run and not shutil.which("ffmpeg"):
+        print("ERROR: ffmpeg が見つかりません（libopus / libmp3lame 付きでインストールしてください）")
+        sys.exit(1)
+
+    banks = args.bank or list(BANKS)
+    manifest, _, _ = build_manifest(banks, args.workers)
+    save_manifest(manifest)
+
+    encoders = encoder_args(args.opus_bitrate, args.mp3_bitrate)
+    settings = settings_hash(encoders)
+    state = load_state()
+
+    todo = []
+    for rel, entry in sorted(manifest["files"].items()):
+        if entry["bank"] not in banks or entry["status"] != "ok":
+            continue
+        done = state.get(rel)
+        outputs_exist = all(p.exists() for p in output_paths(REPO_ROOT / rel).values())
+        if done and done["sha256"] == entry["sha256"] and done["settings"] == settings and outputs_exist:
+            continue
+        todo.append(rel)
+
+    print(f"変換対象: {len(todo)} ファイル（設定 {settings}: opus {args.opus_bitrate} / mp3 {args.mp3_bitrate}）")
+    if args.dry_run or not todo:
+        return
+
+    src_bytes = 0
+    out_bytes = {"opus": 0, "mp3": 0}
+    errors = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(transcode_one, str(REPO_ROOT / rel), encoders): rel for rel in todo}
+        for i, fut in enumerate(as_completed(futures), 1):
+            rel = futures[fut]
+            try:
+                sizes = fut.result()
+            except Exception as e:
+                errors += 1
+                print(f"  [{i}/{len(todo)}] ERROR {rel}: {e}")
+                continue
+            entry = manifest["files"][rel]
+            state[rel] = {"sha256": entry["sha256"], "settings": settings, **sizes}
+            src_bytes += entry["bytes"]
+            out_bytes = {fmt: out_bytes[fmt] + size for fmt, size in sizes.items()}
+            if i % 200 == 0:
+                save_state(state)  # 途中で止めても再開できるように
+                print(f"  [{i}/{len(todo)}] ...", flush=True)
+    save_state(state)
+
+    print(f"\n✅ 完了: {len(todo) - errors} 変換 / {errors} エラー")
+    if src_bytes:
+        for fmt, size in out_bytes.items():
+            print(f"  {fmt:4s}: {src_bytes / 1e6:.1f} MB → {size / 1e6:.1f} MB（{src_bytes / max(size, 1):.1f}x）")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""tts_engine.py - 音声生成（TTS）共通エンジン
+
+各スクリプトは「何を・どこに」生成するかをジョブ（dict）で宣言し、
+並列数・リトライ・一時ファイル経由の保存はこのモジュールがまとめて面倒を見る。
+
+ジョブ形式:
+  {
+    "text": "Hello.",             # 読み上げテキスト（必須）
+    "path": Path("audio/q1.mp3"), # 出力先（必須）
+    "voice": "en-US-AriaNeural",  # 省略時は VOICES[0]
+    "rate": "+0%",                # 省略可（edge-tts の prosody rate）
+    "boundary": "WordBoundary",   # 省略可。指定すると境界イベントを result["boundaries"] に収集
+    "label": "q1.mp3",            # 省略時はファイル名
+    "refresh_cache": True,        # 省略可。このジョブだけキャッシュを使わず合成し直す
+  }
+
+スループットの調整は DEFAULT_CONCURRENCY（環境変数 TTS_CONCURRENCY）で一括して行う。
+環境変数 TTS_MOCK_URL を設定すると edge-tts の代わりに bench/mock_servers.py の偽 TTS で合成する
+（オフラインでの負荷試験用。キャッシュキーも分けるので実音声の blob とは混ざらない）。
+合成結果は audio_cache の blob ストアに (テキスト, ボイス, 話速) キーで保存され、
+同じ内容のジョブは再合成せずハードリンクで配置する。
+各ジョブの合成時間・再試行・バイト数は pipeline_trace の trace に stage="tts" として記録される。
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import time
+import urllib.request
+from pathlib import Path
+
+import audio_cache
+import pipeline_trace as trace
+
+# ListenUp / WordsUp 共通の5種音声ローテーション
+VOICES = [
+    "en-US-AriaNeural",      # US female
+    "en-GB-SoniaNeural",     # UK female
+    "en-US-GuyNeural",       # US male
+    "en-AU-NatashaNeural",   # AU female
+    "en-GB-RyanNeural",      # UK male
+]
+
+DEFAULT_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "8"))
+MAX_ATTEMPTS = 3
+TIMEOUT_SEC = 60
+BACKOFF_BASE_SEC = 2.0
+TTS_MOCK_URL = os.environ.get("TTS_MOCK_URL", "")
+
+
+def rotate_voice(n, voices=VOICES):
+    """n 番目のジョブに割り当てるボイスを返す（0始まり）"""
+    return voices[n % len(voices)]
+
+
+async def edge_tts_synth(job):
+    """edge-tts で合成し (音声バイト列, 境界イベントのリスト) を返す
+
+    境界イベントは {"type", "text", "offset", "duration"}（offset/duration は 100ns 単位）。
+    """
+    import edge_tts
+
+    kwargs = {}
+    if job.get("rate"):
+        kwargs["rate"] = job["rate"]
+    if job.get("boundary"):
+        kwargs["boundary"] = job["boundary"]
+    communicate = edge_tts.Communicate(job["text"], job.get("voice") or VOICES[0], **kwargs)
+
+    audio = bytearray()
+    boundaries = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+        elif chunk["type"] in ("WordBoundary", "SentenceBoundary"):
+            boundaries.append({
+                "type": chunk["type"],
+                "text": chunk["text"],
+                "offset": chunk["offset"],
+                "duration": chunk["duration"],
+            })
+    if not audio:
+        raise RuntimeError("音声データが空です")
+    return bytes(audio), boundaries
+
+
+async def mock_tts_synth(job):
+    """TTS_MOCK_URL の偽 TTS サーバーで合成する（戻り値は edge_tts_synth と同じ）"""
+    payload = json.dumps({
+        "text": job["text"], "voice": job.get("voice") or VOICES[0],
+        "rate": job.get("rate", ""), "boundary": job.get("boundary"),
+    }).encode("utf-8")
+
+    def post():
+        req = urllib.request.Request(f"{TTS_MOCK_URL.rstrip('/')}/v1/tts", data=payload,
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=TIMEOUT_SEC) as res:
+            return json.loads(res.read())
+
+    data = await asyncio.to_thread(post)
+    return base64.b64decode(data["audio"]), data["boundaries"]
+
+
+def default_synth():
+    return mock_tts_synth if TTS_MOCK_URL else edge_tts_synth
+
+
+def job_cache_key(job):
+    """ジョブのキャッシュキー（input_type は SSML/テキストを区別するバックエンド用）"""
+    extra = job.get("input_type", "")
+    if TTS_MOCK_URL:
+        extra += "\x1fmock"
+    return audio_cache.cache_key(job["text"], job.get("voice") or VOICES[0],
+                                 job.get("rate", ""), extra)
+
+
+def _result(job, **fields):
+    result = {
+        "job": job, "ok": True, "skipped": False, "cached": False, "error": None,
+        "boundaries": [], "attempts": 0, "elapsed": 0.0, "bytes": 0,
+    }
+    result.update(fields)
+    return result
+
+
+async def _run_job(job, synth, sem, attempts, timeout, cache_state):
+    if cache_state is None:
+        return await _synth_job(job, synth, sem, attempts, timeout, None, False)
+    key = job_cache_key(job)
+    locks, fresh, refresh = cache_state
+    refresh = refresh or job.get("refresh_cache", False)
+    # 同じキーのジョブが同時に走っても合成は1回だけ（2件目以降はキャッシュヒット）
+    async with locks.setdefault(key, asyncio.Lock()):
+        if not refresh or key in fresh:
+            hit = audio_cache.lookup(key, job.get("boundary"))
+            if hit:
+                blob, boundaries = hit
+                audio_cache.link_into(blob, job["path"])
+                return _result(job, cached=True, boundaries=boundaries or [])
+        result = await _synth_job(job, synth, sem, attempts, timeout, key, refresh)
+        if result["ok"]:
+            fresh.add(key)
+        return result
+
+
+async def _synth_job(job, synth, sem, attempts, timeout, key, overwrite):
+    last_error = None
+    for attempt in range(attempts):
+        async with sem:
+            start = time.monotonic()
+            try:
+                audio, boundaries = await asyncio.wait_for(synth(job), timeout)
+            except Exception as e:  # noqa: BLE001 - リトライ対象はネットワーク由来の全例外
+                last_error = f"{type(e).__name__}: {e}"
+            else:
+                if key:
+                    blob = audio_cache.store(key, audio, job.get("boundary"), boundaries,
+                                             overwrite=overwrite)
+                    audio_cache.link_into(blob, job["path"])
+                else:
+                    audio_cache.atomic_write_bytes(job["path"], audio)
+                return _result(job, boundaries=boundaries, attempts=attempt + 1,
+                               elapsed=time.monotonic() - start, bytes=len(audio))
+        if attempt < attempts - 1:
+            # 指数バックオフ + ジッター（セマフォ外で待つので他ジョブは止めない）
+            await asyncio.sleep(BACKOFF_BASE_SEC * (2 ** attempt) * (0.5 + random.random()))
+    return _result(job, ok=False, error=last_error, attempts=attempts)
+
+
+async def synthesize_async(jobs, *, synth=None, concurrency=None,
+                           skip_existing=True, attempts=MAX_ATTEMPTS,
+                           timeout=TIMEOUT_SEC, use_cache=True, refresh_cache=False,
+                           verbose=True):
+    """ジョブを並列数上限つきで合成し、結果 dict のリストをジョブ順で返す
+
+    skip_existing=True: 出力先が既に存在し空でなければ合成しない（境界イベントは取れない）
+    synth: 別の TTS バックエンドを使う場合に差し替える async callable(job) -> (bytes, boundaries)
+           省略時は edge-tts（TTS_MOCK_URL があれば偽 TTS）
+    use_cache=True: audio_cache にヒットしたジョブは合成せずハードリンクで配置する
+    refresh_cache=True: キャッシュを参照せず合成し直し、blob を上書きする（--force 用）
+    """
+    jobs = list(jobs)
+    synth = synth or default_synth()
+    sem = asyncio.Semaphore(concurrency or DEFAULT_CONCURRENCY)
+    total = len(jobs)
+    done = 0
+    cache_state = ({}, set(), refresh_cache) if use_cache else None
+
+    async def one(job):
+        nonlocal done
+        path = Path(job["path"])
+        label = job.get("label") or path.name
+        if skip_existing and path.exists() and path.stat().st_size > 0:
+            result = _result(job, skipped=True)
+        else:
+            result = await _run_job(job, synth, sem, attempts, timeout, cache_state)
+            # キャッシュヒットは合成レイテンシの分布を歪めないよう別ステージで記録
+            trace.record("tts_cache" if result["cached"] else "tts", result["elapsed"], items=1,
+                         ok=result["ok"], bytes=result["bytes"], retries=max(0, result["attempts"] - 1),
+                         **({"error": result["error"]} if result["error"] else {}))
+        done += 1
+        if verbose:
+            if result["skipped"]:
+                print(f"  [{done}/{total}] SKIP {label} (exists)", flush=True)
+            elif result["cached"]:
+                print(f"  [{done}/{total}] CACHE {label}", flush=True)
+            elif result["ok"]:
+                voice = job.get("voice") or ""
+                print(f"  [{done}/{total}] OK {label} ({voice}) {result['elapsed']:.1f}s", flush=True)
+            else:
+                print(f"  [{done}/{total}] ERROR {label}: {result['error']}", flush=True)
+        return result
+
+    return await asyncio.gather(*(one(job) for job in jobs))
+
+
+def synthesize(jobs, **kwargs):
+    """synthesize_async の同期ラッパー"""
+    return asyncio.run(synthesize_async(jobs, **kwargs))
+
+
+def summarize(results):
+    """(生成数, スキップ数, 失敗結果のリスト) を返す"""
+    generated = sum(1 for r in results if r["ok"] and not r["skipped"])
+    skipped = sum(1 for r in results if r["skipped"])
+    failed = [r for r in results if not r["ok"]]
+    return generated, skipped, failed
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+tts_queue.py - 永続的な音声生成（TTS）ジョブキュー（SQLite）
+
+各バンクの add_*.py などは合成したい音声をキューに積むだけにし、ワーカーがリース付きで
+並列に消化する。途中で落ちても状態は DB に残るので、再起動すれば続きから再開する。
+
+  jobs テーブル: (bank, question_id, text, voice, rate, path, status, attempts, last_error, ...)
+  status: pending → leased → done / failed（attempts が MAX_ATTEMPTS に達したもの）
+
+失敗したジョブは指数バックオフ（next_attempt_at）を付けて pending に戻す。
+リース期限切れの leased ジョブ（ワーカーが落ちた等）は他のワーカーが拾い直す。
+
+Usage:
+  python3 tts_queue.py status                 # 件数・失敗一覧
+  python3 tts_queue.py work                   # キューが空になるまで処理
+  python3 tts_queue.py work --follow          # 常駐して新規ジョブも処理し続ける
+  python3 tts_queue.py work --bank words      # 特定バンクのみ
+  python3 tts_queue.py retry-failed           # failed を pending に戻す
+  python3 tts_queue.py enqueue-repairs        # audio_manifest.py --queue-repairs の結果を積む
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from audio_cache import CACHE_DIR
+from tts_engine import DEFAULT_CONCURRENCY, synthesize_async
+
+REPO_ROOT = Path(__file__).parent
+DB_PATH = Path(os.environ.get("TTS_QUEUE_DB", CACHE_DIR / "tts_queue.sqlite3"))
+
+MAX_ATTEMPTS = 6
+LEASE_SEC = 300
+BACKOFF_BASE_SEC = 2.0
+BACKOFF_MAX_SEC = 600
+POLL_SEC = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    bank            TEXT NOT NULL,
+    question_id     TEXT,
+    text            TEXT NOT NULL,
+    voice           TEXT NOT NULL,
+    rate            TEXT NOT NULL DEFAULT '',
+    path            TEXT NOT NULL UNIQUE,
+    refresh         INTEGER NOT NULL DEFAULT 0,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    lease_until     REAL,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    created_at      REAL NOT NULL,
+    updated_at      REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, next_attempt_at);
+"""
+
+
+def connect():
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _rel(path):
+    path = Path(path)
+    return path.resolve().relative_to(REPO_ROOT.resolve()).as_posix() if path.is_absolute() else path.as_posix()
+
+
+def enqueue(jobs, bank, conn=None, force=False):
+    """tts_engine 形式のジョブを積み、キュー上の id リストを返す
+
+    同じ path のジョブが既にあれば内容を更新して pending に戻す（done で内容も同じなら何もしない）。
+    force=True: done でも作り直す。壊れたファイルの修復用で、キャッシュの blob も合成し直す。
+    """
+    conn = conn or connect()
+    now = time.time()
+    ids = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for job in jobs:
+            path = _rel(job["path"])
+            row = conn.execute("SELECT id, status, text, voice, rate FROM jobs WHERE path = ?", (path,)).fetchone()
+            fields = (job["text"], job.get("voice") or "", job.get("rate", ""))
+            if row is None:
+                cur = conn.execute(
+                    "INSERT INTO jobs (bank, question_id, text, voice, rate, path, refresh, created_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (bank, job.get("label"), *fields, path, int(force), now, now),
+                )
+                ids.append(cur.lastrowid)
+                continue
+            ids.append(row["id"])
+            if not force and row["status"] == "done" and (row["text"], row["voice"], row["rate"]) == fields:
+                continue
+            conn.execute(
+                "UPDATE jobs SET bank = ?, question_id = ?, text = ?, voice = ?, rate = ?, refresh = ?,"
+                " status = 'pending', attempts = 0, last_error = NULL, lease_until = NULL,"
+                " next_attempt_at = 0, updated_at = ? WHERE id = ?",
+                (bank, job.get("label"), *fields, int(force), now, row["id"]),
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return ids
+
+
+def _scope(bank, ids):
+    where, params = [], []
+    if bank:
+        where.append("bank = ?")
+        params.append(bank)
+    if ids is not None:
+        where.append(f"id IN ({','.join('?' * len(ids))})")
+        params.extend(ids)
+    return "".join(f" AND {w}" for w in where), params
+
+
+def lease(conn, limit, bank=None, ids=None):
+    """実行可能なジョブを最大 limit 件リースして返す"""
+    now = time.time()
+    scope, params = _scope(bank, ids)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE ((status = 'pending' AND next_attempt_at <= ?)"
+            " OR (status = 'leased' AND lease_until < ?))" + scope +
+            " ORDER BY next_attempt_at, id LIMIT ?",
+            (now, now, *params, limit),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE jobs SET status = 'leased', lease_until = ?, updated_at = ? WHERE id = ?",
+            [(now + LEASE_SEC, now, r["id"]) for r in rows],
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return rows
+
+
+def record(conn, row, result):
+    """ワーカーの結果を反映（失敗時は指数バックオフで pending に戻す）"""
+    now = time.time()
+    if result["ok"]:
+        conn.execute(
+            "UPDATE jobs SET status = 'done', attempts = attempts + 1, last_error = NULL,"
+            " lease_until = NULL, updated_at = ? WHERE id = ?",
+            (now, row["id"]),
+        )
+        return
+    attempts = row["attempts"] + 1
+    status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+    delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** attempts))
+    conn.execute(
+        "UPDATE jobs SET status = ?, attempts = ?, last_error = ?, lease_until = NULL,"
+        " next_attempt_at = ?, updated_at = ? WHERE id = ?",
+        (status, attempts, result["error"], now + delay, now, row["id"]),
+    )
+
+
+def _waiting(conn, bank, ids):
+    """スコープ内でまだ終わっていないジョブの (件数, 最も早い次回実行時刻)"""
+    scope, params = _scope(bank, ids)
+    row = conn.execute(
+        "SELECT COUNT(*) AS n, MIN(COALESCE(lease_until, next_attempt_at)) AS t FROM jobs"
+        " WHERE status IN ('pending', 'leased')" + scope,
+        params,
+    ).fetchone()
+    return row["n"], row["t"]
+
+
+async def work_async(bank=None, ids=None, concurrency=None, follow=False):
+    """キューを消化する。(done 件数, failed 件数) を返す
+
+    follow=False: スコープ内の pending/leased が無くなったら終了（バックオフ中のジョブは待つ）
+    """
+    conn = connect()
+    concurrency = concurrency or DEFAULT_CONCURRENCY
+    done = failed = 0
+    while True:
+        rows = lease(conn, concurrency * 4, bank, ids)
+        if not rows:
+            n, next_at = _waiting(conn, bank, ids)
+            if n:
+                # バックオフ中 / 他ワーカーがリース中のジョブを待つ
+                delay = min(POLL_SEC, max(0.5, (next_at or 0) - time.time()))
+            elif follow:
+                delay = POLL_SEC
+            else:
+                break
+            await asyncio.sleep(delay)
+            continue
+        jobs = [
+            {"text": r["text"], "voice": r["voice"], "rate": r["rate"],
+             "path": REPO_ROOT / r["path"], "label": r["question_id"] or r["path"],
+             "refresh_cache": bool(r["refresh"])}
+            for r in rows
+        ]
+        # リトライはキュー側（next_attempt_at）で行うのでエンジンには1回だけ試させる
+        results = await synthesize_async(jobs, concurrency=concurrency, skip_existing=False, attempts=1)
+        for row, result in zip(rows, results):
+            record(conn, row, result)
+            if result["ok"]:
+                done += 1
+            elif row["attempts"] + 1 >= MAX_ATTEMPTS:
+                failed += 1
+    conn.close()
+    return done, failed
+
+
+def work(**kwargs):
+    return asyncio.run(work_async(**kwargs))
+
+
+def status_counts(conn, bank=None):
+    scope, params = _scope(bank, None)
+    rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs WHERE 1 = 1" + scope + " GROUP BY status", params)
+    return {r["status"]: r["n"] for r in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS ジョブキュー")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_status = sub.add_parser("status", help="キューの状態を表示")
+    p_status.add_argument("--bank")
+    p_work = sub.add_parser("work", help="キューを処理する")
+    p_work.add_argument("--bank")
+    p_work.add_argument("--concurrency", type=int, default=None)
+    p_work.add_argument("--follow", action="store_true", help="空になっても終了せず待ち続ける")
+    p_retry = sub.add_parser("retry-failed", help="failed のジョブを pending に戻す")
+    p_retry.add_argument("--bank")
+    sub.add_parser("enqueue-repairs", help="repair_queue.json（audio_manifest.py）を積む")
+    args = parser.parse_args()
+
+    conn = connect()
+    if args.cmd == "status":
+        counts = status_counts(conn, args.bank)
+        print("  ".join(f"{s}: {counts.get(s, 0)}" for s in ("pending", "leased", "done", "failed")))
+        scope, params = _scope(args.bank, None)
+        for r in conn.execute("SELECT * FROM jobs WHERE status = 'failed'" + scope + " ORDER BY id LIMIT 20", params):
+            print(f"  FAILED {r['path']} ({r['attempts']}回): {r['last_error']}")
+    elif args.cmd == "work":
+        done, failed = work(bank=args.bank, concurrency=args.concurrency, follow=args.follow)
+        print(f"\n✅ 完了: 生成 {done} / 失敗 {failed}")
+    elif args.cmd == "retry-failed":
+        scope, params = _scope(args.bank, None)
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, next_attempt_at = 0, updated_at = ?"
+            " WHERE status = 'failed'" + scope,
+            (time.time(), *params),
+        )
+        print(f"{cur.rowcount} 件を pending に戻しました")
+    elif args.cmd == "enqueue-repairs":
+        from audio_manifest import REPAIR_QUEUE_PATH
+
+        if not REPAIR_QUEUE_PATH.exists():
+            print(f"ERROR: {REPAIR_QUEUE_PATH} がありません（audio_manifest.py --queue-repairs を先に実行）")
+            sys.exit(1)
+        jobs = json.loads(REPAIR_QUEUE_PATH.read_text(encoding="utf-8"))
+        by_bank = {}
+        for job in jobs:
+            by_bank.setdefault(job["path"].split("/", 1)[0], []).append(job)
+        for bank, bank_jobs in by_bank.items():
+            enqueue(bank_jobs, bank, conn=conn, force=True)
+        print(f"{len(jobs)} 件をキューに追加しました")
+
+
+if __name__ == "__main__":
+    main()